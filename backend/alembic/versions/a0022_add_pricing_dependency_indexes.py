@@ -0,0 +1,27 @@
+"""add indexes used to find quote versions affected by cost changes
+
+Revision ID: a0022
+Revises: a0021
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a0022'
+down_revision = 'a0021'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_quote_lines_filament_id', 'quote_lines', ['filament_id'], unique=False)
+    op.create_index('ix_quote_versions_printer_id', 'quote_versions', ['printer_id'], unique=False)
+    op.create_index('ix_quote_versions_status', 'quote_versions', ['status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_quote_versions_status', table_name='quote_versions')
+    op.drop_index('ix_quote_versions_printer_id', table_name='quote_versions')
+    op.drop_index('ix_quote_lines_filament_id', table_name='quote_lines')
@@ -0,0 +1,47 @@
+"""add indexes for keyset pagination and list filters
+
+Revision ID: a0023
+Revises: a0022
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a0023'
+down_revision = 'a0022'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    # (chiave di ordinamento, id) per la paginazione keyset
+    ('ix_jobs_created_at_id', 'jobs', ['created_at', 'id']),
+    ('ix_quotes_created_at_id', 'quotes', ['created_at', 'id']),
+    ('ix_customers_created_at_id', 'customers', ['created_at', 'id']),
+    ('ix_customers_ragione_sociale_id', 'customers', ['ragione_sociale', 'id']),
+    ('ix_filaments_created_at_id', 'filaments', ['created_at', 'id']),
+    ('ix_filaments_materiale_id', 'filaments', ['materiale', 'id']),
+    ('ix_printers_created_at_id', 'printers', ['created_at', 'id']),
+    ('ix_printers_nome_id', 'printers', ['nome', 'id']),
+    ('ix_cost_entries_created_at_id', 'cost_entries', ['created_at', 'id']),
+    ('ix_cost_entries_periodo_id', 'cost_entries', ['periodo_yyyymm', 'id']),
+    ('ix_inventory_movements_created_at_id', 'inventory_movements', ['created_at', 'id']),
+    # filtri degli elenchi
+    ('ix_jobs_quote_version_id', 'jobs', ['quote_version_id']),
+    ('ix_quotes_customer_id', 'quotes', ['customer_id']),
+    ('ix_cost_entries_categoria_id', 'cost_entries', ['categoria_id']),
+    ('ix_cost_entries_job_id', 'cost_entries', ['job_id']),
+    ('ix_inventory_movements_filament_id', 'inventory_movements', ['filament_id']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
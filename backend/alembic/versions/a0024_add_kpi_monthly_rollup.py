@@ -0,0 +1,55 @@
+"""add monthly KPI rollup tables
+
+Revision ID: a0024
+Revises: a0023
+Create Date: 2026-10-18
+
+Le tabelle nascono vuote: ``entrypoint.sh`` le popola dopo l'upgrade con
+``python -m app.db.rebuild_kpi --se-vuoto``.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a0024'
+down_revision = 'a0023'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'kpi_monthly',
+        sa.Column('periodo', sa.String(length=7), primary_key=True),
+        sa.Column('preventivi_creati', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('ricavi_accettati_cents', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('costi_cents', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('clienti_attivi', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('job_chiusi', sa.Integer(), nullable=False, server_default='0'),
+        # margine medio pesato sul ricavo: somma margini / somma ricavi dei job chiusi
+        sa.Column('margine_cents_somma', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('ricavo_cents_somma', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('job_pianificati', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('job_in_corso', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('job_completati', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('job_annullati', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.create_table(
+        'kpi_monthly_costs',
+        sa.Column('periodo', sa.String(length=7), primary_key=True),
+        sa.Column('categoria_id', sa.Integer(), sa.ForeignKey('cost_categories.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('totale_cents', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+    op.create_table(
+        'kpi_monthly_customers',
+        sa.Column('periodo', sa.String(length=7), primary_key=True),
+        sa.Column('customer_id', sa.Integer(), sa.ForeignKey('customers.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('versioni', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade():
+    op.drop_table('kpi_monthly_customers')
+    op.drop_table('kpi_monthly_costs')
+    op.drop_table('kpi_monthly')
@@ -0,0 +1,25 @@
+"""index jobs for margin analytics
+
+Revision ID: a0025
+Revises: a0024
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a0025'
+down_revision = 'a0024'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_jobs_status_created_at', 'jobs', ['status', 'created_at'], unique=False)
+    # prefisso di ix_customers_ragione_sociale_id (a0023): l'indice a colonna singola è ridondante
+    op.drop_index('ix_customers_ragione_sociale', table_name='customers')
+
+
+def downgrade():
+    op.create_index('ix_customers_ragione_sociale', 'customers', ['ragione_sociale'], unique=False)
+    op.drop_index('ix_jobs_status_created_at', table_name='jobs')
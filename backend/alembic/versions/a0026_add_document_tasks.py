@@ -0,0 +1,45 @@
+"""add document_tasks queue table
+
+Revision ID: a0026
+Revises: a0025
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a0026'
+down_revision = 'a0025'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'document_tasks',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('tipo', sa.String(length=20), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='IN_CODA'),
+        sa.Column('params', sa.Text(), nullable=False, server_default='{}'),
+        sa.Column('filename', sa.String(length=255), nullable=False, server_default=''),
+        sa.Column('result_path', sa.String(length=500), nullable=True),
+        sa.Column('error', sa.Text(), nullable=False, server_default=''),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('worker_id', sa.String(length=100), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_by_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('updated_by_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+    )
+    op.create_index('ix_document_tasks_status_id', 'document_tasks', ['status', 'id'])
+    op.create_index('ix_document_tasks_expires_at', 'document_tasks', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_document_tasks_expires_at', table_name='document_tasks')
+    op.drop_index('ix_document_tasks_status_id', table_name='document_tasks')
+    op.drop_table('document_tasks')
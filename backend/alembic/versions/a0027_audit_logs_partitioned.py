@@ -0,0 +1,114 @@
+"""audit_logs: indexes for entity/actor lookups, monthly partitions on PostgreSQL
+
+Revision ID: a0027
+Revises: a0026
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a0027'
+down_revision = 'a0026'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_audit_logs_entity_entity_id_id', ['entity', 'entity_id', 'id']),
+    ('ix_audit_logs_actor_user_id_id', ['actor_user_id', 'id']),
+    ('ix_audit_logs_created_at_id', ['created_at', 'id']),
+)
+
+COLUMNS = """
+    actor_user_id integer,
+    entity varchar(100) NOT NULL,
+    entity_id integer NOT NULL,
+    action varchar(50) NOT NULL,
+    details text NOT NULL DEFAULT '',
+    updated_at timestamptz
+"""
+
+
+def _create_indexes():
+    for name, cols in INDEXES:
+        op.create_index(name, 'audit_logs', cols)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        _create_indexes()
+        return
+
+    # La chiave di partizione deve far parte della PK: (id, created_at).
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_old")
+    op.execute("ALTER TABLE audit_logs_old RENAME CONSTRAINT audit_logs_pkey TO audit_logs_old_pkey")
+    op.execute(f"""
+        CREATE TABLE audit_logs (
+            id integer NOT NULL DEFAULT nextval('audit_logs_id_seq'),
+            {COLUMNS},
+            created_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT")
+    # Una partizione per ogni mese dalla prima voce esistente a tre mesi da oggi
+    op.execute("""
+        DO $$
+        DECLARE m date;
+        BEGIN
+            FOR m IN SELECT generate_series(
+                date_trunc('month', COALESCE((SELECT min(created_at) FROM audit_logs_old), now())),
+                date_trunc('month', now()) + interval '3 months',
+                interval '1 month'
+            )::date LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF audit_logs FOR VALUES FROM (%L) TO (%L)',
+                    'audit_logs_' || to_char(m, 'YYYYMM'), m, (m + interval '1 month')::date
+                );
+            END LOOP;
+        END $$
+    """)
+    op.execute("""
+        INSERT INTO audit_logs (id, actor_user_id, entity, entity_id, action, details, created_at, updated_at)
+        SELECT id, actor_user_id, entity, entity_id, action, details, COALESCE(created_at, now()), updated_at
+        FROM audit_logs_old
+    """)
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id")
+    op.execute("DROP TABLE audit_logs_old")
+    _create_indexes()
+
+    # Sola aggiunta: niente UPDATE/DELETE di righe; la retention si fa staccando le partizioni.
+    op.execute("""
+        CREATE FUNCTION audit_logs_append_only() RETURNS trigger AS $$
+        BEGIN
+            RAISE EXCEPTION 'audit_logs è in sola aggiunta';
+        END $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER audit_logs_append_only BEFORE UPDATE OR DELETE ON audit_logs
+        FOR EACH ROW EXECUTE FUNCTION audit_logs_append_only()
+    """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        for name, _ in INDEXES:
+            op.drop_index(name, table_name='audit_logs')
+        return
+
+    op.execute("DROP TRIGGER audit_logs_append_only ON audit_logs")
+    op.execute("DROP FUNCTION audit_logs_append_only()")
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_part")
+    op.execute(f"""
+        CREATE TABLE audit_logs (
+            id integer PRIMARY KEY DEFAULT nextval('audit_logs_id_seq'),
+            {COLUMNS},
+            created_at timestamptz
+        )
+    """)
+    op.execute("""
+        INSERT INTO audit_logs (id, actor_user_id, entity, entity_id, action, details, created_at, updated_at)
+        SELECT id, actor_user_id, entity, entity_id, action, details, created_at, updated_at FROM audit_logs_part
+    """)
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id")
+    op.execute("DROP TABLE audit_logs_part")  # elimina anche le partizioni
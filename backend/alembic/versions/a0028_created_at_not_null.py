@@ -0,0 +1,31 @@
+"""created_at NOT NULL on the tables paged by (created_at, id)
+
+Revision ID: a0028
+Revises: a0027
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a0028'
+down_revision = 'a0027'
+branch_labels = None
+depends_on = None
+
+# Un cursore con created_at NULL interrompe la paginazione keyset (col > NULL
+# non è mai vero) e l'ordine dei NULL cambia da un database all'altro.
+# audit_logs è già NOT NULL da a0027.
+TABLES = ('jobs', 'quotes', 'customers', 'filaments', 'printers', 'cost_entries', 'inventory_movements')
+
+
+def upgrade():
+    for table in TABLES:
+        op.execute(f"UPDATE {table} SET created_at = COALESCE(updated_at, now()) WHERE created_at IS NULL")
+        op.alter_column(table, 'created_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+
+
+def downgrade():
+    for table in TABLES:
+        op.alter_column(table, 'created_at', existing_type=sa.DateTime(timezone=True), nullable=True)
@@ -1,12 +1,17 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
 
-from app.core.security import decode_token
-from app.db.session import SessionLocal
+from app.db import session as db_session
+from app.db import unit_of_work
+from app.db.routing import ReplicaRouter
+from app.db.session import AsyncSessionLocal, SessionLocal
 from app.models.user import User, UserRole
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, PageParams
+from app.services.user_cache import load_active_user, load_active_user_async, token_user_id
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
@@ -19,14 +24,65 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def get_uow(db: Session = Depends(get_db)) -> Generator[Session, None, None]:
+    """Sessione degli endpoint di scrittura: un commit a fine richiesta, rollback su errore (app.db.unit_of_work)."""
+    try:
+        yield db
+    except Exception:
+        unit_of_work.rollback(db)
+        raise
+    unit_of_work.commit(db)
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Sessione async per gli endpoint ``async def``: nessun thread del threadpool occupato."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_read_router() -> ReplicaRouter:
+    return db_session.read_router
+
+
+def get_read_db(router: ReplicaRouter = Depends(get_read_router)) -> Generator[Session, None, None]:
+    """Sessione di sola lettura: replica se disponibile e allineata, altrimenti primario."""
+    db = router.read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(router: ReplicaRouter = Depends(get_read_router)) -> AsyncGenerator[AsyncSession, None]:
+    async with await router.async_read_session() as db:
+        yield db
+
+
+def get_session_factory() -> sessionmaker:
+    """Per chi apre sessioni proprie oltre la durata della richiesta (es. risposte in streaming)."""
+    return SessionLocal
+
+
 def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+    # token e utente dalla cache (app.services.user_cache): di norma nessuna query
     try:
-        payload = decode_token(token)
-        user_id = payload.get("sub")
+        user_id = token_user_id(token)
     except Exception:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token non valido")
-    user = db.get(User, int(user_id)) if user_id else None
-    if not user or not user.is_active:
+    user = load_active_user(db, user_id) if user_id else None
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Utente non valido")
+    return user
+
+
+async def get_current_user_async(db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)) -> User:
+    """Come :func:`get_current_user`, per gli endpoint async (stessa cache)."""
+    try:
+        user_id = token_user_id(token)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token non valido")
+    user = await load_active_user_async(db, user_id) if user_id else None
+    if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Utente non valido")
     return user
 
@@ -46,3 +102,11 @@ def require_roles(*roles: UserRole):
         return current
 
     return _dep
+
+
+def page_params(
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(default=None, description="Valore dell'header X-Next-Cursor della pagina precedente"),
+    sort: str | None = Query(default=None, description="Campo di ordinamento, prefisso '-' per decrescente"),
+) -> PageParams:
+    return PageParams(limit=limit, cursor=cursor, sort=sort)
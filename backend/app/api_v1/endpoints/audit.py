@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.api_v1.deps import get_read_db, page_params, require_roles
+from app.models.audit import AuditLog
+from app.models.user import UserRole
+from app.schemas.audit import AuditLogOut
+from app.services.pagination import PageParams, paginate
+
+router = APIRouter(dependencies=[Depends(require_roles(UserRole.admin))])
+
+
+AUDIT_SORT_KEYS = {"id": AuditLog.id, "created_at": AuditLog.created_at}
+
+
+@router.get("/", response_model=list[AuditLogOut])
+def list_audit(
+    response: Response,
+    entity: str | None = Query(default=None, description="Tipo di entità, es. Quote"),
+    entity_id: int | None = Query(default=None, description="Richiede entity"),
+    actor_user_id: int | None = None,
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_read_db),
+):
+    """Voci di audit dalla più recente, filtrabili per entità e per autore (indici ``(entity, entity_id, id)`` e ``(actor_user_id, id)``)."""
+    if entity_id is not None and not entity:
+        raise HTTPException(status_code=400, detail="Il filtro entity_id richiede entity")
+    stmt = select(AuditLog)
+    if entity:
+        stmt = stmt.where(AuditLog.entity == entity)
+        if entity_id is not None:
+            stmt = stmt.where(AuditLog.entity_id == entity_id)
+    if actor_user_id is not None:
+        stmt = stmt.where(AuditLog.actor_user_id == actor_user_id)
+    return paginate(db, stmt, AUDIT_SORT_KEYS, page, response)
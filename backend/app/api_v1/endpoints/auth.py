@@ -1,20 +1,38 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.api_v1.deps import get_db, get_current_user
-from app.core.security import verify_password, create_access_token
+from app.api_v1.deps import get_db, get_current_user_async
+from app.core.security import create_access_token, verify_and_update_async
 from app.models.user import User
 from app.schemas.user import Token, UserOut
 
 router = APIRouter()
 
 
+def _find_user(db: Session, email: str) -> User | None:
+    return db.query(User).filter(User.email == email).first()
+
+
+def _store_rehash(db: Session, user: User, hashed_password: str) -> None:
+    user.hashed_password = hashed_password
+    db.commit()
+
+
 @router.post("/login", response_model=Token)
-def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form.username).first()
-    if not user or not verify_password(form.password, user.hashed_password):
+async def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    # DB nel threadpool, pbkdf2 nell'executor dedicato degli hash: il login non
+    # tiene occupato un thread delle richieste durante la verifica
+    user = await run_in_threadpool(_find_user, db, form.username)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Credenziali non valide")
+    ok, new_hash = await verify_and_update_async(form.password, user.hashed_password)
+    if not ok:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Credenziali non valide")
+    if new_hash:
+        # policy di hashing cambiata (es. PASSWORD_HASH_ROUNDS): hash rigenerato in modo trasparente
+        await run_in_threadpool(_store_rehash, db, user, new_hash)
     # role may be stored as plain string by our model; if it's an enum
     # instance take its `.value` property, otherwise use the string directly.
     # role is stored as uppercase string in the DB (see models/user);
@@ -24,5 +42,5 @@ def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get
 
 
 @router.get("/me", response_model=UserOut)
-def me(current: User = Depends(get_current_user)):
+async def me(current: User = Depends(get_current_user_async)):
     return current
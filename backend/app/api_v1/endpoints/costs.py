@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api_v1.deps import get_db, get_current_user, require_roles
+from app.api_v1.deps import get_async_db, get_current_user, get_current_user_async, get_uow, get_read_db, page_params, require_roles
+from app.core.money import from_cents, to_cents
 from app.models.costs import CostCategory, CostEntry
 from app.models.customer import Customer
 from app.models.job import Job
@@ -18,13 +20,17 @@ from app.schemas.costs import (
   CostByCustomerReportItem,
 )
 from app.services.audit import log_action
+from app.services.kpi import record_costs
+from app.services.pagination import PageParams, paginate_async
+
+ENTRY_SORT_KEYS = {"id": CostEntry.id, "created_at": CostEntry.created_at, "periodo_yyyymm": CostEntry.periodo_yyyymm}
 
 router = APIRouter()
 
 
 @router.get("/categories", response_model=list[CostCategoryOut])
-def list_categories(db: Session = Depends(get_db), _: User = Depends(get_current_user)):
-    return db.query(CostCategory).order_by(CostCategory.nome).all()
+async def list_categories(db: AsyncSession = Depends(get_async_db), _: User = Depends(get_current_user_async)):
+    return (await db.scalars(select(CostCategory).order_by(CostCategory.nome))).all()
 
 
 @router.post(
@@ -32,37 +38,37 @@ def list_categories(db: Session = Depends(get_db), _: User = Depends(get_current
     response_model=CostCategoryOut,
     dependencies=[Depends(require_roles(UserRole.admin))],
 )
-def create_category(payload: CostCategoryCreate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def create_category(payload: CostCategoryCreate, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     c = CostCategory(**payload.model_dump())
     c.created_by_id = current.id
     c.updated_by_id = current.id
     db.add(c)
-    db.commit()
-    db.refresh(c)
+    db.flush()
     log_action(db, current.id, "CostCategory", c.id, "CREATE")
-    db.commit()
     return c
 
 
 @router.get("/entries", response_model=list[CostEntryOut])
-def list_entries(
+async def list_entries(
+    response: Response,
     periodo_from: str | None = Query(default=None, description="YYYY-MM"),
     periodo_to: str | None = Query(default=None, description="YYYY-MM"),
     categoria_id: int | None = None,
     job_id: int | None = None,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+    _: User = Depends(get_current_user_async),
 ):
-    q = db.query(CostEntry)
+    q = select(CostEntry)
     if periodo_from:
-        q = q.filter(CostEntry.periodo_yyyymm >= periodo_from)
+        q = q.where(CostEntry.periodo_yyyymm >= periodo_from)
     if periodo_to:
-        q = q.filter(CostEntry.periodo_yyyymm <= periodo_to)
+        q = q.where(CostEntry.periodo_yyyymm <= periodo_to)
     if categoria_id:
-        q = q.filter(CostEntry.categoria_id == categoria_id)
+        q = q.where(CostEntry.categoria_id == categoria_id)
     if job_id:
-        q = q.filter(CostEntry.job_id == job_id)
-    return q.order_by(CostEntry.id.desc()).limit(1000).all()
+        q = q.where(CostEntry.job_id == job_id)
+    return await paginate_async(db, q, ENTRY_SORT_KEYS, page, response)
 
 
 @router.post(
@@ -70,15 +76,14 @@ def list_entries(
     response_model=CostEntryOut,
     dependencies=[Depends(require_roles(UserRole.admin, UserRole.operator))],
 )
-def create_entry(payload: CostEntryCreate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def create_entry(payload: CostEntryCreate, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     e = CostEntry(**payload.model_dump())
     e.created_by_id = current.id
     e.updated_by_id = current.id
     db.add(e)
-    db.commit()
-    db.refresh(e)
+    record_costs(db, [(e.periodo_yyyymm, e.categoria_id, e.importo_eur)])
+    db.flush()
     log_action(db, current.id, "CostEntry", e.id, "CREATE")
-    db.commit()
     return e
 
 
@@ -86,13 +91,13 @@ def create_entry(payload: CostEntryCreate, db: Session = Depends(get_db), curren
     "/entries/{entry_id}",
     dependencies=[Depends(require_roles(UserRole.admin, UserRole.operator))],
 )
-def delete_entry(entry_id: int, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def delete_entry(entry_id: int, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     entry = db.get(CostEntry, entry_id)
     if not entry:
         raise HTTPException(status_code=404, detail="Costo non trovato")
     log_action(db, current.id, "CostEntry", entry.id, "DELETE")
+    record_costs(db, [(entry.periodo_yyyymm, entry.categoria_id, entry.importo_eur)], sign=-1)
     db.delete(entry)
-    db.commit()
     return {"ok": True}
 
 
@@ -100,7 +105,7 @@ def delete_entry(entry_id: int, db: Session = Depends(get_db), current: User = D
 def report_monthly(
     periodo_from: str | None = Query(default=None, description="YYYY-MM"),
     periodo_to: str | None = Query(default=None, description="YYYY-MM"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: User = Depends(get_current_user),
 ):
     q = db.query(CostEntry.periodo_yyyymm, func.coalesce(func.sum(CostEntry.importo_eur), 0).label("totale"))
@@ -109,14 +114,14 @@ def report_monthly(
     if periodo_to:
         q = q.filter(CostEntry.periodo_yyyymm <= periodo_to)
     q = q.group_by(CostEntry.periodo_yyyymm).order_by(CostEntry.periodo_yyyymm)
-    return [{"periodo_yyyymm": r[0], "totale_eur": float(r[1] or 0)} for r in q.all()]
+    return [{"periodo_yyyymm": r[0], "totale_eur": from_cents(to_cents(r[1]))} for r in q.all()]
 
 
 @router.get("/reports/by-job", response_model=list[CostByJobReportItem])
 def report_by_job(
     periodo_from: str | None = Query(default=None, description="YYYY-MM"),
     periodo_to: str | None = Query(default=None, description="YYYY-MM"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: User = Depends(get_current_user),
 ):
     q = (
@@ -145,7 +150,7 @@ def report_by_job(
             "quote_codice": r.quote_codice,
             "customer": r.customer,
             "periodo_yyyymm": r.periodo_yyyymm,
-            "totale_eur": float(r.totale or 0),
+            "totale_eur": from_cents(to_cents(r.totale)),
         }
         for r in q.all()
     ]
@@ -155,7 +160,7 @@ def report_by_job(
 def report_by_customer(
     periodo_from: str | None = Query(default=None, description="YYYY-MM"),
     periodo_to: str | None = Query(default=None, description="YYYY-MM"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: User = Depends(get_current_user),
 ):
     q = (
@@ -174,4 +179,4 @@ def report_by_customer(
     if periodo_to:
         q = q.filter(CostEntry.periodo_yyyymm <= periodo_to)
     q = q.group_by(Customer.id, Customer.ragione_sociale).order_by(func.sum(CostEntry.importo_eur).desc())
-    return [{"customer_id": int(r.customer_id), "customer": r.customer, "totale_eur": float(r.totale or 0)} for r in q.all()]
+    return [{"customer_id": int(r.customer_id), "customer": r.customer, "totale_eur": from_cents(to_cents(r.totale))} for r in q.all()]
@@ -1,55 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api_v1.deps import get_db, get_current_user, require_roles
+from app.api_v1.deps import get_async_db, get_current_user, get_current_user_async, get_uow, page_params, require_roles
 from app.models.customer import Customer
 from app.models.user import User, UserRole
 from app.schemas.customer import CustomerCreate, CustomerOut, CustomerUpdate
 from app.services.audit import log_action
+from app.services.pagination import PageParams, paginate_async
 
 router = APIRouter()
 
 
+CUSTOMER_SORT_KEYS = {"id": Customer.id, "created_at": Customer.created_at, "ragione_sociale": Customer.ragione_sociale}
+
+
 @router.get("/", response_model=list[CustomerOut])
-def list_customers(db: Session = Depends(get_db), _: User = Depends(get_current_user)):
-    return db.query(Customer).order_by(Customer.id.desc()).all()
+async def list_customers(
+    response: Response,
+    tipo_cliente: str | None = Query(default=None, description="DITTA o PERSONA"),
+    ragione_sociale: str | None = Query(default=None, description="Prefisso della ragione sociale"),
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+    _: User = Depends(get_current_user_async),
+):
+    stmt = select(Customer)
+    if tipo_cliente:
+        stmt = stmt.where(Customer.tipo_cliente == tipo_cliente)
+    if ragione_sociale:
+        stmt = stmt.where(Customer.ragione_sociale.startswith(ragione_sociale, autoescape=True))
+    return await paginate_async(db, stmt, CUSTOMER_SORT_KEYS, page, response)
 
 
 @router.post("/", response_model=CustomerOut, dependencies=[Depends(require_roles(UserRole.admin, UserRole.sales, UserRole.operator))])
-def create_customer(payload: CustomerCreate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def create_customer(payload: CustomerCreate, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     c = Customer(**payload.model_dump())
     c.created_by_id = current.id
     c.updated_by_id = current.id
     db.add(c)
-    db.commit()
-    db.refresh(c)
+    db.flush()
     log_action(db, current.id, "Customer", c.id, "CREATE")
-    db.commit()
     return c
 
 
 @router.put("/{customer_id}", response_model=CustomerOut, dependencies=[Depends(require_roles(UserRole.admin, UserRole.sales, UserRole.operator))])
-def update_customer(customer_id: int, payload: CustomerUpdate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def update_customer(customer_id: int, payload: CustomerUpdate, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     c = db.get(Customer, customer_id)
     if not c:
         raise HTTPException(status_code=404, detail="Cliente non trovato")
     for k, v in payload.model_dump(exclude_unset=True).items():
         setattr(c, k, v)
     c.updated_by_id = current.id
-    db.commit()
-    db.refresh(c)
     log_action(db, current.id, "Customer", c.id, "UPDATE")
-    db.commit()
     return c
 
 
 @router.delete("/{customer_id}", dependencies=[Depends(require_roles(UserRole.admin))])
-def delete_customer(customer_id: int, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def delete_customer(customer_id: int, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     c = db.get(Customer, customer_id)
     if not c:
         raise HTTPException(status_code=404, detail="Cliente non trovato")
-    db.delete(c)
-    db.commit()
     log_action(db, current.id, "Customer", customer_id, "DELETE")
-    db.commit()
+    db.delete(c)
     return {"ok": True}
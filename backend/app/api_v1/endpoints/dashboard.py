@@ -1,81 +1,61 @@
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import and_, func
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api_v1.deps import get_db, get_current_user
-from app.models.costs import CostEntry
-from app.models.customer import Customer
+from app.api_v1.deps import get_async_read_db, get_current_user_async
+from app.core.money import from_cents
 from app.models.inventory import Filament
-from app.models.job import Job, JobStatus
-from app.models.quote import Quote, QuoteVersion, QuoteStatus
 from app.models.user import User
-from app.schemas.dashboard import DashboardKPI
+from app.schemas.dashboard import DashboardKPI, MarginStatsOut
+from app.services.kpi import load_kpi_month_async, periodo_of
+from app.services.margins import DEFAULT_PERCENTILES, GroupBy, margin_stats_async
 
 router = APIRouter()
 
 
 @router.get("/kpi", response_model=DashboardKPI)
-def kpi(db: Session = Depends(get_db), _: User = Depends(get_current_user)):
-    now = datetime.utcnow()
-    month_start = datetime(now.year, now.month, 1)
-    if now.month == 12:
-        next_month = datetime(now.year + 1, 1, 1)
-    else:
-        next_month = datetime(now.year, now.month + 1, 1)
+async def kpi(db: AsyncSession = Depends(get_async_read_db), _: User = Depends(get_current_user_async)):
+    # Rollup del mese corrente (vedi app.services.kpi): una lettura per chiave primaria, dalla replica se c'è
+    mese = await load_kpi_month_async(db, periodo_of())
 
-    # KPI esistenti
-    preventivi_mese = db.query(QuoteVersion).filter(and_(QuoteVersion.created_at >= month_start, QuoteVersion.created_at < next_month)).count()
-    job_in_corso = db.query(Job).filter(Job.status == JobStatus.in_corso.value).count()
-    stock_basso = db.query(Filament).filter(Filament.peso_residuo_g <= Filament.soglia_min_g).count()
+    # Lo stock basso dipende dalle giacenze correnti, non dal mese
+    stock_basso = await db.scalar(select(func.count()).select_from(Filament).where(Filament.peso_residuo_g <= Filament.soglia_min_g))
 
-    jobs = db.query(Job).filter(Job.status == JobStatus.completato.value).limit(50).all()
-    ratios = []
-    for j in jobs:
-        qv = db.get(QuoteVersion, j.quote_version_id)
-        if qv and float(qv.totale_imponibile_eur) > 0:
-            ratios.append(float(j.margine_eur) / float(qv.totale_imponibile_eur) * 100)
-    margine_medio = sum(ratios) / len(ratios) if ratios else 0.0
-
-    # Nuovi KPI finanziari
-    # Ricavi: preventivi ACCETTATO del mese
-    ricavi = db.query(func.sum(QuoteVersion.totale_imponibile_eur)).filter(
-        and_(
-            QuoteVersion.status == QuoteStatus.ACCETTATO,
-            QuoteVersion.created_at >= month_start,
-            QuoteVersion.created_at < next_month
-        )
-    ).scalar() or 0.0
-
-    # Costi: somma cost_entries del periodo YYYY-MM
-    periodo_corrente = now.strftime("%Y-%m")
-    costi = db.query(func.sum(CostEntry.importo_eur)).filter(
-        CostEntry.periodo_yyyymm == periodo_corrente
-    ).scalar() or 0.0
-
-    # Utile
-    utile = float(ricavi) - float(costi)
-
-    # Clienti attivi: clienti con preventivi creati nel mese
-    quote_ids_this_month = db.query(QuoteVersion.quote_id).filter(
-        and_(
-            QuoteVersion.created_at >= month_start,
-            QuoteVersion.created_at < next_month
-        )
-    ).distinct().subquery()
-    
-    clienti_attivi = db.query(Quote.customer_id).filter(
-        Quote.id.in_(quote_ids_this_month)
-    ).distinct().count()
+    # Margine medio % ponderato dei job completati creati nel mese, come in /dashboard/margini
+    margine_medio = mese.margine_cents_somma * 100 / mese.ricavo_cents_somma if mese.ricavo_cents_somma else 0.0
 
     return DashboardKPI(
-        preventivi_mese=preventivi_mese,
-        job_in_corso=job_in_corso,
+        preventivi_mese=mese.preventivi_creati,
+        job_in_corso=mese.job_in_corso,
         stock_basso=stock_basso,
         margine_medio_pct=round(margine_medio, 2),
-        ricavi_mese_eur=round(float(ricavi), 2),
-        costi_mese_eur=round(float(costi), 2),
-        utile_mese_eur=round(utile, 2),
-        clienti_attivi=clienti_attivi,
+        ricavi_mese_eur=from_cents(mese.ricavi_accettati_cents),
+        costi_mese_eur=from_cents(mese.costi_cents),
+        utile_mese_eur=from_cents(mese.ricavi_accettati_cents - mese.costi_cents),
+        clienti_attivi=mese.clienti_attivi,
     )
+
+
+@router.get("/margini", response_model=list[MarginStatsOut])
+async def margini(
+    dal: date | None = Query(default=None, description="Job creati da questa data (inclusa)"),
+    al: date | None = Query(default=None, description="Job creati fino a questa data (inclusa)"),
+    giorni: int | None = Query(default=None, ge=1, description="In alternativa a dal/al: ultimi N giorni"),
+    group_by: GroupBy | None = Query(default=None, description="customer o printer"),
+    percentili: list[int] = Query(default=list(DEFAULT_PERCENTILES)),
+    db: AsyncSession = Depends(get_async_read_db),
+    _: User = Depends(get_current_user_async),
+):
+    """Margine medio ponderato, mediana e percentili dei job completati."""
+    if any(p < 1 or p > 100 for p in percentili):
+        raise HTTPException(status_code=400, detail="Percentili ammessi tra 1 e 100")
+    date_from = datetime.combine(dal, datetime.min.time()) if dal else None
+    date_to = datetime.combine(al + timedelta(days=1), datetime.min.time()) if al else None
+    if giorni:
+        date_from, date_to = datetime.utcnow() - timedelta(days=giorni), None
+    return [
+        MarginStatsOut(**vars(s), mediana_pct=s.mediana_pct)
+        for s in await margin_stats_async(db, date_from, date_to, group_by, tuple(percentili))
+    ]
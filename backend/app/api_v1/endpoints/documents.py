@@ -0,0 +1,61 @@
+from pathlib import Path
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from app.api_v1.deps import get_current_user, get_db, get_uow
+from app.db.unit_of_work import after_commit
+from app.models.document import DocumentTask, DocumentTaskKind, DocumentTaskStatus
+from app.models.quote import QuoteVersion
+from app.models.user import User, UserRole
+from app.schemas.document import DocumentTaskCreate, DocumentTaskOut
+from app.services.documents import notify_workers, submit_task
+
+router = APIRouter()
+
+MEDIA_TYPES = {DocumentTaskKind.quote_pdf.value: "application/pdf", DocumentTaskKind.quotes_zip.value: "application/zip"}
+
+
+def _get_task(db: Session, task_id: int, current: User) -> DocumentTask:
+    task = db.get(DocumentTask, task_id)
+    # i task sono visibili solo a chi li ha richiesti (e agli admin)
+    if not task or (task.created_by_id != current.id and current.role != UserRole.admin.value):
+        raise HTTPException(status_code=404, detail="Task non trovato")
+    return task
+
+
+@router.post("/tasks", response_model=DocumentTaskOut, status_code=status.HTTP_202_ACCEPTED)
+def create_task(
+    payload: DocumentTaskCreate,
+    db: Session = Depends(get_uow),
+    current: User = Depends(get_current_user),
+):
+    """Accoda la generazione di un documento e restituisce subito l'id del task."""
+    if payload.tipo == DocumentTaskKind.quote_pdf:
+        if not payload.quote_version_id:
+            raise HTTPException(status_code=400, detail="quote_version_id obbligatorio per QUOTE_PDF")
+        if not db.get(QuoteVersion, payload.quote_version_id):
+            raise HTTPException(status_code=404, detail="Versione non trovata")
+        params = {"quote_version_id": payload.quote_version_id}
+    else:
+        params = payload.model_dump(mode="json", exclude={"tipo", "quote_version_id"}, exclude_none=True)
+    task = submit_task(db, payload.tipo, params, current.id)
+    # i worker (avviati con l'app) vanno svegliati solo quando il task è visibile alle loro sessioni
+    after_commit(db, notify_workers)
+    return task
+
+
+@router.get("/tasks/{task_id}", response_model=DocumentTaskOut)
+def get_task(task_id: int, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+    return _get_task(db, task_id, current)
+
+
+@router.get("/tasks/{task_id}/download")
+def download_task(task_id: int, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+    task = _get_task(db, task_id, current)
+    if task.status != DocumentTaskStatus.completato.value:
+        raise HTTPException(status_code=409, detail=f"Documento non pronto (stato {task.status})")
+    if not task.result_path or not Path(task.result_path).exists():
+        raise HTTPException(status_code=410, detail="Documento non più disponibile")
+    return FileResponse(task.result_path, media_type=MEDIA_TYPES.get(task.tipo), filename=task.filename)
@@ -1,75 +1,122 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api_v1.deps import get_db, get_current_user, require_roles
-from app.models.inventory import Filament, InventoryMovement
+from app.api_v1.deps import get_async_db, get_current_user, get_current_user_async, get_uow, page_params, require_roles
+from app.models.inventory import Filament, InventoryMovement, MovementType
 from app.models.user import User, UserRole
-from app.schemas.inventory import FilamentCreate, FilamentOut, FilamentUpdate, MovementCreate, MovementOut
+from app.schemas.inventory import FilamentCreate, FilamentOut, FilamentStockOut, FilamentUpdate, MovementCreate, MovementOut
 from app.services.audit import log_action
 from app.services.inventory import apply_movement
+from app.services.pagination import PageParams, paginate_async
+from app.services.quotes import reprice_for_filament
+
+# Campi che entrano nel costo al grammo usato dai preventivi
+PRICING_FIELDS = ("costo_spool_eur", "peso_nominale_g")
+
+FILAMENT_SORT_KEYS = {"id": Filament.id, "created_at": Filament.created_at, "materiale": Filament.materiale}
+MOVEMENT_SORT_KEYS = {"id": InventoryMovement.id, "created_at": InventoryMovement.created_at}
 
 router = APIRouter()
 
 
 @router.get("/", response_model=list[FilamentOut])
-def list_filaments(db: Session = Depends(get_db), _: User = Depends(get_current_user)):
-    return db.query(Filament).order_by(Filament.id.desc()).all()
+async def list_filaments(
+    response: Response,
+    materiale: str | None = None,
+    stato: str | None = None,
+    ubicazione_id: int | None = None,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+    _: User = Depends(get_current_user_async),
+):
+    stmt = select(Filament)
+    if materiale:
+        stmt = stmt.where(Filament.materiale == materiale)
+    if stato:
+        stmt = stmt.where(Filament.stato == stato)
+    if ubicazione_id:
+        stmt = stmt.where(Filament.ubicazione_id == ubicazione_id)
+    return await paginate_async(db, stmt, FILAMENT_SORT_KEYS, page, response)
+
+
+@router.get("/summary", response_model=list[FilamentStockOut])
+async def filament_summary(db: AsyncSession = Depends(get_async_db), _: User = Depends(get_current_user_async)):
+    """Numero di bobine e peso residuo per stato: i totali non dipendono dalle pagine caricate."""
+    stmt = (
+        select(Filament.stato, func.count(Filament.id), func.coalesce(func.sum(Filament.peso_residuo_g), 0))
+        .group_by(Filament.stato)
+        .order_by(Filament.stato)
+    )
+    rows = (await db.execute(stmt)).all()
+    return [FilamentStockOut(stato=stato, filamenti=n, peso_residuo_g=peso) for stato, n, peso in rows]
 
 
 @router.post("/", response_model=FilamentOut, dependencies=[Depends(require_roles(UserRole.admin, UserRole.operator))])
-def create_filament(payload: FilamentCreate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def create_filament(payload: FilamentCreate, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     f = Filament(**payload.model_dump())
     f.created_by_id = current.id
     f.updated_by_id = current.id
     db.add(f)
-    db.commit()
-    db.refresh(f)
+    db.flush()
     log_action(db, current.id, "Filament", f.id, "CREATE")
-    db.commit()
     return f
 
 
 @router.put("/{filament_id}", response_model=FilamentOut, dependencies=[Depends(require_roles(UserRole.admin, UserRole.operator))])
-def update_filament(filament_id: int, payload: FilamentUpdate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def update_filament(filament_id: int, payload: FilamentUpdate, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     f = db.get(Filament, filament_id)
     if not f:
         raise HTTPException(status_code=404, detail="Filamento non trovato")
-    for k, v in payload.model_dump(exclude_unset=True).items():
+    data = payload.model_dump(exclude_unset=True)
+    pricing_changed = any(k in data and float(data[k] or 0) != float(getattr(f, k) or 0) for k in PRICING_FIELDS)
+    for k, v in data.items():
         setattr(f, k, v)
     f.updated_by_id = current.id
-    db.commit()
-    db.refresh(f)
     log_action(db, current.id, "Filament", f.id, "UPDATE")
-    db.commit()
+    if pricing_changed:
+        # riprezza solo le bozze/inviati che usano questo filamento; il flush
+        # serve perché il ricalcolo rilegge il costo della bobina dal database
+        db.flush()
+        reprice_for_filament(db, f.id)
     return f
 
 
 @router.delete("/{filament_id}", dependencies=[Depends(require_roles(UserRole.admin))])
-def delete_filament(filament_id: int, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def delete_filament(filament_id: int, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     f = db.get(Filament, filament_id)
     if not f:
         raise HTTPException(status_code=404, detail="Filamento non trovato")
-    db.delete(f)
-    db.commit()
     log_action(db, current.id, "Filament", filament_id, "DELETE")
-    db.commit()
+    db.delete(f)
     return {"ok": True}
 
 
 @router.post("/movements", response_model=MovementOut, dependencies=[Depends(require_roles(UserRole.admin, UserRole.operator))])
-def create_movement(payload: MovementCreate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def create_movement(payload: MovementCreate, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     m = InventoryMovement(**payload.model_dump())
     m.created_by_id = current.id
     m.updated_by_id = current.id
     db.add(m)
     apply_movement(db, m)
-    db.commit()
-    db.refresh(m)
+    db.flush()
     log_action(db, current.id, "InventoryMovement", m.id, "CREATE")
-    db.commit()
     return m
 
 
 @router.get("/movements", response_model=list[MovementOut])
-def list_movements(db: Session = Depends(get_db), _: User = Depends(get_current_user)):
-    return db.query(InventoryMovement).order_by(InventoryMovement.id.desc()).limit(200).all()
+async def list_movements(
+    response: Response,
+    filament_id: int | None = None,
+    tipo: MovementType | None = None,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+    _: User = Depends(get_current_user_async),
+):
+    stmt = select(InventoryMovement)
+    if filament_id:
+        stmt = stmt.where(InventoryMovement.filament_id == filament_id)
+    if tipo:
+        stmt = stmt.where(InventoryMovement.tipo == tipo)
+    return await paginate_async(db, stmt, MOVEMENT_SORT_KEYS, page, response)
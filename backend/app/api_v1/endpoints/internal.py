@@ -0,0 +1,60 @@
+"""Endpoint interni di diagnostica, riservati agli amministratori."""
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+
+from app.api_v1.deps import require_roles
+from app.core.config import settings
+from app.core.profiler import profiler
+from app.db import session, slow_queries
+from app.db.pool import pool_stats
+from app.models.user import UserRole
+
+router = APIRouter(dependencies=[Depends(require_roles(UserRole.admin))])
+
+
+@router.get("/pool")
+def pool():
+    """Stato dei pool di connessioni di questo processo: occupazione, attese, latenza del checkout."""
+    stats = {
+        "primary": pool_stats(session.engine),
+        "async": pool_stats(session.async_engine.sync_engine),
+    }
+    if session.ReplicaSessionLocal is not None:
+        stats["replica"] = pool_stats(session.replica_engine)
+        stats["async_replica"] = pool_stats(session.async_replica_engine.sync_engine)
+    return stats
+
+
+@router.get("/replica")
+def replica():
+    """Uso della replica per le letture e ultimo ritardo misurato."""
+    return session.read_router.status()
+
+
+@router.get("/profiles")
+def profiles():
+    """Profili nel buffer, dal più recente: richiesti con ``X-Profile`` o richieste lente."""
+    return [p.summary() for p in profiler.profiles()]
+
+
+@router.get("/profiles/{profile_id}")
+def download_profile(profile_id: int, formato: Literal["speedscope", "collapsed"] = "speedscope"):
+    """Profilo come JSON speedscope (https://www.speedscope.app) o stack collassati per flamegraph."""
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profilo non trovato (uscito dal buffer?)")
+    if formato == "collapsed":
+        content, media_type, ext = profile.collapsed(), "text/plain", "txt"
+    else:
+        content, media_type, ext = profile.speedscope_json(), "application/json", "speedscope.json"
+    return Response(content, media_type=media_type, headers={"Content-Disposition": f"attachment; filename=profilo_{profile_id}.{ext}"})
+
+
+@router.get("/slow-queries")
+def slow_query_log(limit: int = Query(50, ge=1, le=500)):
+    """Ultime query oltre ``SLOW_QUERY_MS`` in questo processo, dalla più recente."""
+    return {
+        "threshold_ms": settings.SLOW_QUERY_MS,
+        "queries": [q.to_dict() for q in slow_queries.recent(limit)],
+    }
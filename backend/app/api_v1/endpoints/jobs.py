@@ -1,13 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
+from functools import partial
 
-from app.api_v1.deps import get_db, get_current_user, require_roles
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.api_v1.deps import get_async_db, get_current_user, get_current_user_async, get_uow, page_params, require_roles
+from app.core.metrics import JOBS_COMPLETED
+from app.db.unit_of_work import after_commit
 from app.models.job import Job, JobConsumption, JobStatus
 from app.models.quote import QuoteVersion, QuoteStatus
 from app.models.user import User, UserRole
-from app.schemas.job import JobCreateFromQuote, JobOut, JobUpdate, JobConsumptionCreate
+from app.schemas.job import JobBulkResult, JobBulkStatusOut, JobBulkStatusUpdate, JobCreateFromQuote, JobOut, JobUpdate, JobConsumptionCreate
 from app.services.audit import log_action
-from app.services.jobs import recalc_job, create_job_cost_entries
+from app.services.jobs import bulk_transition_jobs, recalc_job, create_job_cost_entries
+from app.services.kpi import job_kpi_state, record_job_change
+from app.services.pagination import PageParams, paginate_async
 from app.models.costs import CostEntry
 
 router = APIRouter()
@@ -20,16 +28,29 @@ def job_to_out(job: Job) -> JobOut:
     return JobOut(**job_dict)
 
 
+JOB_SORT_KEYS = {"id": Job.id, "created_at": Job.created_at}
+
+
 @router.get("/", response_model=list[JobOut])
-def list_jobs(db: Session = Depends(get_db), _: User = Depends(get_current_user)):
-    jobs = db.query(Job).options(joinedload(Job.quote_version).joinedload(QuoteVersion.quote)).order_by(Job.id.desc()).all()
+async def list_jobs(
+    response: Response,
+    status: JobStatus | None = None,
+    quote_version_id: int | None = None,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+    _: User = Depends(get_current_user_async),
+):
+    stmt = select(Job).options(joinedload(Job.quote_version).joinedload(QuoteVersion.quote), selectinload(Job.consumi))
+    if status:
+        stmt = stmt.where(Job.status == status.value)
+    if quote_version_id:
+        stmt = stmt.where(Job.quote_version_id == quote_version_id)
+    jobs = await paginate_async(db, stmt, JOB_SORT_KEYS, page, response)
     return [job_to_out(job) for job in jobs]
 
 
 @router.post("/from-quote", response_model=JobOut, dependencies=[Depends(require_roles(UserRole.admin, UserRole.operator))])
-def create_from_quote(payload: JobCreateFromQuote, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    from app.models.quote import QuoteLine  # Import per joinedload
-    
+def create_from_quote(payload: JobCreateFromQuote, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     # Carica QuoteVersion con le righe (eager loading)
     qv = db.query(QuoteVersion).options(
         joinedload(QuoteVersion.righe),
@@ -65,41 +86,37 @@ def create_from_quote(payload: JobCreateFromQuote, db: Session = Depends(get_db)
     job.created_by_id = current.id
     job.updated_by_id = current.id
     db.add(job)
-    db.flush()  # Flush per ottenere job.id prima di aggiungere consumi
     
-    # Copia i consumi materiali dal preventivo
+    # Copia i consumi materiali dal preventivo (nella collezione del job, così recalc_job li vede)
     for line in qv.righe:
         if line.filament_id and line.peso_materiale_g > 0:
             cons = JobConsumption(
-                job_id=job.id,
                 filament_id=line.filament_id,
                 peso_g=int(line.peso_materiale_g * line.quantita),  # Moltiplica per quantità
             )
             cons.created_by_id = current.id
             cons.updated_by_id = current.id
-            db.add(cons)
+            job.consumi.append(cons)
+    job.quote_version = qv  # quote_code dalla versione già caricata, senza rileggere il job
+    db.flush()  # id e created_at del job
     
     # Ricalcola costi e margini
     recalc_job(db, job)
+    record_job_change(db, None, job_kpi_state(job))
     
-    db.commit()
-    db.refresh(job)
     log_action(db, current.id, "Job", job.id, "CREATE")
-    db.commit()
-    # Eager load per popolare quote_code
-    db.refresh(job)
-    job = db.query(Job).options(joinedload(Job.quote_version).joinedload(QuoteVersion.quote)).filter(Job.id == job.id).first()
     return job_to_out(job)
 
 
 @router.put("/{job_id}", response_model=JobOut, dependencies=[Depends(require_roles(UserRole.admin, UserRole.operator))])
-def update_job(job_id: int, payload: JobUpdate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def update_job(job_id: int, payload: JobUpdate, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     job = db.query(Job).options(joinedload(Job.quote_version).joinedload(QuoteVersion.quote)).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job non trovato")
     
     # Salva lo status precedente per verificare se cambia
     old_status = job.status
+    kpi_prima = job_kpi_state(job)
     
     for k, v in payload.model_dump(exclude_unset=True).items():
         # convert enum objects to their string value before assignment so the
@@ -108,39 +125,53 @@ def update_job(job_id: int, payload: JobUpdate, db: Session = Depends(get_db), c
             v = v.value
         setattr(job, k, v)
     job.updated_by_id = current.id
-    recalc_job(db, job)
+    breakdown = recalc_job(db, job)
     
-    # Se il job è appena stato completato, crea le voci di costo
+    # Se il job è appena stato completato, crea le voci di costo dalla stessa scomposizione
     if old_status != JobStatus.completato.value and job.status == JobStatus.completato.value:
-        create_job_cost_entries(db, job, current.id)
+        create_job_cost_entries(db, job, current.id, breakdown)
+        after_commit(db, JOBS_COMPLETED.inc)
+    record_job_change(db, kpi_prima, job_kpi_state(job))
     
-    db.commit()
-    db.refresh(job)
     log_action(db, current.id, "Job", job.id, "UPDATE")
-    db.commit()
     return job_to_out(job)
 
 
+@router.post("/bulk-status", response_model=JobBulkStatusOut, dependencies=[Depends(require_roles(UserRole.admin, UserRole.operator))])
+def bulk_update_status(payload: JobBulkStatusUpdate, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
+    """Completa o annulla più job in un'unica transazione, con esito per job."""
+    results = bulk_transition_jobs(db, payload.job_ids, payload.status.value, current.id)
+    completati = sum(1 for error in results.values() if error is None) if payload.status == JobStatus.completato else 0
+    if completati:
+        after_commit(db, partial(JOBS_COMPLETED.inc, amount=completati))
+    for job_id, error in results.items():
+        if error is None:
+            log_action(db, current.id, "Job", job_id, "STATUS", details=payload.status.value)
+    risultati = [JobBulkResult(job_id=job_id, ok=error is None, error=error) for job_id, error in results.items()]
+    aggiornati = sum(1 for r in risultati if r.ok)
+    return JobBulkStatusOut(status=payload.status, aggiornati=aggiornati, errori=len(risultati) - aggiornati, risultati=risultati)
+
+
 @router.post("/{job_id}/consumi", response_model=JobOut, dependencies=[Depends(require_roles(UserRole.admin, UserRole.operator))])
-def add_consumption(job_id: int, payload: JobConsumptionCreate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def add_consumption(job_id: int, payload: JobConsumptionCreate, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     job = db.query(Job).options(joinedload(Job.quote_version).joinedload(QuoteVersion.quote)).filter(Job.id == job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job non trovato")
-    cons = JobConsumption(job_id=job_id, filament_id=payload.filament_id, peso_g=payload.peso_g)
+    kpi_prima = job_kpi_state(job)
+    cons = JobConsumption(filament_id=payload.filament_id, peso_g=payload.peso_g)
     cons.created_by_id = current.id
     cons.updated_by_id = current.id
-    db.add(cons)
+    job.consumi.append(cons)
     job.updated_by_id = current.id
     recalc_job(db, job)
-    db.commit()
-    db.refresh(job)
+    record_job_change(db, kpi_prima, job_kpi_state(job))
     log_action(db, current.id, "Job", job.id, "UPDATE", details="aggiunto consumo")
-    db.commit()
+    db.flush()  # id del nuovo consumo nella risposta
     return job_to_out(job)
 
 
 @router.delete("/{job_id}", dependencies=[Depends(require_roles(UserRole.admin, UserRole.operator))])
-def delete_job(job_id: int, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def delete_job(job_id: int, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     job = db.get(Job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job non trovato")
@@ -149,6 +180,6 @@ def delete_job(job_id: int, db: Session = Depends(get_db), current: User = Depen
     db.query(CostEntry).filter(CostEntry.job_id == job_id).update({"job_id": None})
     
     log_action(db, current.id, "Job", job.id, "DELETE")
+    record_job_change(db, job_kpi_state(job), None)
     db.delete(job)
-    db.commit()
     return {"ok": True}
@@ -1,35 +1,48 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.api_v1.deps import get_db, get_current_user, require_roles
+from app.api_v1.deps import get_async_db, get_db, get_current_user, get_current_user_async, get_uow, page_params, require_roles
 from app.models.user import User, UserRole
-from app.models.printer import Printer
+from app.models.printer import Printer, PrinterStatus
 from app.schemas.printer import PrinterCreate, PrinterUpdate, PrinterOut
+from app.services.pagination import PageParams, paginate_async
+from app.services.quotes import reprice_for_printer
+
+# Campi che entrano nel costo orario e nell'energia usati dai preventivi
+PRICING_FIELDS = ("potenza_w", "costo_macchina_eur", "vita_stimata_h", "manutenzione_eur_h")
+PRINTER_SORT_KEYS = {"id": Printer.id, "created_at": Printer.created_at, "nome": Printer.nome}
 
 router = APIRouter()
 
 
 @router.get("", response_model=List[PrinterOut])
-def list_printers(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def list_printers(
+    response: Response,
+    stato: PrinterStatus | None = None,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
 ):
-    """Lista tutte le stampanti"""
-    return db.query(Printer).order_by(Printer.id).all()
+    """Lista le stampanti, una pagina alla volta"""
+    stmt = select(Printer)
+    if stato:
+        stmt = stmt.where(Printer.stato == stato)
+    return await paginate_async(db, stmt, PRINTER_SORT_KEYS, page, response, default_sort="id")
 
 
 @router.post("", response_model=PrinterOut, dependencies=[Depends(require_roles(UserRole.admin, UserRole.operator))])
 def create_printer(
     payload: PrinterCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_uow),
     current_user: User = Depends(get_current_user),
 ):
     """Crea una nuova stampante"""
     printer = Printer(**payload.model_dump())
     db.add(printer)
-    db.commit()
-    db.refresh(printer)
+    db.flush()
     return printer
 
 
@@ -50,7 +63,7 @@ def get_printer(
 def update_printer(
     printer_id: int,
     payload: PrinterUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_uow),
     current_user: User = Depends(get_current_user),
 ):
     """Aggiorna una stampante esistente"""
@@ -59,18 +72,25 @@ def update_printer(
         raise HTTPException(status_code=404, detail="Stampante non trovata")
     
     update_data = payload.model_dump(exclude_unset=True)
+    pricing_changed = any(
+        field in update_data and update_data[field] is not None and float(update_data[field]) != float(getattr(printer, field) or 0)
+        for field in PRICING_FIELDS
+    )
     for field, value in update_data.items():
         setattr(printer, field, value)
     
-    db.commit()
-    db.refresh(printer)
+    if pricing_changed:
+        # riprezza solo le bozze/inviati che usano questa stampante; il flush
+        # serve perché il ricalcolo rilegge la stampante dal database
+        db.flush()
+        reprice_for_printer(db, printer.id)
     return printer
 
 
 @router.delete("/{printer_id}", dependencies=[Depends(require_roles(UserRole.admin, UserRole.operator))])
 def delete_printer(
     printer_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_uow),
     current_user: User = Depends(get_current_user),
 ):
     """Elimina una stampante"""
@@ -79,9 +99,7 @@ def delete_printer(
         raise HTTPException(status_code=404, detail="Stampante non trovata")
     
     db.delete(printer)
-    db.commit()
     return {"detail": "Stampante eliminata con successo"}
     
     db.delete(printer)
-    db.commit()
     return {"detail": "Stampante eliminata con successo"}
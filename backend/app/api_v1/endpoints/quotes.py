@@ -1,41 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
-from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta
 
-from app.api_v1.deps import get_db, get_current_user, require_roles
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload, sessionmaker
+
+from app.api_v1.deps import get_async_db, get_db, get_current_user, get_current_user_async, get_uow, get_session_factory, page_params, require_roles
 from app.models.quote import Quote, QuoteLine, QuoteVersion, QuoteStatus
 from app.models.job import Job
 from app.models.user import User, UserRole
-from app.schemas.quote import QuoteCreate, QuoteOut, QuoteVersionCreate, QuoteVersionOut, QuoteVersionUpdate
+from app.schemas.quote import (
+    QuoteCreate,
+    QuoteOut,
+    QuoteVersionCreate,
+    QuoteVersionOut,
+    QuoteVersionUpdate,
+    QuoteWhatIfOut,
+    QuoteWhatIfRequest,
+)
 from app.services.audit import log_action
+from app.services.kpi import accepted_revenue_cents, record_quote_deleted, record_quote_revenue, record_quote_version_created
+from app.services.pagination import PageParams, paginate_async
 from app.services.quotes import recalc_quote_version
-from app.services.pdf import render_quote_pdf
+from app.services.quote_grid import what_if_grid
+from app.services.pdf import QuotePdfData, quote_pdf_data
+from app.services.pdf_cache import get_or_render_pdf
+from app.services.pdf_export import PdfExportFilter, stream_quote_pdfs_zip
 from app.db import settings as db_settings
 
 router = APIRouter()
 
 
+QUOTE_SORT_KEYS = {"id": Quote.id, "created_at": Quote.created_at, "codice": Quote.codice}
+
+
 @router.get("/", response_model=list[QuoteOut])
-def list_quotes(db: Session = Depends(get_db), _: User = Depends(get_current_user)):
-    return db.query(Quote).order_by(Quote.id.desc()).all()
+async def list_quotes(
+    response: Response,
+    customer_id: int | None = None,
+    codice: str | None = Query(default=None, description="Prefisso del codice"),
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+    _: User = Depends(get_current_user_async),
+):
+    stmt = select(Quote)
+    if customer_id:
+        stmt = stmt.where(Quote.customer_id == customer_id)
+    if codice:
+        stmt = stmt.where(Quote.codice.startswith(codice, autoescape=True))
+    return await paginate_async(db, stmt, QUOTE_SORT_KEYS, page, response)
 
 
 @router.post("/", response_model=QuoteOut, dependencies=[Depends(require_roles(UserRole.admin, UserRole.sales, UserRole.operator))])
-def create_quote(payload: QuoteCreate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def create_quote(payload: QuoteCreate, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     if db.query(Quote).filter(Quote.codice == payload.codice).first():
         raise HTTPException(status_code=400, detail="Codice preventivo già esistente")
     q = Quote(**payload.model_dump())
     q.created_by_id = current.id
     q.updated_by_id = current.id
     db.add(q)
-    db.commit()
-    db.refresh(q)
+    db.flush()
     log_action(db, current.id, "Quote", q.id, "CREATE")
-    db.commit()
     return q
 
 
 @router.delete("/{quote_id}", dependencies=[Depends(require_roles(UserRole.admin, UserRole.sales))])
-def delete_quote(quote_id: int, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def delete_quote(quote_id: int, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     q = db.get(Quote, quote_id)
     if not q:
         raise HTTPException(status_code=404, detail="Preventivo non trovato")
@@ -52,8 +84,8 @@ def delete_quote(quote_id: int, db: Session = Depends(get_db), current: User = D
                 )
     
     log_action(db, current.id, "Quote", q.id, "DELETE")
+    record_quote_deleted(db, q)
     db.delete(q)
-    db.commit()
     return {"ok": True}
 
 
@@ -66,7 +98,7 @@ def list_versions(quote_id: int, db: Session = Depends(get_db), _: User = Depend
 
 
 @router.post("/{quote_id}/versions", response_model=QuoteVersionOut, dependencies=[Depends(require_roles(UserRole.admin, UserRole.sales, UserRole.operator))])
-def create_version(quote_id: int, payload: QuoteVersionCreate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def create_version(quote_id: int, payload: QuoteVersionCreate, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     q = db.get(Quote, quote_id)
     if not q:
         raise HTTPException(status_code=404, detail="Preventivo non trovato")
@@ -94,18 +126,18 @@ def create_version(quote_id: int, payload: QuoteVersionCreate, db: Session = Dep
         qv.righe.append(QuoteLine(**line_in.model_dump()))
     db.add(qv)
     recalc_quote_version(db, qv)
-    db.commit()
-    db.refresh(qv)
+    record_quote_version_created(db, qv, q.customer_id)
+    db.flush()
     log_action(db, current.id, "QuoteVersion", qv.id, "CREATE")
-    db.commit()
     return qv
 
 
 @router.put("/versions/{version_id}", response_model=QuoteVersionOut, dependencies=[Depends(require_roles(UserRole.admin, UserRole.sales, UserRole.operator))])
-def update_version(version_id: int, payload: QuoteVersionUpdate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def update_version(version_id: int, payload: QuoteVersionUpdate, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     qv = db.get(QuoteVersion, version_id)
     if not qv:
         raise HTTPException(status_code=404, detail="Versione non trovata")
+    ricavo_prima = accepted_revenue_cents(qv)
     data = payload.model_dump(exclude_unset=True)
     righe = data.pop("righe", None)
     for k, v in data.items():
@@ -116,37 +148,80 @@ def update_version(version_id: int, payload: QuoteVersionUpdate, db: Session = D
             qv.righe.append(QuoteLine(**line_in.model_dump()))
     qv.updated_by_id = current.id
     recalc_quote_version(db, qv)
-    db.commit()
-    db.refresh(qv)
+    record_quote_revenue(db, qv, ricavo_prima)
     log_action(db, current.id, "QuoteVersion", qv.id, "UPDATE")
-    db.commit()
+    if righe is not None:
+        db.flush()  # id delle nuove righe nella risposta
     return qv
 
 
-@router.get("/versions/{version_id}/pdf")
-def download_pdf(version_id: int, db: Session = Depends(get_db), _: User = Depends(get_current_user)):
-    qv = db.get(QuoteVersion, version_id)
+@router.post("/versions/{version_id}/what-if", response_model=QuoteWhatIfOut)
+def what_if(version_id: int, payload: QuoteWhatIfRequest, db: Session = Depends(get_db), _: User = Depends(get_current_user)):
+    """Simula il totale su una griglia di parametri senza salvare nulla."""
+    qv = db.query(QuoteVersion).options(selectinload(QuoteVersion.righe)).filter(QuoteVersion.id == version_id).first()
+    if not qv:
+        raise HTTPException(status_code=404, detail="Versione non trovata")
+    grid = what_if_grid(db, qv, **payload.model_dump())
+    columns = {k: v if isinstance(v, list) else v.tolist() for k, v in grid.items()}
+    return QuoteWhatIfOut(version_id=qv.id, punti=len(columns["margine_pct"]), **columns)
+
+
+def _load_pdf_data(db: Session, version_id: int) -> QuotePdfData:
+    qv = db.query(QuoteVersion).options(selectinload(QuoteVersion.righe)).filter(QuoteVersion.id == version_id).first()
     if not qv:
         raise HTTPException(status_code=404, detail="Versione non trovata")
     quote = db.get(Quote, qv.quote_id)
     if not quote:
         raise HTTPException(status_code=404, detail="Preventivo non trovato")
-    # eager load customer
-    _ = quote.customer
-    settings = db_settings.get_settings(db)
-    pdf_bytes, filename = render_quote_pdf(quote, qv, settings)
-    return Response(content=pdf_bytes, media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename={filename}"})
+    return quote_pdf_data(quote, qv, db_settings.get_settings(db))
+
+
+@router.get("/versions/{version_id}/pdf")
+async def download_pdf(version_id: int, request: Request, db: Session = Depends(get_db), _: User = Depends(get_current_user)):
+    # Lettura DB nel threadpool, rendering nel pool di processi: nessun thread bloccato in attesa del PDF
+    data = await run_in_threadpool(_load_pdf_data, db, version_id)
+    key = data.cache_key()
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in (tag.strip() for tag in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers=headers)
+    pdf_bytes = await get_or_render_pdf(data, key)
+    headers["Content-Disposition"] = f"attachment; filename={data.filename}"
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
+
+
+@router.get("/export/pdf")
+def export_pdfs(
+    dal: date | None = Query(default=None, description="Versioni create da questa data (inclusa)"),
+    al: date | None = Query(default=None, description="Versioni create fino a questa data (inclusa)"),
+    status: QuoteStatus | None = None,
+    customer_id: int | None = None,
+    session_factory: sessionmaker = Depends(get_session_factory),
+    _: User = Depends(get_current_user),
+):
+    """Archivio ZIP con i PDF delle versioni filtrate, generato in streaming."""
+    flt = PdfExportFilter(
+        date_from=datetime.combine(dal, datetime.min.time()) if dal else None,
+        date_to=datetime.combine(al + timedelta(days=1), datetime.min.time()) if al else None,
+        status=status,
+        customer_id=customer_id,
+    )
+    filename = f"preventivi_{(dal or date.today()).strftime('%Y%m%d')}.zip"
+    return StreamingResponse(
+        stream_quote_pdfs_zip(session_factory, flt),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
 
 
 @router.post("/versions/{version_id}/set-status", response_model=QuoteVersionOut, dependencies=[Depends(require_roles(UserRole.admin, UserRole.sales, UserRole.operator))])
-def set_status(version_id: int, status_in: QuoteStatus, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def set_status(version_id: int, status_in: QuoteStatus, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     qv = db.get(QuoteVersion, version_id)
     if not qv:
         raise HTTPException(status_code=404, detail="Versione non trovata")
+    ricavo_prima = accepted_revenue_cents(qv)
     qv.status = status_in
     qv.updated_by_id = current.id
-    db.commit()
-    db.refresh(qv)
+    record_quote_revenue(db, qv, ricavo_prima)
     log_action(db, current.id, "QuoteVersion", qv.id, "STATUS", details=str(status_in))
-    db.commit()
     return qv
@@ -1,11 +1,16 @@
+from functools import partial
+
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.api_v1.deps import get_db, require_roles, get_current_user
-from app.core.security import get_password_hash
+from app.api_v1.deps import get_db, require_roles, get_current_user, get_uow
+from app.core.security import get_password_hash_async
+from app.db.unit_of_work import after_commit
 from app.models.user import User, UserRole
 from app.schemas.user import UserCreate, UserOut, UserUpdate
 from app.services.audit import log_action
+from app.services.user_cache import invalidate_user
 
 router = APIRouter()
 
@@ -20,89 +25,105 @@ def list_users(db: Session = Depends(get_db)):
     return db.query(User).order_by(User.id).all()
 
 
+# Come il login: le query girano nel threadpool, pbkdf2 nell'executor dedicato
+# degli hash; nessun thread delle richieste resta fermo durante l'hashing.
+
+
+def _email_taken(db: Session, email: str) -> bool:
+    return db.query(User).filter(User.email == email).first() is not None
+
+
+def _add_user(db: Session, u: User, actor_user_id: int | None) -> User:
+    db.add(u)
+    db.flush()
+    if actor_user_id is not None:
+        log_action(db, actor_user_id, "User", u.id, "CREATE")
+    return u
+
+
+def _get_user(db: Session, user_id: int) -> User:
+    u = db.get(User, user_id)
+    if not u:
+        raise HTTPException(status_code=404, detail="Utente non trovato")
+    return u
+
+
 @router.post("/", response_model=UserOut, dependencies=[Depends(require_roles(UserRole.admin))])
-def create_user(payload: UserCreate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    if db.query(User).filter(User.email == payload.email).first():
+async def create_user(payload: UserCreate, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
+    if await run_in_threadpool(_email_taken, db, payload.email):
         raise HTTPException(status_code=400, detail="Email già esistente")
     u = User(
         email=payload.email,
         full_name=payload.full_name,
         role=payload.role,
         is_active=payload.is_active,
-        hashed_password=get_password_hash(payload.password),
+        hashed_password=await get_password_hash_async(payload.password),
         must_reset_password=True,
     )
-    db.add(u)
-    db.commit()
-    db.refresh(u)
-    log_action(db, current.id, "User", u.id, "CREATE")
-    db.commit()
-    return u
+    return await run_in_threadpool(_add_user, db, u, current.id)
+
+
+def _no_users(db: Session) -> bool:
+    return db.query(User).count() == 0
 
 
 @router.post("/first-admin", response_model=UserOut)
-def create_first_admin(payload: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).count() > 0:
+async def create_first_admin(payload: UserCreate, db: Session = Depends(get_uow)):
+    if not await run_in_threadpool(_no_users, db):
         raise HTTPException(status_code=403, detail="Admin già esistente")
-    if db.query(User).filter(User.email == payload.email).first():
+    if await run_in_threadpool(_email_taken, db, payload.email):
         raise HTTPException(status_code=400, detail="Email già esistente")
     u = User(
         email=payload.email,
         full_name=payload.full_name,
         role=UserRole.admin.value,
         is_active=True,
-        hashed_password=get_password_hash(payload.password),
+        hashed_password=await get_password_hash_async(payload.password),
     )
-    db.add(u)
-    db.commit()
-    db.refresh(u)
-    return u
+    return await run_in_threadpool(_add_user, db, u, None)
 
 
-@router.put("/{user_id}", response_model=UserOut, dependencies=[Depends(require_roles(UserRole.admin))])
-def update_user(user_id: int, payload: UserUpdate, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
-    u = db.get(User, user_id)
-    if not u:
-        raise HTTPException(status_code=404, detail="Utente non trovato")
+def _apply_update(db: Session, u: User, payload: UserUpdate, hashed_password: str | None, actor_user_id: int) -> None:
     if payload.full_name is not None:
         u.full_name = payload.full_name
     if payload.role is not None:
         u.role = payload.role
     if payload.is_active is not None:
         u.is_active = payload.is_active
-    if payload.password:
-        u.hashed_password = get_password_hash(payload.password)
-    db.commit()
-    db.refresh(u)
-    log_action(db, current.id, "User", u.id, "UPDATE")
-    db.commit()
+    if hashed_password:
+        u.hashed_password = hashed_password
+    log_action(db, actor_user_id, "User", u.id, "UPDATE")
+    after_commit(db, partial(invalidate_user, u.id))
+
+
+@router.put("/{user_id}", response_model=UserOut, dependencies=[Depends(require_roles(UserRole.admin))])
+async def update_user(user_id: int, payload: UserUpdate, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
+    u = await run_in_threadpool(_get_user, db, user_id)
+    hashed_password = await get_password_hash_async(payload.password) if payload.password else None
+    await run_in_threadpool(_apply_update, db, u, payload, hashed_password, current.id)
     return u
 
 
 @router.post("/{user_id}/reset-password", response_model=UserOut)
-def reset_password(user_id: int, payload: UserUpdate, db: Session = Depends(get_db)):
-    u = db.get(User, user_id)
-    if not u:
-        raise HTTPException(status_code=404, detail="Utente non trovato")
+async def reset_password(user_id: int, payload: UserUpdate, db: Session = Depends(get_uow)):
+    u = await run_in_threadpool(_get_user, db, user_id)
     if not payload.password:
         raise HTTPException(status_code=400, detail="Password mancante")
-    u.hashed_password = get_password_hash(payload.password)
+    # solo attributi: il flush avviene al commit dell'unità di lavoro
+    u.hashed_password = await get_password_hash_async(payload.password)
     u.must_reset_password = False
-    db.commit()
-    db.refresh(u)
+    after_commit(db, partial(invalidate_user, u.id))
     return u
 
 
 @router.post("/{user_id}/toggle-active", response_model=UserOut, dependencies=[Depends(require_roles(UserRole.admin))])
-def toggle_active(user_id: int, db: Session = Depends(get_db), current: User = Depends(get_current_user)):
+def toggle_active(user_id: int, db: Session = Depends(get_uow), current: User = Depends(get_current_user)):
     u = db.get(User, user_id)
     if not u:
         raise HTTPException(status_code=404, detail="Utente non trovato")
     if u.id == current.id:
         raise HTTPException(status_code=400, detail="Non puoi disattivare il tuo account")
     u.is_active = not u.is_active
-    db.commit()
-    db.refresh(u)
     log_action(db, current.id, "User", u.id, "TOGGLE_ACTIVE")
-    db.commit()
+    after_commit(db, partial(invalidate_user, u.id))
     return u
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api_v1.endpoints import auth, users, filaments, printers, locations, customers, quotes, jobs, costs, dashboard, settings
+from app.api_v1.endpoints import auth, users, filaments, printers, locations, customers, quotes, jobs, costs, dashboard, settings, documents, internal, audit
 
 api_router = APIRouter()
 
@@ -16,4 +16,7 @@ api_router.include_router(quotes.router, prefix="/quotes", tags=["quotes"])
 api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
 api_router.include_router(costs.router, prefix="/costs", tags=["costs"])
 api_router.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
+api_router.include_router(documents.router, prefix="/documents", tags=["documents"])
+api_router.include_router(audit.router, prefix="/audit", tags=["audit"])
+api_router.include_router(internal.router, prefix="/internal", tags=["internal"])
 
@@ -0,0 +1,65 @@
+"""Cache in memoria, per processo, limitata in dimensione e con scadenza."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, TypeVar
+
+from app.core.metrics import CACHE_REQUESTS
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Dizionario LRU di al massimo ``maxsize`` voci, ognuna valida per ``ttl`` secondi.
+
+    Thread-safe: è condivisa dai thread del threadpool di FastAPI. Con ``name``
+    hit e miss finiscono in ``cache_requests_total`` (app.core.metrics).
+    """
+
+    def __init__(self, maxsize: int, ttl: float, name: str = "") -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> V | None:
+        value = self._get(key)
+        if self.name:
+            CACHE_REQUESTS.inc(self.name, "miss" if value is None else "hit")
+        return value
+
+    def _get(self, key: K) -> V | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """Salva ``value``; ``ttl`` può solo accorciare la durata predefinita."""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
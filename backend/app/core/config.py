@@ -13,8 +13,30 @@ class Settings(BaseSettings):
     POSTGRES_USER: str = "printlab"
     POSTGRES_PASSWORD: str = "printlab"
 
+    # Pool di connessioni (per engine e per processo): con N worker uvicorn il
+    # database vede fino a N * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connessioni
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # secondi di attesa massima per una connessione
+    DB_POOL_RECYCLE: int = 1800  # secondi, riapre le connessioni più vecchie
+    DB_POOL_WAIT_WARN_MS: int = 200  # warning se il checkout attende oltre
+
+    # Replica in sola lettura per report e dashboard (URL SQLAlchemy sync, vuoto = nessuna)
+    DATABASE_REPLICA_URL: str = ""
+    REPLICA_MAX_LAG_SECONDS: float = 5.0  # oltre, le letture tornano sul primario
+    REPLICA_LAG_CHECK_SECONDS: float = 5.0
+
     SECRET_KEY: str = "CHANGE_ME_IN_PROD"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24
+    # Cache per processo di token decodificati e utenti attivi (0 = disattivata).
+    # Le modifiche agli utenti la invalidano nel processo che le esegue; negli
+    # altri processi valgono al più dopo AUTH_CACHE_TTL_SECONDS.
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_ENTRIES: int = 1024
+    # Hash password: iterazioni pbkdf2 (gli hash con valore diverso sono rigenerati al login)
+    # e thread dedicati al calcolo, separati dal threadpool delle richieste
+    PASSWORD_HASH_ROUNDS: int = 29000
+    PASSWORD_HASH_WORKERS: int = 2
 
     # allow both a JSON-style list (used by pydantic) or a comma-separated string
     # (`http://a,http://b`) from the environment.  PydanticSettings attempts to
@@ -27,6 +49,32 @@ class Settings(BaseSettings):
     ADMIN_PASSWORD: str = "admin123"
 
     LOG_LEVEL: str = "INFO"
+    # Statistiche SQL per richiesta: header X-DB-* (solo sviluppo) e warning
+    # quando lo stesso statement si ripete almeno SQL_REPEAT_WARN volte (0 = mai)
+    SQL_DEBUG_HEADERS: bool = False
+    SQL_REPEAT_WARN: int = 10
+    # Profiler a campionamento (app.core.profiler): header X-Profile per gli admin,
+    # profilo automatico delle richieste oltre PROFILE_SLOW_MS (0 = disattivato)
+    PROFILE_INTERVAL_MS: float = 5.0
+    PROFILE_SLOW_MS: int = 0
+    PROFILE_RING_SIZE: int = 20
+    # Query lente (app.db.slow_queries): soglia in ms (0 = disattivato), voci tenute
+    # per /internal/slow-queries, EXPLAIN ANALYZE delle SELECT lente (solo staging, PostgreSQL)
+    SLOW_QUERY_MS: float = 0
+    SLOW_QUERY_RING_SIZE: int = 200
+    SLOW_QUERY_EXPLAIN: bool = False
+
+    # PDF preventivi: processi di rendering (0 = nel threadpool) e cache su disco
+    PDF_RENDER_WORKERS: int = 2
+    PDF_CACHE_DIR: str = ""  # vuoto = cartella temporanea di sistema
+    PDF_CACHE_MAX_FILES: int = 500
+
+    # Coda documenti: thread worker per processo API (0 = nessuno, es. worker separato) e cartella dei risultati
+    DOCUMENT_WORKERS: int = 2
+    DOCUMENT_DIR: str = ""  # vuoto = cartella temporanea di sistema
+    DOCUMENT_HEARTBEAT_SECONDS: int = 30  # ogni processo segnala ogni tanto i task che sta eseguendo
+    DOCUMENT_STALE_MINUTES: int = 5  # task IN_CORSO senza segnale da più tempo tornano in coda (worker terminato)
+    DOCUMENT_RETENTION_HOURS: int = 24  # poi task conclusi e file prodotti vengono eliminati
 
     # Preventivo settings (Excel mapping)
     fattore_rischio: float = 0.10
@@ -44,6 +92,15 @@ class Settings(BaseSettings):
             f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        # stesso database, driver asyncpg per gli endpoint async
+        return self.DATABASE_URL.replace("+psycopg2", "+asyncpg", 1)
+
+    @property
+    def ASYNC_DATABASE_REPLICA_URL(self) -> str:
+        return self.DATABASE_REPLICA_URL.replace("+psycopg2", "+asyncpg", 1).replace("sqlite:", "sqlite+aiosqlite:", 1)
+
 
     @field_validator("CORS_ORIGINS", mode="before")
     @classmethod
@@ -0,0 +1,191 @@
+"""Contatori e istogrammi in memoria, per processo, esportati in formato testo Prometheus.
+
+Le metriche dell'applicazione sono dichiarate in fondo al modulo e registrate
+in :data:`REGISTRY`; ``GET /metrics`` restituisce :meth:`Registry.render`. Ogni
+aggiornamento è un incremento sotto lock: nessuna allocazione sul percorso
+caldo oltre alla prima combinazione di etichette.
+"""
+import threading
+from bisect import bisect_left
+
+# limiti superiori dei bucket in millisecondi
+DEFAULT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+SIZE_BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """Istogramma a bucket fissi (conteggi non cumulativi) con somma e massimo."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS_MS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # ultimo = oltre l'ultimo limite
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._counts[bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._max = max(self._max, value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            total, somma, massimo = sum(counts), self._sum, self._max
+        labels = [f"le_{b:g}" for b in self.buckets] + ["inf"]
+        return {
+            "count": total,
+            "sum": round(somma, 3),
+            "max": round(massimo, 3),
+            "buckets": dict(zip(labels, counts)),
+        }
+
+    def cumulative(self) -> tuple[list[int], float]:
+        """Conteggi cumulativi per bucket (l'ultimo è il totale) e somma, come li vuole Prometheus."""
+        with self._lock:
+            counts, somma = list(self._counts), self._sum
+        running, out = 0, []
+        for c in counts:
+            running += c
+            out.append(running)
+        return out, somma
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Contatore monotono, uno per combinazione di valori delle etichette."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {v:g}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Valore istantaneo (es. richieste in corso)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str) -> None:
+        super().__init__(name, help)
+        self._value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+    def value(self) -> float:
+        return self._value
+
+    def _samples(self) -> list[str]:
+        return [f"{self.name} {self._value:g}"]
+
+
+class LabeledHistogram(_Metric):
+    """Un :class:`Histogram` per combinazione di etichette; ``scale`` converte l'unità in uscita (ms -> s)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS_MS, scale: float = 1.0) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.scale = scale
+        self._children: dict[tuple[str, ...], Histogram] = {}
+
+    def labels(self, *labels: str) -> Histogram:
+        child = self._children.get(labels)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(labels, Histogram(self.buckets))
+        return child
+
+    def observe(self, value: float, *labels: str) -> None:
+        self.labels(*labels).observe(value)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            children = sorted(self._children.items())
+        lines = []
+        bounds = [f"{b * self.scale:g}" for b in self.buckets] + ["+Inf"]
+        for labels, hist in children:
+            counts, somma = hist.cumulative()
+            for le, c in zip(bounds, counts):
+                le_label = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le_label)} {c}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {somma * self.scale:g}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+# HTTP (MetricsMiddleware in app.core.middleware)
+HTTP_REQUESTS = REGISTRY.register(Counter("http_requests_total", "Richieste HTTP per metodo, route e stato", ("method", "route", "status")))
+HTTP_DURATION = REGISTRY.register(LabeledHistogram(
+    "http_request_duration_seconds", "Durata delle richieste HTTP", ("method", "route"), DEFAULT_BUCKETS_MS, scale=0.001,
+))
+HTTP_RESPONSE_SIZE = REGISTRY.register(LabeledHistogram(
+    "http_response_size_bytes", "Dimensione del corpo delle risposte HTTP", ("method", "route"), SIZE_BUCKETS_BYTES,
+))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge("http_requests_in_flight", "Richieste HTTP in corso"))
+
+# Dominio
+QUOTES_PRICED = REGISTRY.register(Counter("quotes_priced_total", "Versioni di preventivo ricalcolate"))
+JOBS_COMPLETED = REGISTRY.register(Counter("jobs_completed_total", "Job portati a COMPLETATO (dopo il commit)"))
+PDFS_RENDERED = REGISTRY.register(Counter("pdfs_rendered_total", "PDF di preventivi renderizzati (miss della cache)"))
+CACHE_REQUESTS = REGISTRY.register(Counter("cache_requests_total", "Letture delle cache per esito", ("cache", "result")))
@@ -0,0 +1,157 @@
+"""Middleware ASGI dell'applicazione (ASGI puro: nessun task in più per richiesta)."""
+import logging
+import time
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import HTTP_DURATION, HTTP_IN_FLIGHT, HTTP_REQUESTS, HTTP_RESPONSE_SIZE
+from app.core.profiler import profiler
+from app.core.security import decode_token
+from app.db import slow_queries
+from app.db.query_stats import track_queries
+from app.models.user import UserRole
+
+logger = logging.getLogger(__name__)
+
+DB_QUERIES_HEADER = "X-DB-Queries"
+DB_TIME_HEADER = "X-DB-Time-Ms"
+DB_REPEATED_HEADER = "X-DB-Repeated"
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+
+class QueryStatsMiddleware:
+    """Conta gli statement SQL di ogni richiesta e segnala quelli ripetuti (probabili N+1).
+
+    Con ``debug_headers`` aggiunge alla risposta ``X-DB-Queries``, ``X-DB-Time-Ms``
+    e, se c'è, lo statement più ripetuto in ``X-DB-Repeated`` (``<n>x <sql>``).
+    Gli statement eseguiti dopo l'inizio della risposta (streaming) finiscono
+    solo nel warning.
+    """
+
+    def __init__(self, app: ASGIApp, debug_headers: bool = False, repeat_warn: int = 0) -> None:
+        self.app = app
+        self.debug_headers = debug_headers
+        self.repeat_warn = repeat_warn
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats, slow_queries.request_scope(scope):
+            async def send_with_headers(message: Message) -> None:
+                if message["type"] == "http.response.start" and self.debug_headers:
+                    headers = MutableHeaders(scope=message)
+                    headers[DB_QUERIES_HEADER] = str(stats.count)
+                    headers[DB_TIME_HEADER] = f"{stats.time_ms:.1f}"
+                    repeated = stats.repeated()
+                    if repeated:
+                        sql, n = repeated[0]
+                        headers[DB_REPEATED_HEADER] = f"{n}x {sql[:200]}".encode("latin-1", "replace").decode("latin-1")
+                await send(message)
+
+            await self.app(scope, receive, send_with_headers)
+
+        if self.repeat_warn:
+            for sql, n in stats.repeated(self.repeat_warn):
+                logger.warning("possibile N+1 in %s %s: %sx %s", scope["method"], scope["path"], n, sql[:500])
+
+
+class MetricsMiddleware:
+    """Latenza, dimensione della risposta e stato per route, più le richieste in corso.
+
+    La route è il modello del percorso (``/api/v1/jobs/{job_id}``), non il
+    percorso effettivo: le serie restano poche. Le richieste senza route (404)
+    finiscono sotto ``<nessuna>``.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500  # se l'app solleva prima di rispondere
+        size = 0
+
+        async def send_counting(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_counting)
+        finally:
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", "<nessuna>")
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method, path, str(status))
+            HTTP_DURATION.observe(elapsed_ms, method, path)
+            HTTP_RESPONSE_SIZE.observe(size, method, path)
+
+
+def _is_admin(scope: Scope) -> bool:
+    auth = Headers(scope=scope).get("authorization", "")
+    scheme, _, token = auth.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        # ruolo dal token firmato: basta per attivare il campionamento, i profili
+        # si scaricano comunque solo dagli endpoint /internal riservati agli admin
+        return decode_token(token).get("role") == UserRole.admin.value
+    except Exception:
+        return False
+
+
+class ProfilerMiddleware:
+    """Profila una richiesta con l'header ``X-Profile: 1`` (solo admin) o, se ``slow_ms``, tutte quelle lente.
+
+    Il profilo finisce nel buffer di :data:`app.core.profiler.profiler`; la
+    risposta profilata su richiesta porta ``X-Profile-Id`` per scaricarlo da
+    ``/api/v1/internal/profiles/{id}``.
+    """
+
+    def __init__(self, app: ASGIApp, slow_ms: int = 0) -> None:
+        self.app = app
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested = PROFILE_HEADER.lower().encode() in dict(scope["headers"]) and _is_admin(scope)
+        if not requested and not self.slow_ms:
+            await self.app(scope, receive, send)
+            return
+
+        profile = profiler.begin(scope["method"], scope["path"], "richiesta" if requested else "lenta")
+        status = 500
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if requested:
+                    MutableHeaders(scope=message)[PROFILE_ID_HEADER] = str(profile.id)
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            keep = requested or elapsed_ms >= self.slow_ms
+            profiler.end(profile, elapsed_ms, status, keep=keep)
+            if keep and not requested:
+                logger.warning("richiesta lenta %s %s: %.0f ms, profilo %s", scope["method"], scope["path"], elapsed_ms, profile.id)
@@ -0,0 +1,75 @@
+"""Aritmetica monetaria a virgola fissa su interi.
+
+Gli importi sono centesimi interi, le tariffe (€/h, €/kWh) micro-euro interi,
+le percentuali centesimi di punto (22.5% -> 2250) e le quantità decimali
+(grammi, minuti di manodopera, kWh) centesimi o millesimi di unità. Ogni calcolo
+costruisce un numeratore e un denominatore interi e arrotonda una sola volta
+con :func:`div_round`, così i totali sono sempre la somma esatta delle righe
+mostrate e non servono conversioni ``float -> str -> Decimal`` nei cicli.
+
+I valori letti dal DB (``Numeric`` -> ``Decimal``) o dagli schemi (``float``)
+entrano con le funzioni ``to_*`` ed escono verso le colonne con
+:func:`from_cents`.
+"""
+from decimal import Decimal
+
+CENTS = 100
+MICRO = 1_000_000
+BP = 100
+HUNDREDTHS = 100
+MILLI = 1000
+PCT_SCALE = 100 * BP  # 100% in centesimi di punto
+
+Number = int | float | Decimal | None
+
+
+def _fixed(value: Number, scale: int) -> int:
+    if not value:
+        return 0
+    if isinstance(value, int):
+        return value * scale
+    return round(float(value) * scale)
+
+
+def to_cents(value: Number) -> int:
+    """Euro -> centesimi."""
+    return _fixed(value, CENTS)
+
+
+def to_micro(value: Number) -> int:
+    """Tariffa in euro (€/h, €/kWh, ...) -> micro-euro."""
+    return _fixed(value, MICRO)
+
+
+def to_bp(pct: Number) -> int:
+    """Percentuale -> centesimi di punto."""
+    return _fixed(pct, BP)
+
+
+def to_hundredths(quantity: Number) -> int:
+    """Quantità con due decimali (g, minuti) -> centesimi di unità."""
+    return _fixed(quantity, HUNDREDTHS)
+
+
+def to_milli(quantity: Number) -> int:
+    """Quantità con tre decimali (kWh) -> millesimi di unità."""
+    return _fixed(quantity, MILLI)
+
+
+def from_cents(cents: int) -> float:
+    """Centesimi -> euro, per le colonne ``Numeric(.., 2)`` e le risposte API."""
+    return cents / CENTS
+
+
+def div_round(num: int, den: int) -> int:
+    """``num / den`` arrotondato all'intero, metà al pari (come ``Decimal.quantize``)."""
+    q, r = divmod(num, den)
+    twice = 2 * r
+    if twice > den or (twice == den and q & 1):
+        q += 1
+    return q
+
+
+def apply_bp(cents: int, bp: int) -> int:
+    """Quota percentuale di un importo: ``cents * pct / 100``."""
+    return div_round(cents * bp, PCT_SCALE)
@@ -0,0 +1,185 @@
+"""Profiler a campionamento per singole richieste, con buffer circolare dei profili.
+
+Un thread campiona ogni ``PROFILE_INTERVAL_MS`` gli stack di tutti i thread
+(``sys._current_frames``) finché c'è almeno una registrazione attiva, e tiene
+solo gli stack che eseguono codice dell'applicazione: i thread fermi in attesa
+(threadpool libero, event loop in ``select``) non compaiono. Non serve
+strumentare il codice e il costo è nullo quando nessuno registra.
+
+Il campionamento vede tutto il processo: se altre richieste girano nello
+stesso momento, i loro stack finiscono nello stesso profilo. Per questo la
+registrazione su richiesta è pensata per una chiamata alla volta.
+
+I profili completati restano in un buffer circolare (``PROFILE_RING_SIZE``) e
+si scaricano come stack collassati (flamegraph.pl, speedscope) o come JSON
+speedscope.
+"""
+import itertools
+import json
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+
+from app.core.config import settings
+
+APP_DIR = str(Path(__file__).resolve().parent.parent)
+MAX_DEPTH = 128
+
+_ids = itertools.count(1)
+
+
+@dataclass
+class Profile:
+    id: int
+    method: str
+    path: str
+    motivo: str  # "richiesta" (header X-Profile) o "lenta" (oltre PROFILE_SLOW_MS)
+    interval_ms: float
+    started_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    duration_ms: float = 0.0
+    status: int = 0
+    stacks: Counter = field(default_factory=Counter)
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "motivo": self.motivo,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration_ms, 1),
+            "samples": self.samples,
+        }
+
+    def collapsed(self) -> str:
+        """Una riga per stack, ``radice;...;foglia conteggio``."""
+        return "".join(f"{';'.join(stack)} {n}\n" for stack, n in self.stacks.most_common())
+
+    def speedscope(self) -> dict:
+        frames: list[dict] = []
+        index: dict[str, int] = {}
+        samples, weights = [], []
+        for stack, n in self.stacks.most_common():
+            ids = []
+            for label in stack:
+                if label not in index:
+                    index[label] = len(frames)
+                    frames.append({"name": label})
+                ids.append(index[label])
+            samples.append(ids)
+            weights.append(n * self.interval_ms)
+        name = f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "printlab3d",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+    def speedscope_json(self) -> str:
+        return json.dumps(self.speedscope())
+
+
+@lru_cache(maxsize=8192)
+def _label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(APP_DIR):
+        filename = "app" + filename[len(APP_DIR):]
+    elif "site-packages/" in filename:
+        filename = filename.split("site-packages/", 1)[1]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class Sampler:
+    """Thread di campionamento condiviso dalle registrazioni attive; si ferma quando non ce ne sono."""
+
+    def __init__(self, interval_ms: float) -> None:
+        self.interval = interval_ms / 1000
+        self._profiles: dict[int, Profile] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def start(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+                self._thread.start()
+
+    def stop(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles.pop(profile.id, None)
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack, in_app = [], False
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    code = frame.f_code
+                    in_app = in_app or code.co_filename.startswith(APP_DIR)
+                    stack.append(code)
+                    frame = frame.f_back
+                if in_app:
+                    stacks.append(tuple(_label(code) for code in reversed(stack)))
+            with self._lock:  # dopo stop() il profilo non cambia più
+                for profile in self._profiles.values():
+                    profile.stacks.update(stacks)
+            time.sleep(self.interval)
+
+
+class Profiler:
+    def __init__(self, interval_ms: float, ring_size: int) -> None:
+        self.interval_ms = interval_ms
+        self.sampler = Sampler(interval_ms)
+        self._ring: deque[Profile] = deque(maxlen=ring_size)
+        self._lock = threading.Lock()
+
+    def begin(self, method: str, path: str, motivo: str) -> Profile:
+        profile = Profile(id=next(_ids), method=method, path=path, motivo=motivo, interval_ms=self.interval_ms)
+        self.sampler.start(profile)
+        return profile
+
+    def end(self, profile: Profile, duration_ms: float, status: int, keep: bool = True) -> None:
+        self.sampler.stop(profile)
+        if keep:
+            profile.duration_ms = duration_ms
+            profile.status = status
+            with self._lock:
+                self._ring.append(profile)
+
+    def profiles(self) -> list[Profile]:
+        with self._lock:
+            return list(reversed(self._ring))
+
+    def get(self, profile_id: int) -> Profile | None:
+        return next((p for p in self.profiles() if p.id == profile_id), None)
+
+
+profiler = Profiler(settings.PROFILE_INTERVAL_MS, settings.PROFILE_RING_SIZE)
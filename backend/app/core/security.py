@@ -1,3 +1,6 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
@@ -10,15 +13,54 @@ from app.core.config import settings
 # throws "password cannot be longer than 72 bytes" even for short secrets).
 # pbkdf2_sha256 is pure-Python, secure enough for this app and avoids the
 # external dependency.
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# min = max = default: ogni hash con un numero di iterazioni diverso da quello
+# configurato risulta da aggiornare (verify_and_update lo rigenera al login).
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=settings.PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__min_rounds=settings.PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__max_rounds=settings.PASSWORD_HASH_ROUNDS,
+)
 ALGORITHM = "HS256"
 
+# pbkdf2 è CPU-bound: gira in un executor dedicato e limitato, così un picco di
+# login non occupa il threadpool che serve gli altri endpoint sincroni.
+_hash_executor: ThreadPoolExecutor | None = None
+_hash_executor_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is None:
+            _hash_executor = ThreadPoolExecutor(max_workers=max(1, settings.PASSWORD_HASH_WORKERS), thread_name_prefix="password-hash")
+        return _hash_executor
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Verifica la password; se l'hash segue una policy superata restituisce anche quello nuovo."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def verify_and_update_async(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return await asyncio.wrap_future(_executor().submit(verify_and_update, plain_password, hashed_password))
+
+
 def get_password_hash(password: str) -> str:
+    """Hash calcolato nell'executor dedicato (il chiamante attende il risultato)."""
+    return _executor().submit(_hash, password).result()
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await asyncio.wrap_future(_executor().submit(_hash, password))
+
+
+def _hash(password: str) -> str:
     # bcrypt is limited to 72 *bytes*; passlib will raise a ValueError if a
     # longer secret is given.  We'll truncate on the byte level, then give
     # passlib a *string* that encodes to <=72 bytes.  This avoids issues where
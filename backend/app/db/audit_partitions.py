@@ -0,0 +1,22 @@
+"""Crea le partizioni mensili future di ``audit_logs``: ``python -m app.db.audit_partitions``.
+
+Lo esegue ``entrypoint.sh`` a ogni avvio del container, dopo le migrazioni; dove
+il backend resta acceso per mesi va pianificato anche una volta al mese (cron).
+Su database diversi da PostgreSQL non fa nulla.
+"""
+from app.db.session import SessionLocal
+from app.services.audit import ensure_partitions
+
+
+def main() -> None:
+    db = SessionLocal()
+    try:
+        create = ensure_partitions(db)
+        db.commit()
+        print(f"[audit] partizioni create: {', '.join(create) or 'nessuna'}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""Worker della coda documenti in un processo dedicato: ``python -m app.db.document_worker [thread]``.
+
+Da usare con ``DOCUMENT_WORKERS=0`` sui processi API per tenere il rendering
+fuori dai server web.
+"""
+import signal
+import sys
+import threading
+
+from app.core.logging import configure_logging
+from app.db.session import SessionLocal
+from app.services.documents import start_workers, stop_workers
+
+
+def main() -> None:
+    configure_logging()
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    start_workers(SessionLocal, count)
+    print(f"[documenti] {count} worker in ascolto")
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_workers()
+
+
+if __name__ == "__main__":
+    main()
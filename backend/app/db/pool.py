@@ -0,0 +1,101 @@
+"""Pool di connessioni strumentati: attese, timeout e latenza del checkout.
+
+``InstrumentedQueuePool`` (sync) e ``InstrumentedAsyncQueuePool`` (async)
+misurano il tempo passato in ``_do_get``, cioè l'attesa di una connessione
+libera più l'eventuale apertura di una nuova in overflow. Sopra
+``DB_POOL_WAIT_WARN_MS`` scrivono un warning: il pool è saturo e va allargato
+(``DB_POOL_SIZE`` / ``DB_MAX_OVERFLOW``) o le richieste tengono le connessioni
+troppo a lungo.
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.core.config import settings
+from app.core.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.waiting = 0
+        self.slow_waits = 0
+        self.wait_ms = Histogram()
+        self._lock = threading.Lock()
+
+    def add(self, **deltas: int) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+
+class _InstrumentedMixin:
+    metrics: PoolMetrics
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        metrics = self.metrics
+        metrics.add(waiting=1)
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            metrics.add(timeouts=1)
+            logger.error("pool %s esaurito: timeout dopo %.0f ms (%s)", self.logging_name or "db", (time.perf_counter() - t0) * 1000, self.status())
+            raise
+        finally:
+            metrics.add(waiting=-1)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        metrics.wait_ms.observe(elapsed_ms)
+        metrics.add(checkouts=1)
+        if elapsed_ms > settings.DB_POOL_WAIT_WARN_MS:
+            metrics.add(slow_waits=1)
+            logger.warning("pool %s: checkout in %.0f ms (%s)", self.logging_name or "db", elapsed_ms, self.status())
+        return conn
+
+
+class InstrumentedQueuePool(_InstrumentedMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options() -> dict:
+    """Argomenti di ``create_engine`` per il pool, da ``Settings``."""
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+def pool_stats(engine: Engine) -> dict:
+    """Stato del pool dell'engine (sync, o ``async_engine.sync_engine``)."""
+    pool: Pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), checked_out=pool.checkedout(), checked_in=pool.checkedin(), overflow=max(0, pool.overflow()))
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(
+            waiting=metrics.waiting,
+            checkouts=metrics.checkouts,
+            timeouts=metrics.timeouts,
+            slow_waits=metrics.slow_waits,
+            wait_ms=metrics.wait_ms.snapshot(),
+        )
+    return stats
@@ -0,0 +1,88 @@
+"""Statistiche SQL per richiesta: numero di statement, tempo sul database, statement ripetuti.
+
+Gli hook sono registrati sulla classe ``Engine``, quindi valgono per tutti gli
+engine del processo (sync, async, replica, test), ma registrano solo dentro
+:func:`track_queries`, che tiene le statistiche correnti in una ContextVar: il
+threadpool di Starlette e le sessioni async vedono quelle della richiesta.
+
+Gli statement ripetuti si riconoscono dall'impronta: testo normalizzato, con
+le liste ``IN (?, ?, ...)`` ridotte a ``IN (?)``. Una stessa impronta eseguita
+molte volte in una richiesta è di norma un N+1 (un ``db.get`` in un ciclo, una
+relazione lazy letta riga per riga).
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_PARAM = r"(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)"
+_PARAM_LIST = re.compile(rf"\(\s*{_PARAM}(?:\s*,\s*{_PARAM})*\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    text = _SPACES.sub(" ", statement).strip()
+    text = _STRING.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    return _PARAM_LIST.sub("(?)", text)
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    time_ms: float = 0.0
+    fingerprints: Counter = field(default_factory=Counter)
+    parent: "QueryStats | None" = None
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        fp = fingerprint(statement)
+        stats: QueryStats | None = self
+        while stats is not None:  # anche nei contesti esterni (es. budget di un test)
+            stats.count += 1
+            stats.time_ms += elapsed_ms
+            stats.fingerprints[fp] += 1
+            stats = stats.parent
+
+    def repeated(self, min_count: int = 2) -> list[tuple[str, int]]:
+        """Impronte eseguite almeno ``min_count`` volte, dalla più frequente."""
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n >= min_count]
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Registra gli statement eseguiti nel blocco; i blocchi annidati contano anche nei contenitori."""
+    stats = QueryStats(parent=_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def current_stats() -> QueryStats | None:
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info["query_stats_t0"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    t0 = conn.info.pop("query_stats_t0", None)
+    if stats is not None and t0 is not None:
+        stats.record(statement, (time.perf_counter() - t0) * 1000)
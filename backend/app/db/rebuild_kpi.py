@@ -0,0 +1,34 @@
+"""Ricostruisce il rollup KPI mensile dai dati: ``python -m app.db.rebuild_kpi``.
+
+Con ``--se-vuoto`` non fa nulla se il rollup ha già righe: ``entrypoint.sh`` lo
+lancia così dopo ``alembic upgrade head``, per popolarlo solo alla prima
+installazione o dopo una migrazione che lo svuota.
+"""
+import argparse
+
+from sqlalchemy import select
+
+from app.db.session import SessionLocal
+from app.models.kpi import KpiMonthly
+from app.services.kpi import rebuild_kpi
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ricostruisce il rollup KPI mensile.")
+    parser.add_argument("--se-vuoto", action="store_true", help="solo se il rollup non ha righe")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.se_vuoto and db.scalar(select(KpiMonthly.periodo).limit(1)) is not None:
+            print("[kpi] rollup già presente, nessuna ricostruzione")
+            return
+        mesi = rebuild_kpi(db)
+        db.commit()
+        print(f"[kpi] rollup ricostruito: {mesi} mesi")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
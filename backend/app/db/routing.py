@@ -0,0 +1,113 @@
+"""Instradamento delle letture sulla replica, con ritorno al primario se in ritardo.
+
+Le dipendenze di sola lettura (``get_read_db`` / ``get_async_read_db``) chiedono
+la sessione a :class:`ReplicaRouter`: replica se configurata
+(``DATABASE_REPLICA_URL``) e con ritardo di replica entro
+``REPLICA_MAX_LAG_SECONDS``, altrimenti primario. Il ritardo si misura al più
+ogni ``REPLICA_LAG_CHECK_SECONDS`` e l'esito vale per tutte le richieste nel
+frattempo; se la replica non risponde si legge dal primario. Le scritture usano
+sempre ``get_db``.
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy import Connection, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# Secondi dall'ultima transazione applicata; 0 se la replica ha già applicato tutto il WAL ricevuto
+PG_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def measure_lag(conn: Connection) -> float:
+    """Ritardo di replica in secondi visto dalla connessione alla replica.
+
+    Solo PostgreSQL ha una replica in streaming: con altri database (SQLite nei
+    test) il ritardo è 0.
+    """
+    if conn.dialect.name != "postgresql":
+        return 0.0
+    return float(conn.execute(PG_LAG_SQL).scalar() or 0)
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        primary: sessionmaker,
+        replica: sessionmaker | None = None,
+        async_primary: async_sessionmaker | None = None,
+        async_replica: async_sessionmaker | None = None,
+        max_lag: float = 5.0,
+        check_every: float = 5.0,
+    ) -> None:
+        self.primary = primary
+        self.replica = replica
+        self.async_primary = async_primary
+        self.async_replica = async_replica
+        self.max_lag = max_lag
+        self.check_every = check_every
+        self._checked_at = float("-inf")
+        self._healthy = False
+        self._lag: float | None = None
+        self._lock = threading.Lock()
+
+    def _due(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.check_every
+
+    def _record(self, lag: float | None) -> bool:
+        healthy = lag is not None and lag <= self.max_lag
+        with self._lock:
+            if healthy != self._healthy and self._checked_at != float("-inf"):
+                if healthy:
+                    logger.info("replica di nuovo in uso (ritardo %.1f s)", lag)
+                else:
+                    logger.warning("letture sul primario: replica %s", f"in ritardo di {lag:.1f} s" if lag is not None else "non raggiungibile")
+            self._healthy, self._lag, self._checked_at = healthy, lag, time.monotonic()
+        return healthy
+
+    def replica_ok(self) -> bool:
+        if self.replica is None:
+            return False
+        if not self._due():
+            return self._healthy
+        try:
+            with self.replica() as db:
+                lag = measure_lag(db.connection())
+        except Exception:
+            logger.exception("controllo della replica fallito")
+            lag = None
+        return self._record(lag)
+
+    async def replica_ok_async(self) -> bool:
+        if self.async_replica is None:
+            return False
+        if not self._due():
+            return self._healthy
+        try:
+            async with self.async_replica() as db:
+                conn = await db.connection()
+                lag = await conn.run_sync(measure_lag)
+        except Exception:
+            logger.exception("controllo della replica fallito")
+            lag = None
+        return self._record(lag)
+
+    def read_session(self) -> Session:
+        return self.replica() if self.replica_ok() else self.primary()
+
+    async def async_read_session(self) -> AsyncSession:
+        return self.async_replica() if await self.replica_ok_async() else self.async_primary()
+
+    def status(self) -> dict:
+        return {
+            "configurata": self.replica is not None,
+            "in_uso": self._healthy,
+            "ritardo_s": self._lag,
+            "ritardo_max_s": self.max_lag,
+        }
@@ -1,12 +1,42 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 from app.core.config import settings
+from app.db.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, pool_options
+from app.db.routing import ReplicaRouter
 
 
 class Base(DeclarativeBase):
     pass
 
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+engine = create_engine(settings.DATABASE_URL, poolclass=InstrumentedQueuePool, pool_logging_name="primary", **pool_options())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Engine async (asyncpg) per gli endpoint di sola lettura ad alto traffico; non
+# apre connessioni finché non serve. expire_on_commit=False: gli oggetti restano
+# leggibili dopo il commit senza lazy load (non ammesso in async).
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool, pool_logging_name="async", **pool_options()
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Replica opzionale per le letture di report e dashboard (vedi app.db.routing)
+ReplicaSessionLocal = AsyncReplicaSessionLocal = None
+if settings.DATABASE_REPLICA_URL:
+    replica_engine = create_engine(settings.DATABASE_REPLICA_URL, poolclass=InstrumentedQueuePool, pool_logging_name="replica", **pool_options())
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    async_replica_engine = create_async_engine(
+        settings.ASYNC_DATABASE_REPLICA_URL, poolclass=InstrumentedAsyncQueuePool, pool_logging_name="async_replica", **pool_options()
+    )
+    AsyncReplicaSessionLocal = async_sessionmaker(async_replica_engine, autoflush=False, expire_on_commit=False)
+
+read_router = ReplicaRouter(
+    SessionLocal,
+    ReplicaSessionLocal,
+    AsyncSessionLocal,
+    AsyncReplicaSessionLocal,
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+    check_every=settings.REPLICA_LAG_CHECK_SECONDS,
+)
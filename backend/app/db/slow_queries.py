@@ -0,0 +1,190 @@
+"""Log delle query lente: statement oltre ``SLOW_QUERY_MS``, con endpoint e funzione chiamante.
+
+Come :mod:`app.db.query_stats`, gli hook sono sulla classe ``Engine`` e valgono
+per tutti gli engine del processo; con ``SLOW_QUERY_MS = 0`` non misurano nulla.
+Ogni statement lento finisce nel log (warning) e in un buffer circolare
+(``SLOW_QUERY_RING_SIZE``) consultabile da ``/api/v1/internal/slow-queries``.
+
+La voce riporta:
+
+- i parametri oscurati: restano numeri, date, booleani e ``NULL``, le stringhe
+  e i binari diventano ``<str:lunghezza>`` (email, note, hash non finiscono nel log);
+- l'endpoint (template della rotta) della richiesta in corso, se c'è;
+- la funzione dell'applicazione che ha eseguito la query: il frame più interno
+  fuori da ``app/db``, anche per le sessioni async (greenlet del chiamante);
+- con ``SLOW_QUERY_EXPLAIN`` e PostgreSQL, il piano ``EXPLAIN (ANALYZE, BUFFERS)``
+  delle SELECT. ANALYZE esegue di nuovo la query: da usare in staging, non in
+  produzione.
+"""
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = str(Path(__file__).resolve().parent.parent)
+DB_DIR = str(Path(__file__).resolve().parent)
+MAX_SQL = 4000
+MAX_PARAMS = 50
+
+_request_scope: ContextVar[dict | None] = ContextVar("slow_query_scope", default=None)
+
+
+@dataclass
+class SlowQuery:
+    sql: str
+    params: object
+    duration_ms: float
+    endpoint: str | None
+    call_site: str | None
+    executemany: bool = False
+    plan: str | None = None
+    at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["duration_ms"] = round(self.duration_ms, 1)
+        data["at"] = self.at.isoformat()
+        return data
+
+
+_ring: deque[SlowQuery] = deque(maxlen=settings.SLOW_QUERY_RING_SIZE)
+_lock = threading.Lock()
+
+
+@contextmanager
+def request_scope(scope: dict) -> Iterator[None]:
+    """Lega gli statement del blocco alla richiesta; la rotta si legge dallo scope dopo il routing."""
+    token = _request_scope.set(scope)
+    try:
+        yield
+    finally:
+        _request_scope.reset(token)
+
+
+def recent(limit: int | None = None) -> list[SlowQuery]:
+    with _lock:
+        entries = list(reversed(_ring))
+    return entries[:limit] if limit else entries
+
+
+def clear() -> None:
+    with _lock:
+        _ring.clear()
+
+
+def _redact_value(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (Decimal, date)):
+        return str(value)
+    if isinstance(value, (str, bytes, bytearray, memoryview)):
+        return f"<{type(value).__name__}:{len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def redact(parameters):
+    if isinstance(parameters, dict):
+        return {k: _redact_value(v) for k, v in list(parameters.items())[:MAX_PARAMS]}
+    if isinstance(parameters, (list, tuple)):
+        return [_redact_value(v) for v in parameters[:MAX_PARAMS]]
+    return _redact_value(parameters)
+
+
+def _endpoint() -> str | None:
+    scope = _request_scope.get()
+    if scope is None:
+        return None
+    route = scope.get("route")
+    return f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+
+
+def _frames():
+    frame = sys._getframe()
+    while frame is not None:
+        yield frame
+        frame = frame.f_back
+    # sessione async: il codice sync di SQLAlchemy gira in un greenlet figlio,
+    # il chiamante è sospeso nel greenlet padre
+    greenlet = sys.modules.get("greenlet")
+    parent = greenlet.getcurrent().parent if greenlet else None
+    frame = parent.gr_frame if parent is not None else None
+    while frame is not None:
+        yield frame
+        frame = frame.f_back
+
+
+def _call_site() -> str | None:
+    for frame in _frames():
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and not filename.startswith(DB_DIR):
+            return f"{frame.f_code.co_name} (app{filename[len(APP_DIR):]}:{frame.f_lineno})"
+    return None
+
+
+def _explain(conn, statement: str, parameters) -> str | None:
+    if conn.dialect.name != "postgresql" or statement.lstrip()[:6].upper() != "SELECT":
+        return None
+    # stessa connessione e transazione della richiesta: un EXPLAIN fallito (es.
+    # statement_timeout) annullerebbe la transazione, il savepoint la ripristina
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        except Exception:
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            raise
+        cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    except Exception as exc:  # il piano è accessorio: non deve far fallire la richiesta
+        return f"EXPLAIN non riuscito: {exc}"
+    finally:
+        cursor.close()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before(conn, cursor, statement, parameters, context, executemany):
+    if settings.SLOW_QUERY_MS > 0:
+        conn.info["slow_query_t0"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after(conn, cursor, statement, parameters, context, executemany):
+    t0 = conn.info.pop("slow_query_t0", None)
+    if t0 is None:
+        return
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    if elapsed_ms < settings.SLOW_QUERY_MS:
+        return
+    entry = SlowQuery(
+        sql=statement[:MAX_SQL],
+        params=redact(parameters[0] if executemany and parameters else parameters),
+        duration_ms=elapsed_ms,
+        endpoint=_endpoint(),
+        call_site=_call_site(),
+        executemany=executemany,
+    )
+    if settings.SLOW_QUERY_EXPLAIN and not executemany:
+        entry.plan = _explain(conn, statement, parameters)
+    with _lock:
+        _ring.append(entry)
+    logger.warning(
+        "query lenta %.0f ms in %s da %s: %s params=%s",
+        elapsed_ms, entry.endpoint or "-", entry.call_site or "-", " ".join(statement.split())[:500], entry.params,
+    )
@@ -0,0 +1,451 @@
+"""Dati sintetici per benchmark e prove di carico: ``python -m app.db.synthetic --scala 10``.
+
+Genera clienti, ubicazioni, filamenti, stampanti, preventivi con più versioni
+e righe, job con consumi, voci di costo e registro di audit, distribuiti sugli
+ultimi ``MESI`` mesi fino a ``--fino-al``. Con lo stesso seme, la stessa scala
+e la stessa data finale il contenuto è identico; gli id partono dal massimo già
+presente in ogni tabella, quindi si può caricare anche su un database non vuoto.
+
+Scala 1 sono circa 120 mila righe, scala 10 circa 1,2 milioni, scala 100 circa
+12 milioni (vedi ``BASE``). Le righe sono scritte con insert multi-riga a
+blocchi, un commit per lotto di preventivi, senza passare dalla unit of work
+dell'ORM. Prezzi, costi dei job e voci di costo dei job completati usano le
+stesse funzioni dell'applicazione (:func:`app.services.quotes.price_version`,
+:func:`app.services.jobs.compute_job_breakdown`, :func:`app.services.jobs.cost_entry_rows`),
+quindi i totali sono coerenti con quelli che l'API calcolerebbe. Su PostgreSQL
+le partizioni mensili di ``audit_logs`` del periodo sono create prima degli
+insert; alla fine il rollup KPI viene ricostruito e le sequenze degli id
+riallineate.
+"""
+import argparse
+import random
+import time
+from collections import Counter
+from datetime import date, datetime, time as dtime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.core.money import from_cents, to_cents, to_hundredths, to_micro
+from app.core.security import get_password_hash
+from app.models.audit import AuditLog
+from app.models.costs import CostEntry
+from app.models.customer import Customer
+from app.models.inventory import Filament, FilamentStatus
+from app.models.job import Job, JobConsumption, JobStatus
+from app.models.location import Location
+from app.models.printer import Printer, PrinterStatus
+from app.models.quote import Quote, QuoteLine, QuoteStatus, QuoteVersion
+from app.models.user import User, UserRole
+from app.services.audit import ensure_partitions
+from app.services.jobs import compute_job_breakdown, cost_entry_rows, resolve_cost_categories
+from app.services.kpi import periodo_of, rebuild_kpi
+from app.services.quotes import FilamentRate, PricingSnapshot, PrinterRates, price_version
+
+# Quantità a scala 1; le altre tabelle ne derivano (versioni, righe, job, consumi, costi, audit)
+BASE = {
+    "clienti": 2_000,
+    "filamenti": 300,
+    "stampanti": 20,
+    "preventivi": 10_000,
+    "costi_generali_mese": 5,
+}
+MESI = 24
+LOTTO_PREVENTIVI = 1_000
+INSERT_CHUNK = 5_000
+PASSWORD = "sintetico"
+
+MATERIALI = {  # materiale -> intervallo costo bobina da 1 kg (euro)
+    "PLA": (16, 25), "PLA+": (18, 27), "PETG": (19, 28), "ABS": (17, 25),
+    "ASA": (24, 35), "TPU": (28, 42), "PA-CF": (60, 90),
+}
+MARCHE = ["Sunlu", "eSUN", "Polymaker", "Prusament", "Bambu Lab", "Elegoo", "Fiberlogy", "Das Filament"]
+COLORI = [
+    ("Bianco", "#FFFFFF"), ("Nero", "#000000"), ("Grigio", "#808080"), ("Rosso", "#C0392B"), ("Blu", "#2E86C1"),
+    ("Verde", "#27AE60"), ("Giallo", "#F1C40F"), ("Arancione", "#E67E22"), ("Bone White", "#F5F5DC"), ("Trasparente", "#E8F8F5"),
+]
+STAMPANTI = [("Bambu Lab X1C", 350), ("Bambu Lab P1S", 300), ("Prusa MK4", 180), ("Prusa XL", 450), ("Creality K1", 320), ("Voron 2.4", 400)]
+COGNOMI = ["Rossi", "Russo", "Ferrari", "Esposito", "Bianchi", "Romano", "Colombo", "Ricci", "Marino", "Greco", "Bruno", "Gallo", "Conti", "De Luca", "Mancini"]
+NOMI = ["Marco", "Giulia", "Luca", "Francesca", "Andrea", "Sara", "Matteo", "Chiara", "Paolo", "Elena", "Davide", "Martina"]
+ATTIVITA = ["Vineria", "Studio", "Officina", "Laboratorio", "Ferramenta", "Design", "Architetti", "Ottica", "Modellismo", "Arredi"]
+FORME = ["Srl", "Snc", "Sas", "SpA", "Srls"]
+CITTA = ["Roma", "Milano", "Torino", "Napoli", "Bologna", "Firenze", "Bari", "Verona", "Padova", "Genova"]
+OGGETTI = [
+    "Sottobicchiere personalizzato", "Portachiavi con logo", "Supporto smartphone", "Prototipo carter",
+    "Staffa di montaggio", "Miniatura architettonica", "Ricambio manopola", "Vaso decorativo",
+    "Organizer da scrivania", "Targa con incisione", "Ingranaggio di ricambio", "Custodia per sensore",
+]
+
+# pesi delle scelte casuali
+STATI_VERSIONE = ([QuoteStatus.BOZZA, QuoteStatus.INVIATO, QuoteStatus.ACCETTATO, QuoteStatus.RIFIUTATO], [20, 20, 45, 15])
+STATI_JOB = ([JobStatus.completato, JobStatus.in_corso, JobStatus.pianificato, JobStatus.annullato], [60, 15, 15, 10])
+STATI_FILAMENTO = ([FilamentStatus.disponibile, FilamentStatus.nuovo, FilamentStatus.in_uso_ams, FilamentStatus.finito, FilamentStatus.da_asciugare], [55, 15, 15, 10, 5])
+COSTI_GENERALI = [("overhead", "Affitto laboratorio", 400, 900), ("energia", "Bolletta elettrica", 80, 250), ("macchina", "Manutenzione stampanti", 20, 150)]
+
+
+def _dec(value: float, places: int = 2) -> Decimal:
+    return Decimal(f"{value:.{places}f}")
+
+
+def _scaled(key: str, scala: float) -> int:
+    return max(1, round(BASE[key] * scala))
+
+
+class SyntheticGenerator:
+    """Stato del generatore: RNG, prossimo id per tabella e dati di riferimento già scritti."""
+
+    def __init__(self, db: Session, scala: float = 1.0, seme: int = 42, fino_al: date | None = None) -> None:
+        self.db = db
+        self.scala = scala
+        self.rng = random.Random(seme)
+        self.fine = datetime.combine(fino_al or date.today(), dtime(18, 0))
+        self.inizio = self.fine - timedelta(days=30 * MESI)
+        self.counts: Counter = Counter()
+        self._next_id: dict[str, int] = {}
+        self.users: dict[str, int] = {}
+        self.customer_ids: list[int] = []
+        self.slot_ids: list[int] = []
+        self.filaments: dict[int, FilamentRate] = {}
+        self.filament_ids: list[int] = []
+        self.printers: dict[int, PrinterRates] = {}
+        self.printer_ids: list[int] = []
+        self.category_ids: dict[str, int] = {}
+
+    # --- infrastruttura -------------------------------------------------
+
+    def _ids(self, model, n: int) -> range:
+        table = model.__tablename__
+        if table not in self._next_id:
+            self._next_id[table] = (self.db.scalar(select(func.max(model.id))) or 0) + 1
+        start = self._next_id[table]
+        self._next_id[table] = start + n
+        return range(start, start + n)
+
+    def _insert(self, model, rows: list[dict]) -> None:
+        for i in range(0, len(rows), INSERT_CHUNK):
+            self.db.execute(insert(model.__table__), rows[i:i + INSERT_CHUNK])
+        self.counts[model.__tablename__] += len(rows)
+
+    def _at(self, i: int, n: int) -> datetime:
+        """Istante dell'``i``-esimo di ``n`` elementi, in ordine lungo il periodo, con un po' di rumore."""
+        span = (self.fine - self.inizio).total_seconds()
+        return self.inizio + timedelta(seconds=span * i / n + self.rng.uniform(0, span / n))
+
+    def _entro(self, at: datetime) -> datetime:
+        """``at`` limitato a ``fine``: versioni successive e job non vanno oltre ``--fino-al``."""
+        return min(at, self.fine)
+
+    def ensure_audit_partitions(self) -> list[str]:
+        """Su PostgreSQL crea le partizioni mensili di ``audit_logs`` per tutto il periodo generato."""
+        mesi = (self.fine.year - self.inizio.year) * 12 + self.fine.month - self.inizio.month
+        return ensure_partitions(self.db, months_ahead=mesi, today=self.inizio.date())
+
+    def _audit(self, actor: int, entity: str, entity_id: int, action: str, at: datetime, details: str = "") -> dict:
+        return {
+            "id": None, "actor_user_id": actor, "entity": entity, "entity_id": entity_id,
+            "action": action, "details": details, "created_at": at, "updated_at": at,
+        }
+
+    # --- dati di riferimento --------------------------------------------
+
+    def write_users(self) -> None:
+        emails = {role: f"sintetico.{role.value.lower()}@printlab.local" for role in UserRole}
+        existing = dict(self.db.execute(select(User.email, User.id).where(User.email.in_(emails.values()))).all())
+        hashed = get_password_hash(PASSWORD) if len(existing) < len(emails) else ""
+        rows = []
+        for role, email in emails.items():
+            if email in existing:
+                self.users[role.value] = existing[email]
+                continue
+            (uid,) = self._ids(User, 1)
+            self.users[role.value] = uid
+            rows.append({
+                "id": uid, "email": email, "full_name": f"Utente sintetico {role.value.title()}", "role": role.value,
+                "hashed_password": hashed, "is_active": True, "must_reset_password": False,
+                "created_at": self.inizio, "updated_at": self.inizio,
+            })
+        self._insert(User, rows)
+
+    def write_locations(self) -> None:
+        admin = self.users[UserRole.admin.value]
+        rows = []
+        for _ in range(max(1, round(self.scala))):
+            (mag,) = self._ids(Location, 1)
+            rows.append({"id": mag, "nome": f"Magazzino {mag}", "tipo": "MAGAZZINO", "parent_id": None})
+            for s in range(4):
+                (sca,) = self._ids(Location, 1)
+                rows.append({"id": sca, "nome": f"Scaffale {chr(65 + s)}", "tipo": "SCAFFALE", "parent_id": mag})
+                for r in range(5):
+                    (rip,) = self._ids(Location, 1)
+                    rows.append({"id": rip, "nome": f"Ripiano {r + 1}", "tipo": "RIPIANO", "parent_id": sca})
+                    for slot_id, n in zip(self._ids(Location, 10), range(1, 11)):
+                        rows.append({"id": slot_id, "nome": f"Slot {n}", "tipo": "SLOT", "parent_id": rip})
+                        self.slot_ids.append(slot_id)
+        for row in rows:
+            row.update(created_at=self.inizio, updated_at=self.inizio, created_by_id=admin, updated_by_id=admin)
+        self._insert(Location, rows)
+
+    def write_filaments(self) -> None:
+        rng, admin = self.rng, self.users[UserRole.operator.value]
+        n = _scaled("filamenti", self.scala)
+        rows = []
+        for i, fid in enumerate(self._ids(Filament, n)):
+            materiale = rng.choice(list(MATERIALI))
+            colore, hex_ = rng.choice(COLORI)
+            nominale = rng.choices([1000, 750, 250], [80, 15, 5])[0]
+            costo = _dec(rng.uniform(*MATERIALI[materiale]) * nominale / 1000)
+            stato = rng.choices(*STATI_FILAMENTO)[0]
+            at = self._at(i, n)
+            rows.append({
+                "id": fid, "materiale": materiale, "tipo": "", "marca": rng.choice(MARCHE), "colore": colore,
+                "colore_hex": hex_, "diametro_mm": Decimal("1.75"), "peso_nominale_g": nominale, "costo_spool_eur": costo,
+                "note": "", "peso_residuo_g": 0 if stato == FilamentStatus.finito else rng.randint(0, nominale),
+                "soglia_min_g": 150, "stato": stato.value, "data_acquisto": at.date(),
+                "ubicazione_id": rng.choice(self.slot_ids), "created_at": at, "updated_at": at,
+                "created_by_id": admin, "updated_by_id": admin,
+            })
+            self.filaments[fid] = FilamentRate(to_cents(costo), nominale)
+            self.filament_ids.append(fid)
+        self._insert(Filament, rows)
+
+    def write_printers(self) -> None:
+        rng = self.rng
+        n = _scaled("stampanti", self.scala)
+        rows = []
+        for i, pid in enumerate(self._ids(Printer, n)):
+            modello, potenza = rng.choice(STAMPANTI)
+            at = self._at(i, n)
+            row = {
+                "id": pid, "nome": f"Stampante {pid:03d}", "modello": modello, "potenza_w": _dec(potenza * rng.uniform(0.9, 1.1)),
+                "costo_macchina_eur": _dec(rng.uniform(500, 4000)), "vita_stimata_h": Decimal("8000"),
+                "manutenzione_eur_h": _dec(rng.uniform(0.1, 0.4), 4),
+                "stato": rng.choices(list(PrinterStatus), [85, 10, 5])[0], "note": "", "created_at": at, "updated_at": at,
+            }
+            rows.append(row)
+            printer = Printer(**row)  # solo per le proprietà di costo orario, non entra in sessione
+            self.printers[pid] = PrinterRates(to_micro(printer.totale_macchina_eur_h), to_hundredths(printer.potenza_w))
+            self.printer_ids.append(pid)
+        self._insert(Printer, rows)
+
+    def write_customers(self) -> None:
+        rng, sales = self.rng, self.users[UserRole.sales.value]
+        n = _scaled("clienti", self.scala)
+        rows, audit = [], []
+        for i, cid in enumerate(self._ids(Customer, n)):
+            at = self._at(i, n)
+            cognome, nome, citta = rng.choice(COGNOMI), rng.choice(NOMI), rng.choice(CITTA)
+            row = {
+                "id": cid, "tipo_cliente": "DITTA", "ragione_sociale": "", "nome": "", "cognome": "", "codice_fiscale": "",
+                "piva": "", "email": "", "telefono": f"+39 3{rng.randrange(10**8, 10**9)}", "indirizzo": citta, "note": "",
+                "created_at": at, "updated_at": at, "created_by_id": sales, "updated_by_id": sales,
+            }
+            if rng.random() < 0.7:
+                ragione = f"{rng.choice(ATTIVITA)} {cognome} {rng.choice(FORME)}"
+                row.update(ragione_sociale=ragione, piva=f"IT{rng.randrange(10**10, 10**11)}", email=f"info{cid}@{cognome.lower().replace(' ', '')}.example")
+            else:
+                cf = "".join(rng.choice("ABCDEFGHLMNPRSTVZ0123456789") for _ in range(16))
+                row.update(tipo_cliente="PERSONA", ragione_sociale=f"{cognome} {nome}", nome=nome, cognome=cognome,
+                           codice_fiscale=cf, email=f"{nome.lower()}.{cid}@mail.example")
+            rows.append(row)
+            audit.append(self._audit(sales, "Customer", cid, "CREATE", at))
+            self.customer_ids.append(cid)
+        self._insert(Customer, rows)
+        self._audit_rows(audit)
+
+    def _audit_rows(self, rows: list[dict]) -> None:
+        for row, aid in zip(rows, self._ids(AuditLog, len(rows))):
+            row["id"] = aid
+        self._insert(AuditLog, rows)
+
+    # --- preventivi, job e costi ------------------------------------------
+
+    def _lines(self, vid: int, at: datetime, user: int) -> list[SimpleNamespace]:
+        rng = self.rng
+        righe = []
+        for _ in range(rng.choices([1, 2, 3, 4, 5], [30, 30, 20, 12, 8])[0]):
+            righe.append(SimpleNamespace(
+                id=None, quote_version_id=vid, descrizione=rng.choice(OGGETTI),
+                filament_id=rng.choice(self.filament_ids) if rng.random() < 0.85 else None,
+                quantita=rng.choices([1, 2, 5, 10, 20, 50], [40, 20, 15, 12, 8, 5])[0],
+                peso_materiale_g=_dec(rng.uniform(5, 400)), tempo_stimato_min=rng.randint(20, 900),
+                ore_manodopera_min=_dec(rng.choice([0, 0, 10, 15, 30, 60])),
+                costo_materiale_eur=0, costo_macchina_eur=0, costo_manodopera_eur=0, costo_energia_eur=0,
+                costo_consumabili_eur=0, totale_riga_eur=0,
+                created_at=at, updated_at=at, created_by_id=user, updated_by_id=user,
+            ))
+        return righe
+
+    def _version(self, vid: int, quote_id: int, number: int, status: QuoteStatus, at: datetime, user: int) -> SimpleNamespace:
+        rng = self.rng
+        qv = SimpleNamespace(
+            id=vid, quote_id=quote_id, version_number=number, status=status,
+            printer_id=rng.choice(self.printer_ids) if rng.random() < 0.7 else None,
+            costo_macchina_eur_h=_dec(rng.uniform(0.05, 0.5)), costo_manodopera_eur_h=_dec(rng.choice([0, 15, 18, 20, 25, 30])),
+            potenza_w=Decimal("200.00"), costo_energia_kwh=_dec(rng.uniform(0.15, 0.35), 4),
+            consumabili_fissi_eur=_dec(rng.choice([0, 0.5, 1])), overhead_pct=Decimal("10.00"), rischio_pct=Decimal("5.00"),
+            margine_pct=_dec(rng.choice([15, 20, 25, 30, 40])), sconto_eur=_dec(rng.choice([0, 0, 0, 2, 5, 10])),
+            iva_pct=Decimal("22.00"), applica_iva=rng.random() < 0.9,
+            prezzo_unitario_vendita=_dec(rng.uniform(5, 60)) if rng.random() < 0.05 else None,
+            totale_imponibile_eur=0, totale_iva_eur=0, totale_lordo_eur=0,
+            created_at=at, updated_at=at, created_by_id=user, updated_by_id=user,
+        )
+        qv.righe = self._lines(vid, at, user)
+        return qv
+
+    def _job(self, jid: int, qv: SimpleNamespace, at: datetime, snapshot: PricingSnapshot) -> tuple[dict, list[dict], list[dict]]:
+        """Job della versione accettata ``qv`` con consumi e, se completato, voci di costo."""
+        rng, oper = self.rng, self.users[UserRole.operator.value]
+        status = rng.choices(*STATI_JOB)[0]
+        prima = qv.righe[0]
+        consumi = [
+            SimpleNamespace(
+                id=None, job_id=jid, filament_id=line.filament_id,
+                peso_g=round(float(line.peso_materiale_g) * line.quantita * rng.uniform(0.95, 1.15)),
+                created_at=at, updated_at=at, created_by_id=oper, updated_by_id=oper,
+            )
+            for line in qv.righe if line.filament_id
+        ]
+        potenza = snapshot.printers[qv.printer_id].potenza_cw / 100 if qv.printer_id else 200
+        tempo = round(prima.tempo_stimato_min * rng.uniform(0.9, 1.2))
+        job = SimpleNamespace(
+            id=jid, quote_version_id=qv.id, status=status.value, quantita_prodotta=sum(line.quantita for line in qv.righe),
+            tempo_reale_min=tempo, energia_kwh=_dec(potenza * tempo / 60 / 1000, 3), scarti_g=rng.randint(0, 30),
+            note="", costo_finale_eur=0, margine_eur=0, consumi=consumi,
+            created_at=at, updated_at=self._entro(at + timedelta(hours=rng.uniform(2, 72))), created_by_id=oper, updated_by_id=oper,
+        )
+        costi = []
+        if status != JobStatus.pianificato:
+            breakdown = compute_job_breakdown(job, qv, snapshot.filaments)
+            job.costo_finale_eur = from_cents(breakdown.costo_finale)
+            job.margine_eur = from_cents(breakdown.margine)
+            if status == JobStatus.completato:
+                costi = cost_entry_rows(breakdown, self.category_ids, periodo_of(job.updated_at), oper)
+                for row in costi:
+                    row.update(created_at=job.updated_at, updated_at=job.updated_at)
+        row = vars(job).copy()
+        row.pop("consumi")
+        return row, [vars(c) for c in consumi], costi
+
+    def write_quotes(self, lotto: int = LOTTO_PREVENTIVI, progress=print) -> None:
+        rng = self.rng
+        sales = self.users[UserRole.sales.value]
+        snapshot = PricingSnapshot(filaments=self.filaments, printers=self.printers)
+        n = _scaled("preventivi", self.scala)
+        for start in range(0, n, lotto):
+            size = min(lotto, n - start)
+            quotes, versions, lines, jobs, consumi, costi, audit = [], [], [], [], [], [], []
+            for i, qid in zip(range(start, start + size), self._ids(Quote, size)):
+                at = self._at(i, n)
+                quotes.append({
+                    "id": qid, "codice": f"SIN-{qid:07d}", "customer_id": rng.choice(self.customer_ids), "note": "",
+                    "created_at": at, "updated_at": at, "created_by_id": sales, "updated_by_id": sales,
+                })
+                audit.append(self._audit(sales, "Quote", qid, "CREATE", at))
+                n_versioni = rng.choices([1, 2, 3], [60, 30, 10])[0]
+                for number, vid in enumerate(self._ids(QuoteVersion, n_versioni), start=1):
+                    ultima = number == n_versioni
+                    status = rng.choices(*STATI_VERSIONE)[0] if ultima else QuoteStatus.RIFIUTATO
+                    qv = self._version(vid, qid, number, status, at, sales)
+                    price_version(qv, snapshot)
+                    lines.extend(vars(line) for line in qv.righe)
+                    row = vars(qv).copy()
+                    row.pop("righe")
+                    versions.append(row)
+                    audit.append(self._audit(sales, "QuoteVersion", vid, "CREATE", at))
+                    if status == QuoteStatus.ACCETTATO and rng.random() < 0.8:
+                        (jid,) = self._ids(Job, 1)
+                        job_at = self._entro(at + timedelta(hours=rng.uniform(1, 96)))
+                        job, job_consumi, job_costi = self._job(jid, qv, job_at, snapshot)
+                        jobs.append(job)
+                        consumi.extend(job_consumi)
+                        costi.extend(job_costi)
+                        audit.append(self._audit(job["created_by_id"], "Job", jid, "CREATE", job_at))
+                        if job["status"] != JobStatus.pianificato.value:
+                            audit.append(self._audit(job["updated_by_id"], "Job", jid, "STATUS", job["updated_at"], job["status"]))
+                    at = self._entro(at + timedelta(days=rng.uniform(1, 10)))
+
+            for row, lid in zip(lines, self._ids(QuoteLine, len(lines))):
+                row["id"] = lid
+            for row, cid in zip(consumi, self._ids(JobConsumption, len(consumi))):
+                row["id"] = cid
+            self._insert(Quote, quotes)
+            self._insert(QuoteVersion, versions)
+            self._insert(QuoteLine, lines)
+            self._insert(Job, jobs)
+            self._insert(JobConsumption, consumi)
+            self._insert(CostEntry, costi)
+            self._audit_rows(audit)
+            self.db.commit()
+            progress(f"[sintetici] preventivi {start + size}/{n}")
+
+    def write_general_costs(self) -> None:
+        rng, admin = self.rng, self.users[UserRole.admin.value]
+        per_mese = _scaled("costi_generali_mese", self.scala)
+        rows = []
+        mese = self.inizio.replace(day=1, hour=9)
+        while mese <= self.fine:
+            for _ in range(per_mese):
+                chiave, voce, lo, hi = rng.choice(COSTI_GENERALI)
+                rows.append({
+                    "categoria_id": self.category_ids[chiave], "importo_eur": _dec(rng.uniform(lo, hi)), "periodo_yyyymm": periodo_of(mese),
+                    "job_id": None, "note": voce, "created_at": mese, "updated_at": mese, "created_by_id": admin, "updated_by_id": admin,
+                })
+            mese = (mese + timedelta(days=32)).replace(day=1)
+        self._insert(CostEntry, rows)
+
+    def reset_sequences(self) -> None:
+        """Su PostgreSQL porta le sequenze degli id oltre gli id scritti esplicitamente."""
+        if self.db.get_bind().dialect.name != "postgresql":
+            return
+        for table in self._next_id:
+            self.db.execute(text(f"SELECT setval('{table}_id_seq', (SELECT max(id) FROM {table}))"))
+
+    def run(self, lotto: int = LOTTO_PREVENTIVI, progress=print) -> Counter:
+        self.ensure_audit_partitions()  # altrimenti le voci finirebbero tutte in audit_logs_default
+        self.write_users()
+        self.category_ids = resolve_cost_categories(self.db, self.users[UserRole.admin.value])
+        self.write_locations()
+        self.write_filaments()
+        self.write_printers()
+        self.write_customers()
+        self.write_general_costs()
+        self.db.commit()
+        self.write_quotes(lotto, progress)
+        self.reset_sequences()
+        rebuild_kpi(self.db)
+        self.db.commit()
+        return self.counts
+
+
+def generate(db: Session, scala: float = 1.0, seme: int = 42, fino_al: date | None = None, lotto: int = LOTTO_PREVENTIVI, progress=print) -> Counter:
+    """Genera il dataset e restituisce le righe scritte per tabella; fa commit a ogni lotto."""
+    return SyntheticGenerator(db, scala, seme, fino_al).run(lotto, progress)
+
+
+def main() -> None:
+    from app.db.session import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Genera dati sintetici per benchmark.")
+    parser.add_argument("--scala", type=float, default=1.0, help="moltiplicatore delle quantità (1, 10, 100)")
+    parser.add_argument("--seme", type=int, default=42, help="seme del generatore casuale")
+    parser.add_argument("--fino-al", type=date.fromisoformat, default=None, help="data finale del periodo (YYYY-MM-DD, default oggi)")
+    parser.add_argument("--lotto", type=int, default=LOTTO_PREVENTIVI, help="preventivi per commit")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        counts = generate(db, args.scala, args.seme, args.fino_al, args.lotto)
+        elapsed = time.perf_counter() - t0
+        for table, rows in sorted(counts.items()):
+            print(f"[sintetici] {table}: {rows}")
+        total = sum(counts.values())
+        print(f"[sintetici] {total} righe in {elapsed:.0f} s ({total / elapsed:.0f} righe/s)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
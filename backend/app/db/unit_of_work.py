@@ -0,0 +1,31 @@
+"""Unità di lavoro della richiesta: un solo commit alla fine, rollback se qualcosa fallisce.
+
+Gli endpoint di scrittura ricevono la sessione da ``get_uow`` (app.api_v1.deps)
+e non chiamano ``commit()``: modifiche e voci di audit restano nella stessa
+transazione, che la dipendenza chiude dopo la serializzazione della risposta
+e prima dell'invio. Chi ha bisogno degli id fa ``db.flush()``.
+
+Le azioni che devono vedere i dati già salvati (invalidare una cache,
+svegliare i worker della coda) si registrano con :func:`after_commit`.
+"""
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+_CALLBACKS = "after_commit"
+
+
+def after_commit(db: Session, fn: Callable[[], None]) -> None:
+    """Esegue ``fn`` dopo il commit dell'unità di lavoro; scartata se la richiesta fallisce."""
+    db.info.setdefault(_CALLBACKS, []).append(fn)
+
+
+def commit(db: Session) -> None:
+    db.commit()
+    for fn in db.info.pop(_CALLBACKS, []):
+        fn()
+
+
+def rollback(db: Session) -> None:
+    db.info.pop(_CALLBACKS, None)
+    db.rollback()
@@ -1,10 +1,25 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
 print(f"[DEBUG] SECRET_KEY: {settings.SECRET_KEY}")
 from app.core.logging import configure_logging
+from app.core.metrics import REGISTRY
+from app.core.middleware import (
+    DB_QUERIES_HEADER,
+    DB_REPEATED_HEADER,
+    DB_TIME_HEADER,
+    PROFILE_ID_HEADER,
+    MetricsMiddleware,
+    ProfilerMiddleware,
+    QueryStatsMiddleware,
+)
+from app.api_v1.deps import get_session_factory
 from app.api_v1.router import api_router
+from app.services.pagination import NEXT_CURSOR_HEADER
+from app.services.documents import start_workers, stop_workers as stop_document_workers
+from app.services.pdf_cache import shutdown_pool as shutdown_pdf_pool
 
 
 def create_app() -> FastAPI:
@@ -24,14 +39,32 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"] ,
         allow_headers=["*"] ,
+        expose_headers=[NEXT_CURSOR_HEADER, DB_QUERIES_HEADER, DB_TIME_HEADER, DB_REPEATED_HEADER, PROFILE_ID_HEADER],
     )
+    app.add_middleware(ProfilerMiddleware, slow_ms=settings.PROFILE_SLOW_MS)
+    app.add_middleware(QueryStatsMiddleware, debug_headers=settings.SQL_DEBUG_HEADERS, repeat_warn=settings.SQL_REPEAT_WARN)
+    app.add_middleware(MetricsMiddleware)
 
     app.include_router(api_router, prefix=settings.API_V1_STR)
 
+    def start_document_workers() -> None:
+        # all'avvio: rimette in coda i task interrotti e riprende quelli in attesa;
+        # stessa factory delle richieste, sostituibile con dependency_overrides
+        start_workers(app.dependency_overrides.get(get_session_factory, get_session_factory)())
+
+    app.add_event_handler("startup", start_document_workers)
+    app.add_event_handler("shutdown", stop_document_workers)
+    app.add_event_handler("shutdown", shutdown_pdf_pool)
+
     @app.get("/healthz")
     def healthz():
         return {"status": "ok"}
 
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        # formato testo Prometheus; da esporre solo sulla rete interna (nessuna autenticazione)
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
     return app
 
 
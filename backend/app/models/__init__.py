@@ -7,6 +7,8 @@ from app.models.job import Job, JobConsumption
 from app.models.costs import CostCategory, CostEntry
 from app.models.audit import AuditLog
 from app.models.settings import PreventivoSettingsDB
+from app.models.kpi import KpiMonthly, KpiMonthlyCost, KpiMonthlyCustomer
+from app.models.document import DocumentTask
 
 __all__ = [
     "User",
@@ -23,4 +25,8 @@ __all__ = [
     "CostEntry",
     "AuditLog",
     "PreventivoSettingsDB",
+    "KpiMonthly",
+    "KpiMonthlyCost",
+    "KpiMonthlyCustomer",
+    "DocumentTask",
 ]
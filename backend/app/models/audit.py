@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, Text
+from sqlalchemy import Index, Integer, String, Text, event
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.session import Base
@@ -6,7 +6,14 @@ from app.models.base import TimestampMixin
 
 
 class AuditLog(Base, TimestampMixin):
+    """Registro in sola aggiunta: su PostgreSQL la tabella è partizionata per mese su ``created_at`` (a0027)."""
+
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index("ix_audit_logs_entity_entity_id_id", "entity", "entity_id", "id"),
+        Index("ix_audit_logs_actor_user_id_id", "actor_user_id", "id"),
+        Index("ix_audit_logs_created_at_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     actor_user_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
@@ -14,3 +21,9 @@ class AuditLog(Base, TimestampMixin):
     entity_id: Mapped[int] = mapped_column(Integer)
     action: Mapped[str] = mapped_column(String(50))  # CREATE/UPDATE/DELETE/STATUS
     details: Mapped[str] = mapped_column(Text, default="")
+
+
+@event.listens_for(AuditLog, "before_update")
+@event.listens_for(AuditLog, "before_delete")
+def _append_only(mapper, connection, target):
+    raise ValueError("Le voci di audit non si modificano né si cancellano")
@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey, Integer, Numeric, String, Text
+from sqlalchemy import ForeignKey, Index, Integer, Numeric, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.session import Base
@@ -15,12 +15,13 @@ class CostCategory(Base, TimestampMixin, AuditUserMixin):
 
 class CostEntry(Base, TimestampMixin, AuditUserMixin):
     __tablename__ = "cost_entries"
+    __table_args__ = (Index("ix_cost_entries_created_at_id", "created_at", "id"), Index("ix_cost_entries_periodo_id", "periodo_yyyymm", "id"))
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    categoria_id: Mapped[int] = mapped_column(ForeignKey("cost_categories.id"))
+    categoria_id: Mapped[int] = mapped_column(ForeignKey("cost_categories.id"), index=True)
     importo_eur: Mapped[float] = mapped_column(Numeric(12, 2))
     periodo_yyyymm: Mapped[str] = mapped_column(String(7))  # es. 2026-02
-    job_id: Mapped[int | None] = mapped_column(ForeignKey("jobs.id"), nullable=True)
+    job_id: Mapped[int | None] = mapped_column(ForeignKey("jobs.id"), nullable=True, index=True)
     note: Mapped[str] = mapped_column(Text, default="")
 
     categoria = relationship("CostCategory")
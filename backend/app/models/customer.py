@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, Text
+from sqlalchemy import Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.session import Base
@@ -7,10 +7,11 @@ from app.models.base import TimestampMixin, AuditUserMixin
 
 class Customer(Base, TimestampMixin, AuditUserMixin):
     __tablename__ = "customers"
+    __table_args__ = (Index("ix_customers_created_at_id", "created_at", "id"), Index("ix_customers_ragione_sociale_id", "ragione_sociale", "id"))
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     tipo_cliente: Mapped[str] = mapped_column(String(10), default="DITTA")  # DITTA o PERSONA
-    ragione_sociale: Mapped[str] = mapped_column(String(255), index=True, default="")
+    ragione_sociale: Mapped[str] = mapped_column(String(255), default="")
     nome: Mapped[str] = mapped_column(String(100), default="")
     cognome: Mapped[str] = mapped_column(String(100), default="")
     codice_fiscale: Mapped[str] = mapped_column(String(16), default="")
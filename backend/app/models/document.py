@@ -0,0 +1,46 @@
+import enum
+from datetime import datetime
+
+from sqlalchemy import DateTime, Index, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.session import Base
+from app.models.base import TimestampMixin, AuditUserMixin
+
+
+class DocumentTaskKind(str, enum.Enum):
+    quote_pdf = "QUOTE_PDF"
+    quotes_zip = "QUOTES_ZIP"
+
+
+class DocumentTaskStatus(str, enum.Enum):
+    in_coda = "IN_CODA"
+    in_corso = "IN_CORSO"
+    completato = "COMPLETATO"
+    errore = "ERRORE"
+
+
+class DocumentTask(Base, TimestampMixin, AuditUserMixin):
+    """Generazione di un documento in coda, eseguita dai worker di :mod:`app.services.documents`."""
+
+    __tablename__ = "document_tasks"
+    # i worker prelevano il task in coda con id più basso; la pulizia cerca i task scaduti
+    __table_args__ = (
+        Index("ix_document_tasks_status_id", "status", "id"),
+        Index("ix_document_tasks_expires_at", "expires_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    tipo: Mapped[str] = mapped_column(String(20))
+    status: Mapped[str] = mapped_column(String(20), default=DocumentTaskStatus.in_coda.value)
+    params: Mapped[str] = mapped_column(Text, default="{}")  # JSON
+    filename: Mapped[str] = mapped_column(String(255), default="")
+    result_path: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    error: Mapped[str] = mapped_column(Text, default="")
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # processo che esegue il task (host:pid) e ultimo segnale di vita
+    worker_id: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # task conclusi: oltre questa data riga e file vengono eliminati
+    expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -1,6 +1,6 @@
 import enum
 from datetime import date
-from sqlalchemy import Date, Enum, ForeignKey, Integer, Numeric, String, Text
+from sqlalchemy import Date, Enum, ForeignKey, Index, Integer, Numeric, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.session import Base
@@ -25,6 +25,7 @@ class FilamentStatus(str, enum.Enum):
 
 class Filament(Base, TimestampMixin, AuditUserMixin):
     __tablename__ = "filaments"
+    __table_args__ = (Index("ix_filaments_created_at_id", "created_at", "id"), Index("ix_filaments_materiale_id", "materiale", "id"))
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     materiale: Mapped[str] = mapped_column(String(50))
@@ -52,10 +53,11 @@ class Filament(Base, TimestampMixin, AuditUserMixin):
 
 class InventoryMovement(Base, TimestampMixin, AuditUserMixin):
     __tablename__ = "inventory_movements"
+    __table_args__ = (Index("ix_inventory_movements_created_at_id", "created_at", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     tipo: Mapped[MovementType] = mapped_column(Enum(MovementType))
-    filament_id: Mapped[int] = mapped_column(ForeignKey("filaments.id"))
+    filament_id: Mapped[int] = mapped_column(ForeignKey("filaments.id"), index=True)
     delta_peso_g: Mapped[int] = mapped_column(Integer)
     from_location_id: Mapped[int | None] = mapped_column(ForeignKey("locations.id"), nullable=True)
     to_location_id: Mapped[int | None] = mapped_column(ForeignKey("locations.id"), nullable=True)
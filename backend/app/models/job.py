@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Enum, ForeignKey, Integer, Numeric, String, Text
+from sqlalchemy import Enum, ForeignKey, Index, Integer, Numeric, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.session import Base
@@ -15,9 +15,15 @@ class JobStatus(str, enum.Enum):
 
 class Job(Base, TimestampMixin, AuditUserMixin):
     __tablename__ = "jobs"
+    # indici keyset per la paginazione (chiave di ordinamento, id)
+    __table_args__ = (
+        Index("ix_jobs_created_at_id", "created_at", "id"),
+        # analisi margini (job completati per finestra temporale) e filtro per stato degli elenchi
+        Index("ix_jobs_status_created_at", "status", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    quote_version_id: Mapped[int] = mapped_column(ForeignKey("quote_versions.id"))
+    quote_version_id: Mapped[int] = mapped_column(ForeignKey("quote_versions.id"), index=True)
     # store status as uppercase string (the enum's ``value``) rather than
     # relying on a Postgres enum type.  SQLAlchemy's default ``Enum`` binds
     # the *member name* which was lowercase (e.g. "in_corso"), and the
@@ -0,0 +1,51 @@
+from sqlalchemy import BigInteger, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.session import Base
+
+
+class KpiMonthly(Base):
+    """Rollup mensile dei KPI della dashboard, aggiornato a ogni scrittura.
+
+    Le colonne mensili si riferiscono al mese ``periodo`` (YYYY-MM); le colonne
+    ``job_*`` per stato sono invece i totali correnti, aggiornati sulla riga del
+    mese in corso e riportati nella riga di un nuovo mese quando viene creata.
+    Importi in centesimi (vedi app.core.money).
+    """
+
+    __tablename__ = "kpi_monthly"
+
+    periodo: Mapped[str] = mapped_column(String(7), primary_key=True)
+    preventivi_creati: Mapped[int] = mapped_column(Integer, default=0)
+    ricavi_accettati_cents: Mapped[int] = mapped_column(BigInteger, default=0)
+    costi_cents: Mapped[int] = mapped_column(BigInteger, default=0)
+    clienti_attivi: Mapped[int] = mapped_column(Integer, default=0)
+    # job completati creati nel mese: margine medio ponderato = margine / ricavo
+    job_chiusi: Mapped[int] = mapped_column(Integer, default=0)
+    margine_cents_somma: Mapped[int] = mapped_column(BigInteger, default=0)
+    ricavo_cents_somma: Mapped[int] = mapped_column(BigInteger, default=0)
+    # job per stato (totali correnti)
+    job_pianificati: Mapped[int] = mapped_column(Integer, default=0)
+    job_in_corso: Mapped[int] = mapped_column(Integer, default=0)
+    job_completati: Mapped[int] = mapped_column(Integer, default=0)
+    job_annullati: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class KpiMonthlyCost(Base):
+    """Costi del mese per categoria."""
+
+    __tablename__ = "kpi_monthly_costs"
+
+    periodo: Mapped[str] = mapped_column(String(7), primary_key=True)
+    categoria_id: Mapped[int] = mapped_column(ForeignKey("cost_categories.id", ondelete="CASCADE"), primary_key=True)
+    totale_cents: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+class KpiMonthlyCustomer(Base):
+    """Versioni di preventivo create nel mese per cliente, per contare i clienti attivi."""
+
+    __tablename__ = "kpi_monthly_customers"
+
+    periodo: Mapped[str] = mapped_column(String(7), primary_key=True)
+    customer_id: Mapped[int] = mapped_column(ForeignKey("customers.id", ondelete="CASCADE"), primary_key=True)
+    versioni: Mapped[int] = mapped_column(Integer, default=0)
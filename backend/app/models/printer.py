@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, Text, Enum as SqlEnum, DateTime
+from sqlalchemy import Column, Index, Integer, String, Numeric, Text, Enum as SqlEnum, DateTime
 from sqlalchemy.sql import func
 import enum
 from app.models.base import Base
@@ -12,6 +12,7 @@ class PrinterStatus(str, enum.Enum):
 
 class Printer(Base):
     __tablename__ = "printers"
+    __table_args__ = (Index("ix_printers_created_at_id", "created_at", "id"), Index("ix_printers_nome_id", "nome", "id"))
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String, nullable=False)
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Boolean, Enum, ForeignKey, Integer, Numeric, String, Text
+from sqlalchemy import Boolean, Enum, ForeignKey, Index, Integer, Numeric, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.session import Base
@@ -15,10 +15,11 @@ class QuoteStatus(str, enum.Enum):
 
 class Quote(Base, TimestampMixin, AuditUserMixin):
     __tablename__ = "quotes"
+    __table_args__ = (Index("ix_quotes_created_at_id", "created_at", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     codice: Mapped[str] = mapped_column(String(30), unique=True, index=True)
-    customer_id: Mapped[int] = mapped_column(ForeignKey("customers.id"))
+    customer_id: Mapped[int] = mapped_column(ForeignKey("customers.id"), index=True)
     note: Mapped[str] = mapped_column(Text, default="")
 
     customer = relationship("Customer")
@@ -31,10 +32,10 @@ class QuoteVersion(Base, TimestampMixin, AuditUserMixin):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     quote_id: Mapped[int] = mapped_column(ForeignKey("quotes.id"))
     version_number: Mapped[int] = mapped_column(Integer, default=1)
-    status: Mapped[QuoteStatus] = mapped_column(Enum(QuoteStatus), default=QuoteStatus.BOZZA)
+    status: Mapped[QuoteStatus] = mapped_column(Enum(QuoteStatus), default=QuoteStatus.BOZZA, index=True)
     
     # Stampante utilizzata per il preventivo
-    printer_id: Mapped[int | None] = mapped_column(ForeignKey("printers.id"), nullable=True)
+    printer_id: Mapped[int | None] = mapped_column(ForeignKey("printers.id"), nullable=True, index=True)
 
 
     # Parametri economici
@@ -68,7 +69,7 @@ class QuoteLine(Base, TimestampMixin, AuditUserMixin):
     quote_version_id: Mapped[int] = mapped_column(ForeignKey("quote_versions.id"))
 
     descrizione: Mapped[str] = mapped_column(String(255))
-    filament_id: Mapped[int | None] = mapped_column(ForeignKey("filaments.id"), nullable=True)
+    filament_id: Mapped[int | None] = mapped_column(ForeignKey("filaments.id"), nullable=True, index=True)
     quantita: Mapped[int] = mapped_column(Integer, default=1)
 
     peso_materiale_g: Mapped[float] = mapped_column(Numeric(10, 2), default=0.0)
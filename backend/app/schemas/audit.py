@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class AuditLogOut(BaseModel):
+    id: int
+    actor_user_id: int | None
+    entity: str
+    entity_id: int
+    action: str
+    details: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -10,3 +10,14 @@ class DashboardKPI(BaseModel):
     costi_mese_eur: float
     utile_mese_eur: float
     clienti_attivi: int
+
+
+class MarginStatsOut(BaseModel):
+    gruppo_id: int | None
+    gruppo: str
+    job: int
+    margine_eur: float
+    ricavo_eur: float
+    margine_medio_pct: float  # media ponderata sul ricavo
+    mediana_pct: float | None
+    percentili_pct: dict[int, float]
@@ -0,0 +1,32 @@
+from datetime import date, datetime
+
+from pydantic import BaseModel
+
+from app.models.document import DocumentTaskKind, DocumentTaskStatus
+from app.models.quote import QuoteStatus
+
+
+class DocumentTaskCreate(BaseModel):
+    tipo: DocumentTaskKind
+    # QUOTE_PDF
+    quote_version_id: int | None = None
+    # QUOTES_ZIP: stessi filtri di GET /quotes/export/pdf
+    dal: date | None = None
+    al: date | None = None
+    status: QuoteStatus | None = None
+    customer_id: int | None = None
+
+
+class DocumentTaskOut(BaseModel):
+    id: int
+    tipo: DocumentTaskKind
+    status: DocumentTaskStatus
+    filename: str
+    error: str
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+    expires_at: datetime | None
+
+    class Config:
+        from_attributes = True
@@ -49,6 +49,13 @@ class FilamentOut(FilamentBase):
         from_attributes = True
 
 
+class FilamentStockOut(BaseModel):
+    """Totali di magazzino per stato (riepilogo della pagina filamenti)."""
+    stato: str
+    filamenti: int
+    peso_residuo_g: int
+
+
 class MovementCreate(BaseModel):
     tipo: MovementType
     filament_id: int
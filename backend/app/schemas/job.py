@@ -46,3 +46,21 @@ class JobOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class JobBulkStatusUpdate(BaseModel):
+    job_ids: list[int]
+    status: JobStatus  # solo COMPLETATO o ANNULLATO
+
+
+class JobBulkResult(BaseModel):
+    job_id: int
+    ok: bool
+    error: str | None = None
+
+
+class JobBulkStatusOut(BaseModel):
+    status: JobStatus
+    aggiornati: int
+    errori: int
+    risultati: list[JobBulkResult]
@@ -107,3 +107,27 @@ class QuoteVersionOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class QuoteWhatIfRequest(BaseModel):
+    # liste vuote o assenti = valore salvato nella versione
+    margine_pct: list[float] | None = None
+    overhead_pct: list[float] | None = None
+    rischio_pct: list[float] | None = None
+    sconto_eur: list[float] | None = None
+    # None nella lista = parametri macchina/potenza della versione
+    printer_ids: list[int | None] | None = None
+
+
+class QuoteWhatIfOut(BaseModel):
+    """Griglia in formato colonnare: l'i-esimo elemento di ogni lista è un punto."""
+
+    version_id: int
+    punti: int
+    margine_pct: list[float]
+    overhead_pct: list[float]
+    rischio_pct: list[float]
+    sconto_eur: list[float]
+    printer_id: list[int | None]
+    totale_imponibile_eur: list[float]
+    totale_lordo_eur: list[float]
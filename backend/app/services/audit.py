@@ -1,7 +1,93 @@
+"""Registro delle modifiche (``audit_logs``).
+
+:func:`log_action` aggiunge la voce alla sessione del chiamante senza fare
+commit: la voce viene scritta nella stessa transazione della modifica che
+descrive, quindi o si salvano entrambe o nessuna delle due. Per le entità
+appena create il chiamante fa ``db.flush()`` prima, per avere l'id.
+
+Su PostgreSQL la tabella è partizionata per mese; :func:`ensure_partitions`
+crea in anticipo le partizioni dei mesi successivi (le righe fuori da ogni
+partizione finiscono comunque in ``audit_logs_default``). Se un mese senza
+partizione ha già righe nella partizione di default, queste vengono spostate
+nella nuova partizione: PostgreSQL non permette di crearla finché la default
+contiene righe del suo intervallo.
+"""
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session
 
 from app.models.audit import AuditLog
 
+PARTITION_MONTHS_AHEAD = 3
+DEFAULT_PARTITION = "audit_logs_default"
+_COLUMNS = "id, actor_user_id, entity, entity_id, action, details, created_at, updated_at"
+
 
 def log_action(db: Session, actor_user_id: int | None, entity: str, entity_id: int, action: str, details: str = "") -> None:
     db.add(AuditLog(actor_user_id=actor_user_id, entity=entity, entity_id=entity_id, action=action, details=details))
+
+
+def _add_months(d: date, months: int) -> date:
+    y, m = divmod(d.month - 1 + months, 12)
+    return date(d.year + y, m + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"audit_logs_{month.year:04d}{month.month:02d}"
+
+
+def ensure_partitions(db: Session, months_ahead: int = PARTITION_MONTHS_AHEAD, today: date | None = None) -> list[str]:
+    """Crea le partizioni mensili mancanti dal mese di ``today`` (default: corrente) a ``months_ahead`` mesi dopo (solo PostgreSQL); il chiamante fa commit."""
+    if db.get_bind().dialect.name != "postgresql":
+        return []
+    # più processi che partono insieme (repliche): uno alla volta, fino al commit
+    db.execute(text("SELECT pg_advisory_xact_lock(hashtext('audit_logs_partitions'))"))
+    start = (today or date.today()).replace(day=1)
+    created = []
+    for i in range(months_ahead + 1):
+        month = _add_months(start, i)
+        name = partition_name(month)
+        if db.scalar(text("SELECT to_regclass(:name)"), {"name": name}) is not None:
+            continue
+        bounds = {"da": month, "a": _add_months(month, 1)}
+        in_default = db.scalar(
+            text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= :da AND created_at < :a)"), bounds
+        )
+        if in_default:
+            _partition_from_default(db, name, bounds)
+        else:
+            db.execute(text(_create_partition_sql(name, bounds)))
+        created.append(name)
+    return created
+
+
+def _create_partition_sql(name: str, bounds: dict) -> str:
+    return f"CREATE TABLE {name} PARTITION OF audit_logs FOR VALUES FROM ('{bounds['da'].isoformat()}') TO ('{bounds['a'].isoformat()}')"
+
+
+def _partition_from_default(db: Session, name: str, bounds: dict) -> None:
+    """Crea la partizione ``name`` spostandovi le righe del mese finite nella partizione di default."""
+    where = "created_at >= :da AND created_at < :a"
+    try:
+        with db.begin_nested():
+            # staccata, la default non blocca la nuova partizione e non è più soggetta
+            # al trigger di sola aggiunta della tabella madre (disabilitato comunque per il DELETE)
+            db.execute(text(f"ALTER TABLE audit_logs DETACH PARTITION {DEFAULT_PARTITION}"))
+            db.execute(text(_create_partition_sql(name, bounds)))
+            db.execute(text(f"INSERT INTO audit_logs ({_COLUMNS}) SELECT {_COLUMNS} FROM {DEFAULT_PARTITION} WHERE {where}"), bounds)
+            db.execute(text(f"ALTER TABLE {DEFAULT_PARTITION} DISABLE TRIGGER USER"))
+            db.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {where}"), bounds)
+            db.execute(text(f"ALTER TABLE {DEFAULT_PARTITION} ENABLE TRIGGER USER"))
+            db.execute(text(f"ALTER TABLE audit_logs ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    except DBAPIError as exc:
+        raise RuntimeError(
+            f"impossibile creare {name}: {DEFAULT_PARTITION} contiene righe dal {bounds['da']} al {bounds['a']} "
+            f"e lo spostamento è fallito ({exc.orig}). A mano, in una transazione: "
+            f"ALTER TABLE audit_logs DETACH PARTITION {DEFAULT_PARTITION}; {_create_partition_sql(name, bounds)}; "
+            f"INSERT INTO audit_logs SELECT * FROM {DEFAULT_PARTITION} WHERE <mese>; "
+            f"ALTER TABLE {DEFAULT_PARTITION} DISABLE TRIGGER USER; DELETE FROM {DEFAULT_PARTITION} WHERE <mese>; "
+            f"ALTER TABLE {DEFAULT_PARTITION} ENABLE TRIGGER USER; "
+            f"ALTER TABLE audit_logs ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"
+        ) from exc
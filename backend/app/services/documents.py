@@ -0,0 +1,294 @@
+"""Coda dei documenti pesanti (PDF, archivi ZIP) sulla tabella ``document_tasks``.
+
+L'API registra il task e risponde subito con il suo id. Lo eseguono i thread
+worker del processo API (``DOCUMENT_WORKERS``, avviati con l'app) oppure un
+processo separato (``python -m app.db.document_worker``): il file prodotto
+finisce in ``DOCUMENT_DIR`` e il client ne interroga lo stato finché non è
+``COMPLETATO``.
+
+Il prelievo è un UPDATE condizionato sullo stato ``IN_CODA``, quindi più
+worker, anche in processi diversi, non eseguono mai lo stesso task. Ogni passo
+usa una sessione breve: nessuna connessione resta aperta durante il rendering.
+
+Chi preleva un task vi scrive il proprio ``worker_id`` e, finché lo esegue, un
+thread di manutenzione del processo ne aggiorna ``heartbeat_at``. Lo stesso
+thread rimette in coda i task ``IN_CORSO`` senza segnale da
+``DOCUMENT_STALE_MINUTES`` (processo terminato) ed elimina righe e file dei
+task conclusi da più di ``DOCUMENT_RETENTION_HOURS``.
+"""
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import zipfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.config import settings
+from app.db import settings as db_settings
+from app.models.document import DocumentTask, DocumentTaskKind, DocumentTaskStatus
+from app.models.quote import Quote, QuoteStatus, QuoteVersion
+from app.services.pdf import quote_pdf_data
+from app.services.pdf_cache import get_or_render_pdf_sync
+from app.services.pdf_export import PdfExportFilter, load_export_batch
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 5.0  # attesa massima tra due controlli della coda senza notifiche
+PURGE_BATCH = 500
+
+_threads: list[threading.Thread] = []
+_wake = threading.Event()
+_stop = threading.Event()
+_lock = threading.Lock()
+
+
+def document_dir() -> Path:
+    path = Path(settings.DOCUMENT_DIR or os.path.join(tempfile.gettempdir(), "printlab3d_documents"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def worker_id() -> str:
+    """Identità del processo corrente nei task che esegue."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def submit_task(db: Session, tipo: DocumentTaskKind, params: dict, user_id: int | None) -> DocumentTask:
+    """Accoda un task; il chiamante fa commit e poi :func:`notify_workers`."""
+    task = DocumentTask(
+        tipo=tipo.value,
+        status=DocumentTaskStatus.in_coda.value,
+        params=json.dumps(params, default=str),
+        created_by_id=user_id,
+        updated_by_id=user_id,
+    )
+    db.add(task)
+    db.flush()
+    return task
+
+
+def notify_workers() -> None:
+    _wake.set()
+
+
+def claim_next(db: Session) -> DocumentTask | None:
+    """Porta a ``IN_CORSO`` il primo task in coda e lo restituisce (già committato)."""
+    while True:
+        task_id = db.scalar(
+            select(DocumentTask.id)
+            .where(DocumentTask.status == DocumentTaskStatus.in_coda.value)
+            .order_by(DocumentTask.id)
+            .limit(1)
+        )
+        if task_id is None:
+            return None
+        now = datetime.utcnow()
+        claimed = db.execute(
+            update(DocumentTask)
+            .where(DocumentTask.id == task_id, DocumentTask.status == DocumentTaskStatus.in_coda.value)
+            .values(status=DocumentTaskStatus.in_corso.value, started_at=now, updated_at=now, worker_id=worker_id(), heartbeat_at=now)
+        ).rowcount
+        db.commit()
+        if claimed:
+            return db.get(DocumentTask, task_id)
+        # preso da un altro worker nel frattempo: si passa al successivo
+
+
+def heartbeat(db: Session) -> int:
+    """Segnala che i task ``IN_CORSO`` di questo processo sono ancora in esecuzione."""
+    count = db.execute(
+        update(DocumentTask)
+        .where(DocumentTask.status == DocumentTaskStatus.in_corso.value, DocumentTask.worker_id == worker_id())
+        .values(heartbeat_at=datetime.utcnow())
+    ).rowcount
+    db.commit()
+    return count
+
+
+def requeue_stale(db: Session, minutes: int) -> int:
+    """Rimette in coda i task ``IN_CORSO`` senza heartbeat da oltre ``minutes`` (worker terminato a metà)."""
+    limite = datetime.utcnow() - timedelta(minutes=minutes)
+    count = db.execute(
+        update(DocumentTask)
+        .where(
+            DocumentTask.status == DocumentTaskStatus.in_corso.value,
+            func.coalesce(DocumentTask.heartbeat_at, DocumentTask.started_at) < limite,
+        )
+        .values(status=DocumentTaskStatus.in_coda.value, started_at=None, worker_id=None, heartbeat_at=None)
+    ).rowcount
+    db.commit()
+    return count
+
+
+def purge_expired(db: Session, now: datetime | None = None) -> int:
+    """Elimina i task conclusi oltre ``expires_at`` e i loro file; restituisce le righe eliminate."""
+    now = now or datetime.utcnow()
+    purged = 0
+    while True:
+        rows = db.execute(
+            select(DocumentTask.id, DocumentTask.result_path).where(DocumentTask.expires_at < now).limit(PURGE_BATCH)
+        ).all()
+        if not rows:
+            return purged
+        for _, result_path in rows:
+            if result_path:
+                Path(result_path).unlink(missing_ok=True)
+        db.execute(delete(DocumentTask).where(DocumentTask.id.in_([task_id for task_id, _ in rows])))
+        db.commit()
+        purged += len(rows)
+
+
+def _quote_pdf(session_factory: Callable[[], Session], params: dict, path: Path) -> str:
+    db = session_factory()
+    try:
+        qv = db.scalar(select(QuoteVersion).options(selectinload(QuoteVersion.righe)).where(QuoteVersion.id == params["quote_version_id"]))
+        quote = db.get(Quote, qv.quote_id) if qv else None
+        if quote is None:
+            raise ValueError("Versione non trovata")
+        data = quote_pdf_data(quote, qv, db_settings.get_settings(db))
+    finally:
+        db.close()
+    path.write_bytes(get_or_render_pdf_sync(data))
+    return data.filename
+
+
+def export_filter(params: dict) -> PdfExportFilter:
+    dal = date.fromisoformat(params["dal"]) if params.get("dal") else None
+    al = date.fromisoformat(params["al"]) if params.get("al") else None
+    return PdfExportFilter(
+        date_from=datetime.combine(dal, datetime.min.time()) if dal else None,
+        date_to=datetime.combine(al + timedelta(days=1), datetime.min.time()) if al else None,
+        status=QuoteStatus(params["status"]) if params.get("status") else None,
+        customer_id=params.get("customer_id"),
+    )
+
+
+def _quotes_zip(session_factory: Callable[[], Session], params: dict, path: Path) -> str:
+    flt = export_filter(params)
+    with zipfile.ZipFile(path, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        after_id = 0
+        while True:
+            db = session_factory()
+            try:
+                batch = load_export_batch(db, flt, after_id)
+            finally:
+                db.close()
+            if not batch:
+                break
+            after_id = batch[-1][0]
+            for _, data in batch:
+                archive.writestr(data.filename, get_or_render_pdf_sync(data))
+    return f"preventivi_{(params.get('dal') or date.today().isoformat()).replace('-', '')}.zip"
+
+
+HANDLERS: dict[str, Callable[[Callable[[], Session], dict, Path], str]] = {
+    DocumentTaskKind.quote_pdf.value: _quote_pdf,
+    DocumentTaskKind.quotes_zip.value: _quotes_zip,
+}
+
+
+def run_next(session_factory: Callable[[], Session]) -> bool:
+    """Esegue il prossimo task in coda; ``False`` se la coda è vuota."""
+    db = session_factory()
+    try:
+        task = claim_next(db)
+        if task is None:
+            return False
+        task_id, tipo, params = task.id, task.tipo, json.loads(task.params)
+    finally:
+        db.close()
+
+    part = document_dir() / f"{task_id}.part"
+    values: dict = {}
+    try:
+        filename = HANDLERS[tipo](session_factory, params, part)
+        result = document_dir() / f"{task_id}_{filename}"
+        os.replace(part, result)
+        values.update(status=DocumentTaskStatus.completato.value, filename=filename, result_path=str(result))
+    except Exception as exc:
+        logger.exception("document task %s fallito", task_id)
+        part.unlink(missing_ok=True)
+        values.update(status=DocumentTaskStatus.errore.value, error=str(exc) or exc.__class__.__name__)
+    now = datetime.utcnow()
+    values.update(finished_at=now, updated_at=now, expires_at=now + timedelta(hours=settings.DOCUMENT_RETENTION_HOURS))
+
+    db = session_factory()
+    try:
+        # solo se il task è ancora nostro: se è stato rimesso in coda lo conclude chi l'ha ripreso
+        owned = db.execute(
+            update(DocumentTask).where(DocumentTask.id == task_id, DocumentTask.worker_id == worker_id()).values(**values)
+        ).rowcount
+        db.commit()
+    finally:
+        db.close()
+    if not owned and values.get("result_path"):
+        Path(values["result_path"]).unlink(missing_ok=True)
+    return True
+
+
+def _worker_loop(session_factory: Callable[[], Session]) -> None:
+    while not _stop.is_set():
+        try:
+            if run_next(session_factory):
+                continue
+        except Exception:
+            logger.exception("errore nel worker documenti")
+        _wake.wait(POLL_SECONDS)
+        _wake.clear()
+
+
+def housekeeping(session_factory: Callable[[], Session]) -> None:
+    """Heartbeat dei task del processo, ripresa dei task abbandonati, pulizia di quelli scaduti."""
+    db = session_factory()
+    try:
+        heartbeat(db)
+        requeued = requeue_stale(db, settings.DOCUMENT_STALE_MINUTES)
+        purged = purge_expired(db)
+    finally:
+        db.close()
+    if requeued:
+        logger.warning("rimessi in coda %s document task interrotti", requeued)
+        notify_workers()
+    if purged:
+        logger.info("eliminati %s document task scaduti", purged)
+
+
+def _housekeeping_loop(session_factory: Callable[[], Session]) -> None:
+    while True:
+        try:
+            housekeeping(session_factory)
+        except Exception:
+            logger.exception("errore nella manutenzione della coda documenti")
+        if _stop.wait(settings.DOCUMENT_HEARTBEAT_SECONDS):
+            return
+
+
+def start_workers(session_factory: Callable[[], Session], count: int | None = None) -> None:
+    """Avvia (una volta sola per processo) i thread worker della coda e quello di manutenzione."""
+    count = settings.DOCUMENT_WORKERS if count is None else count
+    with _lock:
+        if _threads or count <= 0:
+            return
+        _stop.clear()
+        targets = [(_housekeeping_loop, "document-housekeeping")]
+        targets += [(_worker_loop, f"document-worker-{i}") for i in range(count)]
+        for target, name in targets:
+            thread = threading.Thread(target=target, args=(session_factory,), name=name, daemon=True)
+            thread.start()
+            _threads.append(thread)
+
+
+def stop_workers(timeout: float = 5.0) -> None:
+    with _lock:
+        _stop.set()
+        _wake.set()
+        for thread in _threads:
+            thread.join(timeout)
+        _threads.clear()
@@ -1,255 +1,281 @@
-from decimal import Decimal
+from dataclasses import dataclass
 from datetime import datetime
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, selectinload
 
-from app.models.inventory import Filament
+from app.core.money import CENTS, HUNDREDTHS, MICRO, MILLI, apply_bp, div_round, from_cents, to_bp, to_cents, to_hundredths, to_micro, to_milli
 from app.models.job import Job, JobStatus
 from app.models.quote import QuoteVersion
 from app.models.costs import CostCategory, CostEntry
+from app.services.kpi import JobKpiState, job_kpi_state, record_costs, record_job_changes
+from app.services.quotes import MACCHINA_DEN, MANODOPERA_DEN, FilamentRate, load_filament_rates
 
+# Categorie usate dalle voci di costo automatiche dei job: chiave -> (nome, descrizione)
+JOB_COST_CATEGORIES = {
+    "materiali": ("Materiali", "Filamenti e materiali di stampa"),
+    "energia": ("Energia", "Costi energia elettrica"),
+    "manodopera": ("Manodopera", "Costi del lavoro"),
+    "macchina": ("Ammortamento", "Quota ammortamento stampanti"),
+    "consumabili": ("Consumabili", "Consumabili di stampa"),
+    "overhead": ("Generali", "Costi generali"),
+    "rischio": ("Rischio", "Fattore di rischio"),
+}
 
-def recalc_job(db: Session, job: Job) -> None:
-    # Carica QuoteVersion con eager loading delle righe
-    qv = db.query(QuoteVersion).options(joinedload(QuoteVersion.righe)).filter(QuoteVersion.id == job.quote_version_id).first()
+
+@dataclass(frozen=True)
+class JobCostBreakdown:
+    """Scomposizione dei costi reali di un job, importi in centesimi.
+
+    Calcolata una volta per transizione da :func:`compute_job_breakdown` e
+    usata sia per i totali del job sia per le voci di costo.
+    """
+
+    job_id: int
+    qty: int
+    materiali: int
+    energia: int
+    macchina: int
+    manodopera: int
+    consumabili: int
+    overhead: int
+    rischio: int
+    ricavo: int
+    # valori per le note delle voci di costo
+    energia_kwh: float
+    ore_macchina: float
+    ore_manodopera: float
+    overhead_pct: object
+    rischio_pct: object
+
+    @property
+    def costi_diretti(self) -> int:
+        return self.materiali + self.energia + self.macchina + self.manodopera + self.consumabili
+
+    @property
+    def costo_finale(self) -> int:
+        return self.costi_diretti + self.overhead + self.rischio
+
+    @property
+    def margine(self) -> int:
+        return self.ricavo - self.costo_finale
+
+
+def load_quote_version_for_job(db: Session, job: Job) -> QuoteVersion:
+    # riusa la versione già caricata sul job (es. joinedload negli endpoint)
+    qv = job.quote_version if "quote_version" in job.__dict__ else None
+    if qv is None or qv.id != job.quote_version_id:
+        qv = db.query(QuoteVersion).options(selectinload(QuoteVersion.righe)).filter(QuoteVersion.id == job.quote_version_id).first()
     if not qv:
         raise HTTPException(status_code=404, detail="Versione preventivo non trovata")
+    return qv
 
-    # Calcola quantità totale preventivo per calcolare proporzioni
-    quantita_preventivo = sum(line.quantita for line in qv.righe) if qv.righe else 1
-    
-    # Proporzione prodotta rispetto al preventivo
-    if quantita_preventivo > 0:
-        proporzione = Decimal(str(job.quantita_prodotta or 1)) / Decimal(str(quantita_preventivo))
-    else:
-        proporzione = Decimal("1")
 
+def compute_job_breakdown(job: Job, qv: QuoteVersion, filament_rates: dict[int, FilamentRate]) -> JobCostBreakdown:
+    """Calcola i costi del job senza accedere al DB.
+
+    ``filament_rates`` deve contenere i filamenti dei consumi del job (vedi
+    :func:`app.services.quotes.load_filament_rates`).
+    """
+    # Quantità totale del preventivo, per proporzionare manodopera e ricavo
+    quantita_preventivo = sum((line.quantita or 0) for line in qv.righe) if qv.righe else 1
     # Quantità prodotta per moltiplicare i valori per pezzo
-    qty = Decimal(str(job.quantita_prodotta or 1))
+    qty = job.quantita_prodotta or 1
 
-    # costo materiale reale
-    mat = Decimal("0")
+    # costo materiale reale dai consumi
+    materiali = 0
     for cons in job.consumi:
-        fil = db.get(Filament, cons.filament_id)
-        if not fil:
-            continue
-        costo_spool = Decimal(str(fil.costo_spool_eur))
-        denom = Decimal(str(fil.peso_nominale_g or 1000))
-        costo_per_g = (costo_spool / denom) if denom != 0 else Decimal("0")
-        mat += costo_per_g * Decimal(str(cons.peso_g or 0))
+        rate = filament_rates.get(cons.filament_id)
+        if rate:
+            materiali += rate.cost_cents((cons.peso_g or 0) * HUNDREDTHS)
 
     # Tempo ed energia sono PER PEZZO, vanno moltiplicati per quantità
-    tempo_totale_min = Decimal(str(job.tempo_reale_min or 0)) * qty
-    hours = tempo_totale_min / Decimal("60")
-    
-    energia_totale_kwh = Decimal(str(job.energia_kwh or 0)) * qty
-    costo_energia = energia_totale_kwh * Decimal(str(qv.costo_energia_kwh))
-    
-    costo_macchina = hours * Decimal(str(qv.costo_macchina_eur_h))
-    # La manodopera nel preventivo è inserita come minuti totali (non per pezzo).
-    manodopera_totale_prev = Decimal(str(sum((line.ore_manodopera_min or 0) for line in qv.righe)))
+    energia_milli = to_milli(job.energia_kwh) * qty
+    energia = div_round(energia_milli * to_micro(qv.costo_energia_kwh) * CENTS, MILLI * MICRO)
+    tempo_totale_min = (job.tempo_reale_min or 0) * qty
+    macchina = div_round(tempo_totale_min * to_micro(qv.costo_macchina_eur_h) * CENTS, MACCHINA_DEN)
+
+    # La manodopera nel preventivo è inserita come minuti totali (non per pezzo)
+    minuti_prev = sum(to_hundredths(line.ore_manodopera_min) for line in qv.righe)
+    den = quantita_preventivo if quantita_preventivo > 0 else 1
+    manodopera = div_round(minuti_prev * qty * to_micro(qv.costo_manodopera_eur_h) * CENTS, den * MANODOPERA_DEN)
+
+    consumabili = to_cents(qv.consumabili_fissi_eur) * qty  # Moltiplicato per quantity come nel preventivo
+
+    # Overhead e rischio sui costi diretti (come nel preventivo)
+    costi_diretti = materiali + energia + macchina + manodopera + consumabili
+    overhead = apply_bp(costi_diretti, to_bp(qv.overhead_pct))
+    rischio = apply_bp(costi_diretti, to_bp(qv.rischio_pct))
+
+    # ricavo proporzionale = totale imponibile * quantità prodotta / quantità preventivo
+    ricavo = to_cents(qv.totale_imponibile_eur)
     if quantita_preventivo > 0:
-        manodopera_per_pezzo_min = manodopera_totale_prev / Decimal(str(quantita_preventivo))
-    else:
-        manodopera_per_pezzo_min = manodopera_totale_prev
-    manodopera_totale_min = manodopera_per_pezzo_min * qty
-    labor_hours = manodopera_totale_min / Decimal("60")
-    costo_manodopera = labor_hours * Decimal(str(qv.costo_manodopera_eur_h))
-    consumabili = Decimal(str(qv.consumabili_fissi_eur or 0)) * qty  # Moltiplicato per quantity come nel preventivo
-
-    # Costi diretti totali (come nel preventivo)
-    costi_diretti = mat + costo_energia + costo_macchina + costo_manodopera + consumabili
-    
-    # Overhead e rischio (come nel preventivo)
-    overhead = costi_diretti * Decimal(str(qv.overhead_pct or 0)) / Decimal("100")
-    rischio = costi_diretti * Decimal(str(qv.rischio_pct or 0)) / Decimal("100")
-    
-    costo_finale = costi_diretti + overhead + rischio
-
-    # ricavo proporzionale = totale imponibile * proporzione prodotta
-    ricavo_totale = Decimal(str(qv.totale_imponibile_eur))
-    ricavo = ricavo_totale * proporzione
-    margine = ricavo - costo_finale
-
-    job.costo_finale_eur = float(costo_finale.quantize(Decimal("0.01")))
-    job.margine_eur = float(margine.quantize(Decimal("0.01")))
-
-
-def create_job_cost_entries(db: Session, job: Job, user_id: int) -> None:
+        ricavo = div_round(ricavo * qty, quantita_preventivo)
+
+    return JobCostBreakdown(
+        job_id=job.id,
+        qty=qty,
+        materiali=materiali,
+        energia=energia,
+        macchina=macchina,
+        manodopera=manodopera,
+        consumabili=consumabili,
+        overhead=overhead,
+        rischio=rischio,
+        ricavo=ricavo,
+        energia_kwh=round(energia_milli / MILLI, 2),
+        ore_macchina=round(tempo_totale_min / 60, 1),
+        ore_manodopera=round(minuti_prev * qty / den / HUNDREDTHS / 60, 1),
+        overhead_pct=qv.overhead_pct,
+        rischio_pct=qv.rischio_pct or 0,
+    )
+
+
+def recalc_job(db: Session, job: Job) -> JobCostBreakdown:
+    """Aggiorna costo finale e margine del job e restituisce la scomposizione.
+
+    Passare il risultato a :func:`create_job_cost_entries` evita di ricalcolare
+    tutto quando il job viene completato.
+    """
+    qv = load_quote_version_for_job(db, job)
+    rates = load_filament_rates(db, {cons.filament_id for cons in job.consumi})
+    breakdown = compute_job_breakdown(job, qv, rates)
+    job.costo_finale_eur = from_cents(breakdown.costo_finale)
+    job.margine_eur = from_cents(breakdown.margine)
+    return breakdown
+
+
+def resolve_cost_categories(db: Session, user_id: int) -> dict[str, int]:
+    """Id delle categorie di :data:`JOB_COST_CATEGORIES`, creando quelle mancanti.
+
+    Una query per leggerle tutte e un flush solo se ne manca qualcuna.
+    """
+    nomi = [nome for nome, _ in JOB_COST_CATEGORIES.values()]
+    by_nome = dict(db.execute(select(CostCategory.nome, CostCategory.id).where(CostCategory.nome.in_(nomi))).all())
+    missing = []
+    for nome, descrizione in JOB_COST_CATEGORIES.values():
+        if nome not in by_nome:
+            cat = CostCategory(nome=nome, descrizione=descrizione)
+            cat.created_by_id = user_id
+            cat.updated_by_id = user_id
+            missing.append(cat)
+    if missing:
+        db.add_all(missing)
+        db.flush()
+        by_nome.update({cat.nome: cat.id for cat in missing})
+    return {key: by_nome[nome] for key, (nome, _) in JOB_COST_CATEGORIES.items()}
+
+
+def cost_entry_rows(breakdown: JobCostBreakdown, category_ids: dict[str, int], periodo: str, user_id: int) -> list[dict]:
+    """Righe ``cost_entries`` (come dizionari per un insert multi-riga) di un job completato."""
+    job_id = breakdown.job_id
+    voci = [
+        ("materiali", breakdown.materiali, f"Materiali job #{job_id}"),
+        ("energia", breakdown.energia, f"Energia job #{job_id} ({breakdown.energia_kwh} kWh)"),
+        ("manodopera", breakdown.manodopera, f"Manodopera job #{job_id} ({breakdown.ore_manodopera}h)"),
+        ("macchina", breakdown.macchina, f"Uso macchina job #{job_id} ({breakdown.ore_macchina}h)"),
+        ("consumabili", breakdown.consumabili, f"Consumabili job #{job_id} (qty: {breakdown.qty})"),
+        ("overhead", breakdown.overhead, f"Overhead job #{job_id} ({breakdown.overhead_pct}%)"),
+        ("rischio", breakdown.rischio, f"Rischio job #{job_id} ({breakdown.rischio_pct}%)"),
+    ]
+    return [
+        {
+            "categoria_id": category_ids[key],
+            "importo_eur": from_cents(importo),
+            "periodo_yyyymm": periodo,
+            "job_id": job_id,
+            "note": note,
+            "created_by_id": user_id,
+            "updated_by_id": user_id,
+        }
+        for key, importo, note in voci
+        if importo > 0
+    ]
+
+
+def create_job_cost_entries(db: Session, job: Job, user_id: int, breakdown: JobCostBreakdown | None = None) -> None:
     """
     Crea le voci di costo quando un job viene completato.
-    Registra i costi reali di produzione come voci nella tabella cost_entries.
+    Registra i costi reali di produzione come voci nella tabella cost_entries,
+    riusando la scomposizione già calcolata da :func:`recalc_job` se fornita.
     """
-    # Verifica se esistono già costi per questo job
-    existing = db.query(CostEntry).filter(CostEntry.job_id == job.id).first()
-    if existing:
-        # Già esistono costi per questo job, non creare duplicati
+    # Verifica se esistono già costi per questo job, non creare duplicati
+    if db.query(CostEntry.id).filter(CostEntry.job_id == job.id).first():
         return
-    
-    # Carica QuoteVersion per i parametri di costo
-    qv = db.query(QuoteVersion).options(joinedload(QuoteVersion.righe)).filter(QuoteVersion.id == job.quote_version_id).first()
-    if not qv:
-        return
-    
+    if breakdown is None:
+        breakdown = recalc_job(db, job)
+
     # Periodo corrente (formato YYYY-MM)
     periodo = datetime.now().strftime("%Y-%m")
-    
-    # Helper per ottenere o creare una categoria
-    def get_or_create_category(nome: str, descrizione: str) -> CostCategory:
-        cat = db.query(CostCategory).filter(CostCategory.nome == nome).first()
-        if not cat:
-            cat = CostCategory(nome=nome, descrizione=descrizione)
-            cat.created_by_id = user_id
-            cat.updated_by_id = user_id
-            db.add(cat)
-            db.flush()
-        return cat
-    
-    # Quantità prodotta
-    qty = Decimal(str(job.quantita_prodotta or 1))
-    quantita_preventivo = Decimal(str(sum((line.quantita or 0) for line in qv.righe))) if qv.righe else Decimal("1")
-    
-    entries = []
-    
-    # 1. Costo materiali (filamenti consumati)
-    costo_materiali = Decimal("0")
-    for cons in job.consumi:
-        fil = db.get(Filament, cons.filament_id)
-        if not fil:
+    rows = cost_entry_rows(breakdown, resolve_cost_categories(db, user_id), periodo, user_id)
+    insert_cost_entries(db, rows)
+
+
+def insert_cost_entries(db: Session, rows: list[dict]) -> None:
+    """Insert multi-riga delle voci di costo, con aggiornamento del rollup KPI."""
+    if rows:
+        db.execute(insert(CostEntry), rows)
+        record_costs(db, [(row["periodo_yyyymm"], row["categoria_id"], row["importo_eur"]) for row in rows])
+
+
+BULK_TARGET_STATUSES = (JobStatus.completato.value, JobStatus.annullato.value)
+BULK_MAX_JOBS = 500
+
+
+def bulk_transition_jobs(db: Session, job_ids: list[int], status: str, user_id: int) -> dict[int, str | None]:
+    """Porta più job a COMPLETATO/ANNULLATO nella transazione corrente.
+
+    Carica job, consumi, versioni, righe e filamenti con un numero fisso di
+    query, risolve le categorie di costo una volta e scrive tutte le voci di
+    costo con un solo insert multi-riga. Restituisce per ogni id ``None`` se
+    il job è stato aggiornato oppure il messaggio d'errore; i job in errore non
+    vengono toccati e non bloccano gli altri. Il commit è a carico del chiamante.
+    """
+    if status not in BULK_TARGET_STATUSES:
+        raise HTTPException(status_code=400, detail="Stato non ammesso per l'aggiornamento massivo")
+    job_ids = list(dict.fromkeys(job_ids))
+    if len(job_ids) > BULK_MAX_JOBS:
+        raise HTTPException(status_code=400, detail=f"Massimo {BULK_MAX_JOBS} job per richiesta")
+
+    jobs = {
+        job.id: job
+        for job in db.query(Job)
+        .options(selectinload(Job.consumi), selectinload(Job.quote_version).selectinload(QuoteVersion.righe))
+        .filter(Job.id.in_(job_ids))
+    }
+    rates = load_filament_rates(db, {cons.filament_id for job in jobs.values() for cons in job.consumi})
+    completing = status == JobStatus.completato.value
+    if completing:
+        with_entries = set(db.scalars(select(CostEntry.job_id).where(CostEntry.job_id.in_(list(jobs))).distinct()))
+        category_ids = resolve_cost_categories(db, user_id)
+        periodo = datetime.now().strftime("%Y-%m")
+
+    results: dict[int, str | None] = {}
+    rows: list[dict] = []
+    kpi_changes: list[tuple[JobKpiState, JobKpiState]] = []
+    for job_id in job_ids:
+        job = jobs.get(job_id)
+        if job is None:
+            results[job_id] = "Job non trovato"
             continue
-        costo_spool = Decimal(str(fil.costo_spool_eur))
-        denom = Decimal(str(fil.peso_nominale_g or 1000))
-        costo_per_g = (costo_spool / denom) if denom != 0 else Decimal("0")
-        costo_materiali += costo_per_g * Decimal(str(cons.peso_g or 0))
-    
-    if costo_materiali > 0:
-        cat_mat = get_or_create_category("Materiali", "Filamenti e materiali di stampa")
-        entry = CostEntry(
-            categoria_id=cat_mat.id,
-            importo_eur=float(costo_materiali.quantize(Decimal("0.01"))),
-            periodo_yyyymm=periodo,
-            job_id=job.id,
-            note=f"Materiali job #{job.id}"
-        )
-        entry.created_by_id = user_id
-        entry.updated_by_id = user_id
-        entries.append(entry)
-    
-    # 2. Costo energia
-    tempo_totale_min = Decimal(str(job.tempo_reale_min or 0)) * qty
-    energia_totale_kwh = Decimal(str(job.energia_kwh or 0)) * qty
-    
-    # Recupera costo energia dalle impostazioni (se disponibile) o usa quello del preventivo
-    from app.db import settings as db_settings
-    try:
-        settings = db_settings.get_settings(db)
-        costo_kwh = Decimal(str(settings.costo_kwh_eur))
-    except:
-        costo_kwh = Decimal(str(qv.costo_energia_kwh))
-    
-    costo_energia = energia_totale_kwh * costo_kwh
-    
-    if costo_energia > 0:
-        cat_energia = get_or_create_category("Energia", "Costi energia elettrica")
-        entry = CostEntry(
-            categoria_id=cat_energia.id,
-            importo_eur=float(costo_energia.quantize(Decimal("0.01"))),
-            periodo_yyyymm=periodo,
-            job_id=job.id,
-            note=f"Energia job #{job.id} ({float(energia_totale_kwh.quantize(Decimal('0.01')))} kWh)"
-        )
-        entry.created_by_id = user_id
-        entry.updated_by_id = user_id
-        entries.append(entry)
-    
-    # 3. Costo manodopera proporzionato alla quantità prodotta
-    manodopera_totale_prev = Decimal(str(sum((line.ore_manodopera_min or 0) for line in qv.righe)))
-    if quantita_preventivo > 0:
-        manodopera_per_pezzo_min = manodopera_totale_prev / quantita_preventivo
-    else:
-        manodopera_per_pezzo_min = manodopera_totale_prev
-    manodopera_totale_min = manodopera_per_pezzo_min * qty
-    labor_hours = manodopera_totale_min / Decimal("60")
-    costo_manodopera = labor_hours * Decimal(str(qv.costo_manodopera_eur_h))
-    hours = tempo_totale_min / Decimal("60")
-
-    if costo_manodopera > 0:
-        cat_manodopera = get_or_create_category("Manodopera", "Costi del lavoro")
-        entry = CostEntry(
-            categoria_id=cat_manodopera.id,
-            importo_eur=float(costo_manodopera.quantize(Decimal("0.01"))),
-            periodo_yyyymm=periodo,
-            job_id=job.id,
-            note=f"Manodopera job #{job.id} ({float(labor_hours.quantize(Decimal('0.1')))}h)"
-        )
-        entry.created_by_id = user_id
-        entry.updated_by_id = user_id
-        entries.append(entry)
-    
-    # 4. Costo macchina (ammortamento)
-    costo_macchina = hours * Decimal(str(qv.costo_macchina_eur_h))
-    
-    if costo_macchina > 0:
-        cat_macchina = get_or_create_category("Ammortamento", "Quota ammortamento stampanti")
-        entry = CostEntry(
-            categoria_id=cat_macchina.id,
-            importo_eur=float(costo_macchina.quantize(Decimal("0.01"))),
-            periodo_yyyymm=periodo,
-            job_id=job.id,
-            note=f"Uso macchina job #{job.id} ({float(hours.quantize(Decimal('0.1')))}h)"
-        )
-        entry.created_by_id = user_id
-        entry.updated_by_id = user_id
-        entries.append(entry)
-    
-    # 5. Consumabili fissi (moltiplicati per quantità)
-    consumabili = Decimal(str(qv.consumabili_fissi_eur or 0)) * qty
-    
-    if consumabili > 0:
-        cat_cons = get_or_create_category("Consumabili", "Consumabili di stampa")
-        entry = CostEntry(
-            categoria_id=cat_cons.id,
-            importo_eur=float(consumabili.quantize(Decimal("0.01"))),
-            periodo_yyyymm=periodo,
-            job_id=job.id,
-            note=f"Consumabili job #{job.id} (qty: {int(qty)})"
-        )
-        entry.created_by_id = user_id
-        entry.updated_by_id = user_id
-        entries.append(entry)
-    
-    # 6. Overhead e rischio (calcolato come percentuale sui costi base)
-    base = costo_materiali + costo_macchina + costo_manodopera + costo_energia + consumabili
-    overhead = base * Decimal(str(qv.overhead_pct)) / Decimal("100")
-    rischio = base * Decimal(str(qv.rischio_pct or 0)) / Decimal("100")
-    
-    if overhead > 0:
-        cat_overhead = get_or_create_category("Generali", "Costi generali")
-        entry = CostEntry(
-            categoria_id=cat_overhead.id,
-            importo_eur=float(overhead.quantize(Decimal("0.01"))),
-            periodo_yyyymm=periodo,
-            job_id=job.id,
-            note=f"Overhead job #{job.id} ({qv.overhead_pct}%)"
-        )
-        entry.created_by_id = user_id
-        entry.updated_by_id = user_id
-        entries.append(entry)
-    
-    if rischio > 0:
-        cat_rischio = get_or_create_category("Rischio", "Fattore di rischio")
-        entry = CostEntry(
-            categoria_id=cat_rischio.id,
-            importo_eur=float(rischio.quantize(Decimal("0.01"))),
-            periodo_yyyymm=periodo,
-            job_id=job.id,
-            note=f"Rischio job #{job.id} ({qv.rischio_pct or 0}%)"
-        )
-        entry.created_by_id = user_id
-        entry.updated_by_id = user_id
-        entries.append(entry)
-    
-    # Aggiungi tutte le voci al database
-    db.add_all(entries)
+        if job.status == status:
+            results[job_id] = f"Job già in stato {status}"
+            continue
+        if job.quote_version is None:
+            results[job_id] = "Versione preventivo non trovata"
+            continue
+        breakdown = compute_job_breakdown(job, job.quote_version, rates)
+        before = job_kpi_state(job)
+        job.status = status
+        job.updated_by_id = user_id
+        job.costo_finale_eur = from_cents(breakdown.costo_finale)
+        job.margine_eur = from_cents(breakdown.margine)
+        if completing and job.id not in with_entries:
+            rows.extend(cost_entry_rows(breakdown, category_ids, periodo, user_id))
+        kpi_changes.append((before, job_kpi_state(job)))
+        results[job_id] = None
 
+    insert_cost_entries(db, rows)
+    record_job_changes(db, kpi_changes)
+    return results
@@ -0,0 +1,275 @@
+"""Rollup mensile dei KPI della dashboard (tabelle ``kpi_monthly*``).
+
+Gli endpoint che scrivono preventivi, job e voci di costo chiamano le funzioni
+``record_*`` nella stessa transazione della scrittura: ogni aggiornamento è un
+``UPDATE ... SET col = col + delta`` atomico sulla riga del mese, creata al
+primo uso. Così ``/dashboard/kpi`` legge una sola riga per chiave primaria.
+
+Per ricostruire il rollup dai dati (backfill, correzioni manuali sul DB)::
+
+    python -m app.db.rebuild_kpi
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.money import Number, to_cents
+from app.models.costs import CostEntry
+from app.models.job import Job, JobStatus
+from app.models.kpi import KpiMonthly, KpiMonthlyCost, KpiMonthlyCustomer
+from app.models.quote import Quote, QuoteStatus, QuoteVersion
+
+# Contatori dei job per stato: totali correnti, riportati da un mese al successivo
+JOB_STATUS_COLUMNS = {
+    JobStatus.pianificato.value: "job_pianificati",
+    JobStatus.in_corso.value: "job_in_corso",
+    JobStatus.completato.value: "job_completati",
+    JobStatus.annullato.value: "job_annullati",
+}
+MONTHLY_COLUMNS = (
+    "preventivi_creati",
+    "ricavi_accettati_cents",
+    "costi_cents",
+    "clienti_attivi",
+    "job_chiusi",
+    "margine_cents_somma",
+    "ricavo_cents_somma",
+)
+REBUILD_BATCH_SIZE = 1000
+
+
+def periodo_of(dt: datetime | None = None) -> str:
+    """Mese ``YYYY-MM`` (UTC) di ``dt``, o del momento attuale."""
+    return (dt or datetime.utcnow()).strftime("%Y-%m")
+
+
+def _carried_state_statement(periodo: str):
+    cols = JOB_STATUS_COLUMNS.values()
+    return select(*(getattr(KpiMonthly, c) for c in cols)).where(KpiMonthly.periodo < periodo).order_by(KpiMonthly.periodo.desc()).limit(1)
+
+
+def _carried_state(db: Session, periodo: str) -> dict[str, int]:
+    prev = db.execute(_carried_state_statement(periodo)).first()
+    return dict(zip(JOB_STATUS_COLUMNS.values(), prev)) if prev else {}
+
+
+def _insert_once(db: Session, stmt) -> bool:
+    """Esegue un insert in un savepoint; ``False`` se la riga esiste già (transazione concorrente)."""
+    try:
+        with db.begin_nested():
+            db.execute(stmt)
+        return True
+    except IntegrityError:
+        return False
+
+
+def _bump(db: Session, periodo: str, deltas: dict[str, int]) -> None:
+    deltas = {col: d for col, d in deltas.items() if d}
+    if not deltas:
+        return
+    stmt = (
+        update(KpiMonthly)
+        .where(KpiMonthly.periodo == periodo)
+        .values({col: getattr(KpiMonthly, col) + d for col, d in deltas.items()})
+        .execution_options(synchronize_session=False)
+    )
+    if db.execute(stmt).rowcount == 0:
+        row = {col: 0 for col in (*MONTHLY_COLUMNS, *JOB_STATUS_COLUMNS.values())}
+        row.update(_carried_state(db, periodo), periodo=periodo)
+        _insert_once(db, insert(KpiMonthly).values(row))
+        db.execute(stmt)
+
+
+def _bump_customer(db: Session, periodo: str, customer_id: int, delta: int) -> None:
+    key = (KpiMonthlyCustomer.periodo == periodo, KpiMonthlyCustomer.customer_id == customer_id)
+    stmt = (
+        update(KpiMonthlyCustomer)
+        .where(*key)
+        .values(versioni=KpiMonthlyCustomer.versioni + delta)
+        .execution_options(synchronize_session=False)
+    )
+    if db.execute(stmt).rowcount == 0:
+        if delta > 0 and _insert_once(db, insert(KpiMonthlyCustomer).values(periodo=periodo, customer_id=customer_id, versioni=delta)):
+            _bump(db, periodo, {"clienti_attivi": 1})
+        elif delta > 0:
+            db.execute(stmt)
+        return
+    if delta < 0 and db.execute(delete(KpiMonthlyCustomer).where(*key, KpiMonthlyCustomer.versioni <= 0)).rowcount:
+        _bump(db, periodo, {"clienti_attivi": -1})
+
+
+def accepted_revenue_cents(qv: QuoteVersion) -> int:
+    """Contributo di ``qv`` ai ricavi del mese: l'imponibile se ACCETTATO, altrimenti 0."""
+    return to_cents(qv.totale_imponibile_eur) if qv.status == QuoteStatus.ACCETTATO else 0
+
+
+def record_quote_version_created(db: Session, qv: QuoteVersion, customer_id: int) -> None:
+    periodo = periodo_of(qv.created_at)
+    _bump(db, periodo, {"preventivi_creati": 1, "ricavi_accettati_cents": accepted_revenue_cents(qv)})
+    _bump_customer(db, periodo, customer_id, 1)
+
+
+def record_quote_revenue(db: Session, qv: QuoteVersion, before_cents: int) -> None:
+    """Da chiamare dopo un cambio di stato o di totali, con :func:`accepted_revenue_cents` letto prima."""
+    _bump(db, periodo_of(qv.created_at), {"ricavi_accettati_cents": accepted_revenue_cents(qv) - before_cents})
+
+
+def record_quote_deleted(db: Session, quote: Quote) -> None:
+    for qv in quote.versions:
+        periodo = periodo_of(qv.created_at)
+        _bump(db, periodo, {"preventivi_creati": -1, "ricavi_accettati_cents": -accepted_revenue_cents(qv)})
+        _bump_customer(db, periodo, quote.customer_id, -1)
+
+
+def record_costs(db: Session, voci: Iterable[tuple[str, int, Number]], sign: int = 1) -> None:
+    """Aggiunge (``sign=-1``: toglie) voci di costo ``(periodo_yyyymm, categoria_id, importo_eur)``."""
+    per_categoria: dict[tuple[str, int], int] = defaultdict(int)
+    for periodo, categoria_id, importo in voci:
+        per_categoria[(periodo, categoria_id)] += sign * to_cents(importo)
+    per_periodo: dict[str, int] = defaultdict(int)
+    for (periodo, categoria_id), cents in per_categoria.items():
+        per_periodo[periodo] += cents
+        key = (KpiMonthlyCost.periodo == periodo, KpiMonthlyCost.categoria_id == categoria_id)
+        stmt = (
+            update(KpiMonthlyCost)
+            .where(*key)
+            .values(totale_cents=KpiMonthlyCost.totale_cents + cents)
+            .execution_options(synchronize_session=False)
+        )
+        if db.execute(stmt).rowcount == 0:
+            if not _insert_once(db, insert(KpiMonthlyCost).values(periodo=periodo, categoria_id=categoria_id, totale_cents=cents)):
+                db.execute(stmt)
+        elif cents < 0:
+            db.execute(delete(KpiMonthlyCost).where(*key, KpiMonthlyCost.totale_cents == 0))
+    for periodo, cents in per_periodo.items():
+        _bump(db, periodo, {"costi_cents": cents})
+
+
+@dataclass(frozen=True)
+class JobKpiState:
+    """Cosa un job contribuisce al rollup: mese di creazione, stato e, se completato, margine e ricavo.
+
+    Stessa definizione di :mod:`app.services.margins`: ricavo = costo finale + margine.
+    """
+
+    periodo: str
+    status: str
+    margine_cents: int | None = None
+    ricavo_cents: int | None = None
+
+
+def job_kpi_state(job: Job) -> JobKpiState:
+    state = JobKpiState(periodo=periodo_of(job.created_at), status=job.status)
+    if job.status == JobStatus.completato.value:
+        margine = to_cents(job.margine_eur)
+        ricavo = to_cents(job.costo_finale_eur) + margine
+        if ricavo > 0:
+            state = JobKpiState(state.periodo, state.status, margine, ricavo)
+    return state
+
+
+def record_job_changes(db: Session, changes: Iterable[tuple[JobKpiState | None, JobKpiState | None]]) -> None:
+    """Applica le differenze ``(prima, dopo)`` di più job; ``None`` per job creati o eliminati."""
+    deltas: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    corrente = deltas[periodo_of()]
+    for before, after in changes:
+        if before == after:
+            continue
+        for sign, state in ((-1, before), (1, after)):
+            if state is None:
+                continue
+            corrente[JOB_STATUS_COLUMNS[state.status]] += sign
+            if state.ricavo_cents is not None:
+                deltas[state.periodo]["job_chiusi"] += sign
+                deltas[state.periodo]["margine_cents_somma"] += sign * state.margine_cents
+                deltas[state.periodo]["ricavo_cents_somma"] += sign * state.ricavo_cents
+    for periodo, cols in deltas.items():
+        _bump(db, periodo, cols)
+
+
+def record_job_change(db: Session, before: JobKpiState | None, after: JobKpiState | None) -> None:
+    record_job_changes(db, [(before, after)])
+
+
+def load_kpi_month(db: Session, periodo: str) -> KpiMonthly:
+    """Riga del mese; se non esiste ancora, una riga vuota (non salvata) con gli stati riportati."""
+    row = db.get(KpiMonthly, periodo)
+    return row if row is not None else _empty_month(periodo, _carried_state(db, periodo))
+
+
+async def load_kpi_month_async(db: AsyncSession, periodo: str) -> KpiMonthly:
+    row = await db.get(KpiMonthly, periodo)
+    if row is not None:
+        return row
+    prev = (await db.execute(_carried_state_statement(periodo))).first()
+    return _empty_month(periodo, dict(zip(JOB_STATUS_COLUMNS.values(), prev)) if prev else {})
+
+
+def _empty_month(periodo: str, carried: dict[str, int]) -> KpiMonthly:
+    row = KpiMonthly(periodo=periodo, **{col: 0 for col in MONTHLY_COLUMNS})
+    for col in JOB_STATUS_COLUMNS.values():
+        setattr(row, col, carried.get(col, 0))
+    return row
+
+
+def rebuild_kpi(db: Session) -> int:
+    """Ricostruisce da zero le tabelle di rollup e restituisce il numero di mesi.
+
+    Gli stati dei job dei mesi passati non hanno uno storico: per ogni mese si
+    contano i job creati fino a quel mese secondo il loro stato attuale.
+    """
+    months: dict[str, dict[str, int]] = defaultdict(lambda: dict.fromkeys(MONTHLY_COLUMNS, 0))
+    customers: dict[tuple[str, int], int] = defaultdict(int)
+
+    versions = select(QuoteVersion.created_at, QuoteVersion.status, QuoteVersion.totale_imponibile_eur, Quote.customer_id).join(Quote)
+    for created_at, status, imponibile, customer_id in db.execute(versions.execution_options(yield_per=REBUILD_BATCH_SIZE)):
+        periodo = periodo_of(created_at)
+        months[periodo]["preventivi_creati"] += 1
+        if status == QuoteStatus.ACCETTATO:
+            months[periodo]["ricavi_accettati_cents"] += to_cents(imponibile)
+        customers[(periodo, customer_id)] += 1
+    for periodo, _ in customers:
+        months[periodo]["clienti_attivi"] += 1
+
+    costs = db.execute(
+        select(CostEntry.periodo_yyyymm, CostEntry.categoria_id, func.sum(CostEntry.importo_eur)).group_by(CostEntry.periodo_yyyymm, CostEntry.categoria_id)
+    ).all()
+    for periodo, _, totale in costs:
+        months[periodo]["costi_cents"] += to_cents(totale)
+
+    created_by_status: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    jobs = select(Job.created_at, Job.status, Job.margine_eur, Job.costo_finale_eur)
+    for created_at, status, margine, costo in db.execute(jobs.execution_options(yield_per=REBUILD_BATCH_SIZE)):
+        periodo = periodo_of(created_at)
+        months[periodo]  # il mese esiste anche se ha solo job
+        created_by_status[periodo][status] += 1
+        ricavo = to_cents(costo) + to_cents(margine)
+        if status == JobStatus.completato.value and ricavo > 0:
+            months[periodo]["job_chiusi"] += 1
+            months[periodo]["margine_cents_somma"] += to_cents(margine)
+            months[periodo]["ricavo_cents_somma"] += ricavo
+
+    months[periodo_of()]  # la riga del mese corrente porta i totali attuali
+    cumulati: dict[str, int] = defaultdict(int)
+    rows = []
+    for periodo in sorted(months):
+        for status, n in created_by_status.get(periodo, {}).items():
+            cumulati[status] += n
+        rows.append({"periodo": periodo, **months[periodo], **{col: cumulati[status] for status, col in JOB_STATUS_COLUMNS.items()}})
+
+    db.execute(delete(KpiMonthlyCustomer))
+    db.execute(delete(KpiMonthlyCost))
+    db.execute(delete(KpiMonthly))
+    if rows:
+        db.execute(insert(KpiMonthly), rows)
+    if customers:
+        db.execute(insert(KpiMonthlyCustomer), [{"periodo": p, "customer_id": c, "versioni": n} for (p, c), n in customers.items()])
+    if costs:
+        db.execute(insert(KpiMonthlyCost), [{"periodo": p, "categoria_id": c, "totale_cents": to_cents(t)} for p, c, t in costs])
+    return len(rows)
@@ -0,0 +1,150 @@
+"""Analisi dei margini dei job completati, calcolata interamente in SQL.
+
+Il margine % di un job è ``margine / ricavo`` con ricavo = costo finale +
+margine (il ricavo proporzionale alla quantità prodotta, vedi
+:func:`app.services.jobs.compute_job_breakdown`). Per ogni gruppo (tutti, per
+cliente o per stampante) un'unica query con funzioni finestra restituisce:
+
+- media ponderata: somma margini / somma ricavi;
+- mediana e percentili con il metodo *nearest rank*: il valore in posizione
+  ``ceil(p * n / 100)`` nell'ordinamento per margine %.
+
+La query legge solo le righe dei percentili richiesti (al massimo uno per
+percentile e gruppo), quindi il risultato non cresce con lo storico dei job.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Literal
+
+from sqlalchemy import func, literal, null, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.money import from_cents, to_cents
+from app.models.customer import Customer
+from app.models.job import Job, JobStatus
+from app.models.printer import Printer
+from app.models.quote import Quote, QuoteVersion
+
+GroupBy = Literal["customer", "printer"]
+DEFAULT_PERCENTILES = (25, 50, 75, 90)
+
+
+@dataclass
+class MarginStats:
+    gruppo_id: int | None
+    gruppo: str
+    job: int
+    margine_eur: float
+    ricavo_eur: float
+    margine_medio_pct: float
+    percentili_pct: dict[int, float] = field(default_factory=dict)
+
+    @property
+    def mediana_pct(self) -> float | None:
+        return self.percentili_pct.get(50)
+
+
+def _group_columns(group_by: GroupBy | None):
+    if group_by == "customer":
+        return Quote.customer_id, Customer.ragione_sociale
+    if group_by == "printer":
+        return QuoteVersion.printer_id, Printer.nome
+    return null(), literal("Tutti")
+
+
+def margin_stats_statement(
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    group_by: GroupBy | None = None,
+    percentiles: tuple[int, ...] = DEFAULT_PERCENTILES,
+):
+    """Statement (riusabile anche con sessioni async) delle statistiche per gruppo.
+
+    Restituisce, per ogni gruppo, una riga per ogni percentile distinto con
+    ``gruppo_id, gruppo, n, margine, ricavo, rn, pct``.
+    """
+    gruppo_id, gruppo = _group_columns(group_by)
+    ricavo = Job.costo_finale_eur + Job.margine_eur
+    base = (
+        select(
+            gruppo_id.label("gruppo_id"),
+            gruppo.label("gruppo"),
+            Job.margine_eur.label("margine"),
+            ricavo.label("ricavo"),
+            (Job.margine_eur * 100 / ricavo).label("pct"),
+        )
+        .join(QuoteVersion, Job.quote_version_id == QuoteVersion.id)
+        .where(Job.status == JobStatus.completato.value, ricavo > 0)
+    )
+    if group_by == "customer":
+        base = base.join(Quote, QuoteVersion.quote_id == Quote.id).join(Customer, Quote.customer_id == Customer.id)
+    elif group_by == "printer":
+        base = base.outerjoin(Printer, QuoteVersion.printer_id == Printer.id)
+    if date_from:
+        base = base.where(Job.created_at >= date_from)
+    if date_to:
+        base = base.where(Job.created_at < date_to)
+    base = base.subquery()
+
+    partition = base.c.gruppo_id if group_by else None
+    ranked = select(
+        base.c.gruppo_id,
+        base.c.gruppo,
+        base.c.pct,
+        func.row_number().over(partition_by=partition, order_by=(base.c.pct, base.c.margine)).label("rn"),
+        func.count().over(partition_by=partition).label("n"),
+        func.sum(base.c.margine).over(partition_by=partition).label("margine"),
+        func.sum(base.c.ricavo).over(partition_by=partition).label("ricavo"),
+    ).subquery()
+
+    # nearest rank: posizione ceil(p * n / 100) in aritmetica intera
+    ranks = [(p * ranked.c.n + 99) // 100 for p in sorted(set(percentiles))]
+    return (
+        select(ranked.c.gruppo_id, ranked.c.gruppo, ranked.c.n, ranked.c.margine, ranked.c.ricavo, ranked.c.rn, ranked.c.pct)
+        .where(or_(*(ranked.c.rn == rank for rank in ranks)))
+        .order_by(ranked.c.gruppo_id, ranked.c.rn)
+    )
+
+
+def margin_stats(
+    db: Session,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    group_by: GroupBy | None = None,
+    percentiles: tuple[int, ...] = DEFAULT_PERCENTILES,
+) -> list[MarginStats]:
+    """Statistiche dei margini dei job completati creati in ``[date_from, date_to)``."""
+    percentiles = tuple(sorted(set(percentiles)))
+    return _collect(db.execute(margin_stats_statement(date_from, date_to, group_by, percentiles)), percentiles)
+
+
+async def margin_stats_async(
+    db: AsyncSession,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    group_by: GroupBy | None = None,
+    percentiles: tuple[int, ...] = DEFAULT_PERCENTILES,
+) -> list[MarginStats]:
+    percentiles = tuple(sorted(set(percentiles)))
+    return _collect(await db.execute(margin_stats_statement(date_from, date_to, group_by, percentiles)), percentiles)
+
+
+def _collect(rows, percentiles: tuple[int, ...]) -> list[MarginStats]:
+    stats: dict[int | None, MarginStats] = {}
+    for gruppo_id, gruppo, n, margine, ricavo, rn, pct in rows:
+        s = stats.get(gruppo_id)
+        if s is None:
+            margine_cents, ricavo_cents = to_cents(margine), to_cents(ricavo)
+            s = stats[gruppo_id] = MarginStats(
+                gruppo_id=gruppo_id,
+                gruppo=gruppo or "Senza stampante",
+                job=n,
+                margine_eur=from_cents(margine_cents),
+                ricavo_eur=from_cents(ricavo_cents),
+                margine_medio_pct=round(margine_cents * 100 / ricavo_cents, 2),
+            )
+        for p in percentiles:
+            if (p * n + 99) // 100 == rn:
+                s.percentili_pct[p] = round(float(pct), 2)
+    return sorted(stats.values(), key=lambda s: s.ricavo_eur, reverse=True)
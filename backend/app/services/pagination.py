@@ -0,0 +1,140 @@
+"""Paginazione keyset (a cursore) condivisa dagli endpoint di elenco.
+
+Ogni pagina è una query ``WHERE (chiave, id) < (ultimo valore, ultimo id)
+ORDER BY chiave, id LIMIT n`` che usa gli indici ``(chiave, id)``: il costo non
+dipende dalla posizione nella tabella, a differenza di ``OFFSET``. Il cursore
+(opaco per il client) codifica ordinamento e ultima riga restituita; gli
+endpoint lo espongono nell'header ``X-Next-Cursor`` così il corpo resta una
+lista e i client esistenti continuano a funzionare.
+
+Le funzioni lavorano su statement ``select()`` e non sulla sessione, così
+:func:`keyset_statement` e :func:`build_page` valgono anche per sessioni async.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import DateTime, Select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass(frozen=True)
+class PageParams:
+    limit: int = DEFAULT_PAGE_SIZE
+    cursor: str | None = None
+    sort: str | None = None
+
+
+@dataclass(frozen=True)
+class KeysetSort:
+    """Ordinamento risolto: nome della chiave, colonna, colonna id e verso."""
+
+    name: str
+    column: Any
+    id_column: Any
+    desc: bool
+
+    @property
+    def token(self) -> str:
+        return f"-{self.name}" if self.desc else self.name
+
+
+def _encode_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _decode_value(column: Any, value: Any) -> Any:
+    if value is not None and isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def encode_cursor(sort: KeysetSort, item: Any) -> str:
+    payload = {"s": sort.token, "v": _encode_value(getattr(item, sort.name)), "id": item.id}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(sort: KeysetSort, cursor: str) -> tuple[Any, int]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if payload["s"] != sort.token:
+            raise ValueError
+        return _decode_value(sort.column, payload["v"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursore non valido")
+
+
+def resolve_sort(sort_keys: dict[str, Any], sort: str | None, default: str = "-id") -> KeysetSort:
+    """Risolve ``sort`` (``campo`` o ``-campo``) tra le chiavi ammesse; ``sort_keys`` deve contenere ``id``."""
+    token = sort or default
+    desc = token.startswith("-")
+    name = token.lstrip("-")
+    if name not in sort_keys:
+        raise HTTPException(status_code=400, detail=f"Ordinamento non valido, ammessi: {', '.join(sorted(sort_keys))}")
+    return KeysetSort(name=name, column=sort_keys[name], id_column=sort_keys["id"], desc=desc)
+
+
+def keyset_statement(stmt: Select, sort: KeysetSort, params: PageParams) -> Select:
+    """Aggiunge a ``stmt`` condizione del cursore, ordinamento e limite (una riga in più)."""
+    col, id_col = sort.column, sort.id_column
+    if params.cursor:
+        value, last_id = decode_cursor(sort, params.cursor)
+        if sort.desc:
+            after = id_col < last_id if col is id_col else or_(col < value, and_(col == value, id_col < last_id))
+        else:
+            after = id_col > last_id if col is id_col else or_(col > value, and_(col == value, id_col > last_id))
+        stmt = stmt.where(after)
+    order = [col.desc(), id_col.desc()] if sort.desc else [col.asc(), id_col.asc()]
+    if col is id_col:
+        order = order[1:]
+    return stmt.order_by(*order).limit(params.limit + 1)
+
+
+def build_page(rows: Sequence[Any], sort: KeysetSort, params: PageParams) -> tuple[list, str | None]:
+    """Separa la riga in più letta da :func:`keyset_statement` e calcola il cursore successivo."""
+    items = list(rows[: params.limit])
+    next_cursor = encode_cursor(sort, items[-1]) if len(rows) > params.limit else None
+    return items, next_cursor
+
+
+def paginate(
+    db: Session,
+    stmt: Select,
+    sort_keys: dict[str, Any],
+    params: PageParams,
+    response: Response | None = None,
+    default_sort: str = "-id",
+) -> list:
+    """Esegue una pagina di ``stmt`` e, se c'è, scrive il cursore successivo nell'header di ``response``."""
+    sort = resolve_sort(sort_keys, params.sort, default_sort)
+    rows = db.scalars(keyset_statement(stmt, sort, params)).unique().all()
+    return _page(rows, sort, params, response)
+
+
+async def paginate_async(
+    db: AsyncSession,
+    stmt: Select,
+    sort_keys: dict[str, Any],
+    params: PageParams,
+    response: Response | None = None,
+    default_sort: str = "-id",
+) -> list:
+    """Come :func:`paginate` con una sessione async; le relazioni lette nella risposta vanno caricate in ``stmt``."""
+    sort = resolve_sort(sort_keys, params.sort, default_sort)
+    rows = (await db.scalars(keyset_statement(stmt, sort, params))).unique().all()
+    return _page(rows, sort, params, response)
+
+
+def _page(rows: Sequence[Any], sort: KeysetSort, params: PageParams, response: Response | None) -> list:
+    items, next_cursor = build_page(rows, sort, params)
+    if response is not None and next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
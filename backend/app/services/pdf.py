@@ -1,99 +1,228 @@
+from dataclasses import asdict, dataclass
 from io import BytesIO
+from typing import TYPE_CHECKING
+import hashlib
+import json
+
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
 
-from app.models.quote import Quote, QuoteVersion
-from app.models.settings import PreventivoSettingsDB
+if TYPE_CHECKING:  # il rendering lavora su QuotePdfData, senza ORM (gira anche in un processo separato)
+    from app.models.quote import Quote, QuoteVersion
+    from app.models.settings import PreventivoSettingsDB
 
+# Da incrementare quando cambia il layout: invalida le chiavi della cache PDF
+PDF_LAYOUT_VERSION = 2
 
-def render_quote_pdf(quote: Quote, qv: QuoteVersion, settings: PreventivoSettingsDB) -> (bytes, str):
-    buff = BytesIO()
-    # Nome file dinamico
-    filename = f"PREVENTIVO_{quote.codice}_v{qv.version_number}.pdf"
-    c = canvas.Canvas(buff, pagesize=A4)
-    width, height = A4
 
+@dataclass(frozen=True)
+class QuotePdfLine:
+    descrizione: str
+    peso_materiale_g: str
+    tempo_stimato_min: str
+    totale_riga_eur: float
 
 
-    # Layout semplificato: solo testo e linee orizzontali
-    x = 20 * mm
-    y = height - 25 * mm
+@dataclass(frozen=True)
+class QuotePdfData:
+    """Tutto ciò che finisce nel PDF, in tipi semplici: serializzabile e confrontabile."""
+
+    codice: str
+    version_number: int
+    stato: str
+    cliente: str
+    email: str
+    telefono: str
+    indirizzo: str
+    company_name: str
+    company_address: str
+    company_email: str
+    company_phone: str
+    righe: tuple[QuotePdfLine, ...]
+    applica_iva: bool
+    iva_pct: float
+    totale_imponibile_eur: float
+    totale_iva_eur: float
+    totale_lordo_eur: float
+
+    @property
+    def filename(self) -> str:
+        # Nome file dinamico
+        return f"PREVENTIVO_{self.codice}_v{self.version_number}.pdf"
+
+    def cache_key(self) -> str:
+        """Hash del contenuto: stesso hash, stesso PDF (chiave della cache ed ETag)."""
+        payload = json.dumps([PDF_LAYOUT_VERSION, asdict(self)], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def quote_pdf_data(quote: "Quote", qv: "QuoteVersion", settings: "PreventivoSettingsDB") -> QuotePdfData:
+    customer = quote.customer
+    cliente_str = customer.ragione_sociale.strip() if customer.ragione_sociale and customer.ragione_sociale.strip() != '' else f"{customer.nome} {customer.cognome}".strip()
+    return QuotePdfData(
+        codice=quote.codice,
+        version_number=qv.version_number,
+        # Stato solo testo
+        stato=str(qv.status).replace('QuoteStatus.', ''),
+        cliente=cliente_str,
+        email=customer.email or '-',
+        telefono=customer.telefono or '-',
+        indirizzo=customer.indirizzo or '-',
+        company_name=settings.company_name,
+        company_address=settings.company_address,
+        company_email=settings.company_email,
+        company_phone=settings.company_phone,
+        righe=tuple(
+            QuotePdfLine(line.descrizione, str(line.peso_materiale_g), str(line.tempo_stimato_min), float(line.totale_riga_eur))
+            for line in qv.righe
+        ),
+        applica_iva=bool(qv.applica_iva),
+        iva_pct=float(qv.iva_pct),
+        totale_imponibile_eur=float(qv.totale_imponibile_eur),
+        totale_iva_eur=float(qv.totale_iva_eur),
+        totale_lordo_eur=float(qv.totale_lordo_eur),
+    )
+
+
+def render_quote_pdf(quote: "Quote", qv: "QuoteVersion", settings: "PreventivoSettingsDB") -> (bytes, str):
+    data = quote_pdf_data(quote, qv, settings)
+    return render_pdf_data(data), data.filename
+
+
+# Form XObject ReportLab: definiti una volta per documento e stampati su ogni pagina
+HEADER_FORM = "intestazione"
+FOOTER_FORM = "pie_pagina"
+TABLE_HEAD_FORM = "testata_righe"
+
+X = 20 * mm
+_, PAGE_HEIGHT = A4
+TABLE_HEAD_Y = PAGE_HEIGHT / 2  # quota di riferimento della testata nel form, traslata dove serve
+BOTTOM_Y = 40 * mm  # sotto questa quota si passa alla pagina successiva
+TOTALS_HEIGHT = 40 * mm
+
+
+def _define_forms(c: canvas.Canvas, data: QuotePdfData) -> None:
+    # Intestazione aziendale e filetto
+    c.beginForm(HEADER_FORM)
+    y = PAGE_HEIGHT - 25 * mm
     c.setFont("Helvetica-Bold", 18)
-    c.drawString(x, y, settings.company_name)
+    c.drawString(X, y, data.company_name)
     c.setFont("Helvetica", 10)
-    c.drawString(x, y - 7 * mm, f"{settings.company_address} | {settings.company_email} | {settings.company_phone}")
-    y -= 20 * mm
+    c.drawString(X, y - 7 * mm, f"{data.company_address} | {data.company_email} | {data.company_phone}")
     c.setLineWidth(0.5)
-    c.line(x, y, x + 170 * mm, y)
-    y -= 7 * mm
+    c.line(X, y - 20 * mm, X + 170 * mm, y - 20 * mm)
+    c.endForm()
+
+    c.beginForm(FOOTER_FORM)
+    c.setFont("Helvetica-Oblique", 8)
+    c.drawString(X, 20 * mm, "Documento generato automaticamente da PrintLab3D Manager")
+    c.endForm()
+
+    # Tabella righe semplice: intestazioni di colonna e filetto
+    c.beginForm(TABLE_HEAD_FORM)
+    y = TABLE_HEAD_Y
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(X, y, "Descrizione")
+    c.drawString(X + 60 * mm, y, "Materiale (g)")
+    c.drawString(X + 90 * mm, y, "Tempo (min)")
+    c.drawString(X + 120 * mm, y, "Totale riga (€)")
+    c.setLineWidth(0.2)
+    c.line(X, y - 7 * mm, X + 150 * mm, y - 7 * mm)
+    c.endForm()
+
+
+def _table_head(c: canvas.Canvas, y: float) -> float:
+    """Stampa la testata della tabella alla quota ``y`` e restituisce la quota della prima riga."""
+    c.saveState()
+    c.translate(0, y - TABLE_HEAD_Y)
+    c.doForm(TABLE_HEAD_FORM)
+    c.restoreState()
+    return y - 10 * mm
+
+
+def _title(c: canvas.Canvas, data: QuotePdfData, y: float, segue: bool = False) -> float:
     c.setFont("Helvetica-Bold", 15)
-    c.drawString(x, y, f"PREVENTIVO N. {quote.codice} - v{qv.version_number}")
+    c.drawString(X, y, f"PREVENTIVO N. {data.codice} - v{data.version_number}" + (" (segue)" if segue else ""))
     y -= 10 * mm
     c.setLineWidth(0.2)
-    c.line(x, y, x + 170 * mm, y)
-    y -= 7 * mm
+    c.line(X, y, X + 170 * mm, y)
+    return y - 7 * mm
+
+
+def _end_page(c: canvas.Canvas, page: int) -> None:
+    c.doForm(FOOTER_FORM)
+    c.setFont("Helvetica", 8)
+    c.drawRightString(X + 170 * mm, 20 * mm, f"Pagina {page}")
+    c.showPage()
+
+
+def _continuation_page(c: canvas.Canvas, data: QuotePdfData, page: int, table: bool = True) -> float:
+    """Chiude la pagina corrente e apre la successiva con intestazione e (se serve) testata righe."""
+    _end_page(c, page)
+    c.doForm(HEADER_FORM)
+    y = _title(c, data, PAGE_HEIGHT - 52 * mm, segue=True)
+    return _table_head(c, y) if table else y
+
+
+def render_pdf_data(data: QuotePdfData) -> bytes:
+    buff = BytesIO()
+    c = canvas.Canvas(buff, pagesize=A4)
+    _define_forms(c, data)
+    page = 1
+
+    # Layout semplificato: solo testo e linee orizzontali
+    c.doForm(HEADER_FORM)
+    y = _title(c, data, PAGE_HEIGHT - 52 * mm)
     c.setFont("Helvetica-Bold", 10)
-    c.drawString(x, y, "Dati cliente:")
+    c.drawString(X, y, "Dati cliente:")
     y -= 6 * mm
     c.setFont("Helvetica", 10)
-    cliente_str = quote.customer.ragione_sociale.strip() if quote.customer.ragione_sociale and quote.customer.ragione_sociale.strip() != '' else f"{quote.customer.nome} {quote.customer.cognome}".strip()
-    c.drawString(x, y, cliente_str)
+    c.drawString(X, y, data.cliente)
     y -= 6 * mm
-    c.drawString(x, y, f"Email: {quote.customer.email or '-'} | Tel: {quote.customer.telefono or '-'}")
+    c.drawString(X, y, f"Email: {data.email} | Tel: {data.telefono}")
     y -= 6 * mm
-    c.drawString(x, y, f"Indirizzo: {quote.customer.indirizzo or '-'}")
+    c.drawString(X, y, f"Indirizzo: {data.indirizzo}")
     y -= 10 * mm
-    # Stato solo testo
-    stato_str = str(qv.status).replace('QuoteStatus.', '')
     c.setFont("Helvetica-Bold", 12)
-    c.drawString(x, y, f"Stato: {stato_str}")
+    c.drawString(X, y, f"Stato: {data.stato}")
     y -= 12 * mm
     c.setLineWidth(0.5)
-    c.line(x, y, x + 170 * mm, y)
+    c.line(X, y, X + 170 * mm, y)
     y -= 8 * mm
 
-    # Tabella righe semplice
-    # Tabella righe semplice
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(x, y, "Descrizione")
-    c.drawString(x + 60 * mm, y, "Materiale (g)")
-    c.drawString(x + 90 * mm, y, "Tempo (min)")
-    c.drawString(x + 120 * mm, y, "Totale riga (€)")
-    y -= 7 * mm
-    c.setLineWidth(0.2)
-    c.line(x, y, x + 150 * mm, y)
-    y -= 3 * mm
-    c.setFont("Helvetica", 9)
-    for line in qv.righe:
-        if y < 40 * mm:
-            c.showPage()
-            y = height - 25 * mm
-        c.drawString(x, y, line.descrizione)
-        c.drawString(x + 60 * mm, y, str(line.peso_materiale_g))
-        c.drawString(x + 90 * mm, y, str(line.tempo_stimato_min))
-        c.drawString(x + 120 * mm, y, f"€ {float(line.totale_riga_eur):.2f}")
+    y = _table_head(c, y)
+    for line in data.righe:
+        if y < BOTTOM_Y:
+            y = _continuation_page(c, data, page)
+            page += 1
+        c.setFont("Helvetica", 9)
+        c.drawString(X, y, line.descrizione)
+        c.drawString(X + 60 * mm, y, line.peso_materiale_g)
+        c.drawString(X + 90 * mm, y, line.tempo_stimato_min)
+        c.drawString(X + 120 * mm, y, f"€ {line.totale_riga_eur:.2f}")
         y -= 7 * mm
 
+    # i totali non vengono mai spezzati tra due pagine
+    if y - TOTALS_HEIGHT < BOTTOM_Y - 20 * mm:
+        y = _continuation_page(c, data, page, table=False)
+        page += 1
     y -= 10 * mm
     c.setLineWidth(0.2)
-    c.line(x, y, x + 150 * mm, y)
+    c.line(X, y, X + 150 * mm, y)
     y -= 6 * mm
     c.setFont("Helvetica-Bold", 12)
-    if qv.applica_iva:
-        c.drawString(x, y, f"Totale imponibile: € {float(qv.totale_imponibile_eur):.2f}")
+    if data.applica_iva:
+        c.drawString(X, y, f"Totale imponibile: € {data.totale_imponibile_eur:.2f}")
         y -= 8 * mm
         c.setFont("Helvetica-Bold", 11)
-        c.drawString(x, y, f"IVA ({float(qv.iva_pct):.2f}%): € {float(qv.totale_iva_eur):.2f}")
+        c.drawString(X, y, f"IVA ({data.iva_pct:.2f}%): € {data.totale_iva_eur:.2f}")
         y -= 8 * mm
         c.setFont("Helvetica-Bold", 13)
-        c.drawString(x, y, f"Totale IVA inclusa: € {float(qv.totale_lordo_eur):.2f}")
+        c.drawString(X, y, f"Totale IVA inclusa: € {data.totale_lordo_eur:.2f}")
     else:
-        c.drawString(x, y, f"Totale: € {float(qv.totale_imponibile_eur):.2f}")
-    y -= 16 * mm
+        c.drawString(X, y, f"Totale: € {data.totale_imponibile_eur:.2f}")
 
-    c.setFont("Helvetica-Oblique", 8)
-    c.drawString(x, 20 * mm, "Documento generato automaticamente da PrintLab3D Manager")
-    c.showPage()
+    _end_page(c, page)
     c.save()
-    return buff.getvalue(), filename
+    return buff.getvalue()
@@ -0,0 +1,149 @@
+"""Cache dei PDF dei preventivi e rendering in un pool di processi.
+
+I PDF sono salvati su disco con nome uguale a :meth:`QuotePdfData.cache_key`,
+l'hash di tutto ciò che compare nel documento (versione, righe, cliente, dati
+aziendali). La cache è quindi indirizzata dal contenuto: non serve invalidarla,
+una modifica produce semplicemente un'altra chiave. La stessa chiave fa da ETag.
+
+In caso di miss il rendering ReportLab gira in un ``ProcessPoolExecutor`` con
+``PDF_RENDER_WORKERS`` processi: l'endpoint attende il risultato con ``await``
+senza occupare thread del worker API, e richieste contemporanee per lo stesso
+PDF condividono un unico rendering: gira in un task proprio, che prosegue anche
+se la richiesta che l'ha avviato viene annullata.
+
+La pulizia della cartella non la rilegge a ogni scrittura: il numero di file è
+stimato in memoria e, solo quando supera ``PDF_CACHE_MAX_FILES`` di un decimo,
+i più vecchi vengono rimossi fino a tornare al limite.
+"""
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.metrics import CACHE_REQUESTS, PDFS_RENDERED
+from app.services.pdf import QuotePdfData, render_pdf_data
+
+_pool: ProcessPoolExecutor | None = None
+_inflight: dict[str, asyncio.Task] = {}
+_files: dict[Path, int] = {}  # stima dei PDF per cartella, contati alla prima scrittura
+_files_lock = threading.Lock()
+
+
+def cache_dir() -> Path:
+    path = Path(settings.PDF_CACHE_DIR or os.path.join(tempfile.gettempdir(), "printlab3d_pdf"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def read_cached(key: str) -> bytes | None:
+    try:
+        pdf = (cache_dir() / f"{key}.pdf").read_bytes()
+    except FileNotFoundError:
+        CACHE_REQUESTS.inc("pdf", "miss")
+        return None
+    CACHE_REQUESTS.inc("pdf", "hit")
+    return pdf
+
+
+def write_cached(key: str, pdf: bytes) -> None:
+    directory = cache_dir()
+    # scrittura atomica: file temporaneo nella stessa cartella e rename
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(pdf)
+    os.replace(tmp, directory / f"{key}.pdf")
+    _maybe_prune(directory)
+
+
+def _maybe_prune(directory: Path) -> None:
+    limit = settings.PDF_CACHE_MAX_FILES
+    with _files_lock:
+        if directory not in _files:
+            _files[directory] = sum(1 for _ in directory.glob("*.pdf"))
+        else:
+            _files[directory] += 1  # può contare due volte una chiave riscritta: al più si pulisce prima
+        if _files[directory] <= limit + max(1, limit // 10):
+            return
+        _files[directory] = _prune(directory, limit)
+
+
+def _prune(directory: Path, limit: int) -> int:
+    """Rimuove i PDF meno recenti oltre ``limit`` e restituisce quanti ne restano."""
+    files = list(directory.glob("*.pdf"))
+    excess = len(files) - limit
+    if excess <= 0:
+        return len(files)
+    for path in sorted(files, key=lambda p: p.stat().st_mtime)[:excess]:
+        path.unlink(missing_ok=True)
+    return limit
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: i processi figli non ereditano connessioni DB né thread del server
+        _pool = ProcessPoolExecutor(max_workers=settings.PDF_RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def _render(data: QuotePdfData) -> bytes:
+    if settings.PDF_RENDER_WORKERS <= 0:
+        return await run_in_threadpool(render_pdf_data, data)
+    return await asyncio.wrap_future(_get_pool().submit(render_pdf_data, data))
+
+
+def get_or_render_pdf_sync(data: QuotePdfData, key: str | None = None) -> bytes:
+    """Variante bloccante per i thread dei worker documenti: stessa cache, stesso pool."""
+    key = key or data.cache_key()
+    pdf = read_cached(key)
+    if pdf is None:
+        if settings.PDF_RENDER_WORKERS <= 0:
+            pdf = render_pdf_data(data)
+        else:
+            pdf = _get_pool().submit(render_pdf_data, data).result()
+        PDFS_RENDERED.inc()
+        write_cached(key, pdf)
+    return pdf
+
+
+async def get_or_render_pdf(data: QuotePdfData, key: str | None = None) -> bytes:
+    """PDF di ``data`` dalla cache, oppure renderizzato nel pool e salvato."""
+    key = key or data.cache_key()
+    pdf = await run_in_threadpool(read_cached, key)
+    if pdf is not None:
+        return pdf
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_render_and_store(data, key))
+        _inflight[key] = task
+        task.add_done_callback(partial(_render_done, key))
+    # shield: chi annulla la propria richiesta non annulla il rendering atteso dagli altri
+    return await asyncio.shield(task)
+
+
+async def _render_and_store(data: QuotePdfData, key: str) -> bytes:
+    pdf = await _render(data)
+    PDFS_RENDERED.inc()
+    await run_in_threadpool(write_cached, key, pdf)
+    return pdf
+
+
+def _render_done(key: str, task: asyncio.Task) -> None:
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    if not task.cancelled():
+        task.exception()  # segna l'eccezione come letta se nessuno è più in attesa
@@ -0,0 +1,114 @@
+"""Esportazione in blocco dei PDF dei preventivi come archivio ZIP in streaming.
+
+Le versioni vengono lette a blocchi di ``EXPORT_BATCH_SIZE`` in ordine di id
+(keyset) e ogni blocco costa un numero fisso di query, qualunque sia il numero
+di righe. I PDF di un blocco sono resi in parallelo nel pool di
+:mod:`app.services.pdf_cache` (riusando la cache) e scritti nello ZIP man mano
+che sono pronti; al client arrivano i byte di ogni file appena compresso, così
+in memoria c'è al massimo un blocco di PDF, mai l'intero archivio.
+"""
+import asyncio
+import io
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Callable
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload, selectinload
+from starlette.concurrency import run_in_threadpool
+
+from app.db import settings as db_settings
+from app.models.quote import Quote, QuoteStatus, QuoteVersion
+from app.services.pdf import QuotePdfData, quote_pdf_data
+from app.services.pdf_cache import get_or_render_pdf
+
+EXPORT_BATCH_SIZE = 20
+
+
+@dataclass(frozen=True)
+class PdfExportFilter:
+    date_from: datetime | None = None
+    date_to: datetime | None = None
+    status: QuoteStatus | None = None
+    customer_id: int | None = None
+
+
+class _ZipStream(io.RawIOBase):
+    """File di sola scrittura e non posizionabile: ``zipfile`` scrive qui, lo stream svuota."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def load_export_batch(db: Session, flt: PdfExportFilter, after_id: int, limit: int = EXPORT_BATCH_SIZE) -> list[tuple[int, QuotePdfData]]:
+    """``(id, dati PDF)`` delle prossime ``limit`` versioni con id > ``after_id``.
+
+    Tre query per blocco qualunque sia la sua dimensione: versioni con
+    preventivi e clienti, righe, impostazioni aziendali.
+    """
+    stmt = (
+        select(QuoteVersion)
+        .options(joinedload(QuoteVersion.quote).joinedload(Quote.customer), selectinload(QuoteVersion.righe))
+        .where(QuoteVersion.id > after_id)
+        .order_by(QuoteVersion.id)
+        .limit(limit)
+    )
+    if flt.date_from:
+        stmt = stmt.where(QuoteVersion.created_at >= flt.date_from)
+    if flt.date_to:
+        stmt = stmt.where(QuoteVersion.created_at < flt.date_to)
+    if flt.status:
+        stmt = stmt.where(QuoteVersion.status == flt.status)
+    if flt.customer_id:
+        stmt = stmt.join(Quote, QuoteVersion.quote_id == Quote.id).where(Quote.customer_id == flt.customer_id)
+    versions = db.scalars(stmt).unique().all()
+    if not versions:
+        return []
+    settings = db_settings.get_settings(db)
+    return [(qv.id, quote_pdf_data(qv.quote, qv, settings)) for qv in versions]
+
+
+def _load_batch(session_factory: Callable[[], Session], flt: PdfExportFilter, after_id: int):
+    db = session_factory()
+    try:
+        return load_export_batch(db, flt, after_id)
+    finally:
+        db.close()
+
+
+async def stream_quote_pdfs_zip(session_factory: Callable[[], Session], flt: PdfExportFilter) -> AsyncIterator[bytes]:
+    """Genera l'archivio ZIP un pezzo alla volta.
+
+    Usa sessioni proprie (``session_factory``): la sessione della richiesta è
+    già chiusa quando lo streaming della risposta inizia.
+    """
+    out = _ZipStream()
+    with zipfile.ZipFile(out, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        after_id = 0
+        while True:
+            batch = await run_in_threadpool(_load_batch, session_factory, flt, after_id)
+            if not batch:
+                break
+            after_id = batch[-1][0]
+
+            async def render(data: QuotePdfData) -> tuple[str, bytes]:
+                return data.filename, await get_or_render_pdf(data)
+
+            for done in asyncio.as_completed([render(data) for _, data in batch]):
+                filename, pdf = await done
+                archive.writestr(filename, pdf)
+                yield out.drain()
+    yield out.drain()  # directory centrale dello ZIP
@@ -0,0 +1,126 @@
+"""Griglia "what-if" sui parametri economici di una versione preventivo.
+
+Valuta la stessa formula di :func:`app.services.quotes.price_version` per ogni
+combinazione di margine, overhead, rischio, sconto e stampante in un unico
+passaggio vettoriale NumPy, senza modificare la versione né scrivere sul DB.
+La griglia lavora in virgola mobile senza arrotondare le singole voci al
+centesimo, quindi può scostarsi di qualche centesimo dal preventivo salvato.
+"""
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.money import from_cents
+from app.models.printer import Printer
+from app.models.quote import QuoteVersion
+from app.services.quotes import load_pricing_snapshot
+
+MAX_GRID_POINTS = 100_000
+
+
+def _with_default(values: np.ndarray, default: float) -> np.ndarray:
+    # replica ``qv.x or default``: uno zero esplicito ricade sul default
+    return np.where(values == 0, default, values)
+
+
+def what_if_grid(
+    db: Session,
+    qv: QuoteVersion,
+    margine_pct: list[float] | None = None,
+    overhead_pct: list[float] | None = None,
+    rischio_pct: list[float] | None = None,
+    sconto_eur: list[float] | None = None,
+    printer_ids: list[int | None] | None = None,
+) -> dict[str, np.ndarray | list[int | None]]:
+    """Restituisce le colonne della griglia (prodotto cartesiano dei parametri).
+
+    Ogni lista vuota o ``None`` usa il valore della versione. In ``printer_ids``
+    ``None`` indica i parametri macchina/potenza salvati nella versione.
+    """
+    axes = {
+        "margine_pct": margine_pct or [float(qv.margine_pct or 0)],
+        "overhead_pct": overhead_pct or [float(qv.overhead_pct or 0)],
+        "rischio_pct": rischio_pct or [float(qv.rischio_pct or 0)],
+        "sconto_eur": sconto_eur or [float(qv.sconto_eur or 0)],
+        "printer_id": printer_ids or [qv.printer_id],
+    }
+    n_points = 1
+    for values in axes.values():
+        n_points *= len(values)
+    if n_points > MAX_GRID_POINTS:
+        raise HTTPException(status_code=400, detail=f"Griglia troppo grande ({n_points} punti, massimo {MAX_GRID_POINTS})")
+
+    snapshot = load_pricing_snapshot(db, [qv])
+    righe = list(qv.righe)
+
+    # Costi diretti indipendenti dalla stampante, sommati su tutte le righe
+    costo_manodopera_eur_h = float(qv.costo_manodopera_eur_h or 0)
+    consumabili = float(qv.consumabili_fissi_eur or 0)
+    base = 0.0
+    qty_totale = 0
+    for line in righe:
+        qty = line.quantita or 1
+        qty_totale += qty
+        mat = 0.0
+        if line.filament_id:
+            rate = snapshot.filaments.get(line.filament_id)
+            if rate is None:
+                raise HTTPException(status_code=404, detail="Filamento non trovato")
+            mat = from_cents(rate.costo_spool_cents) / rate.peso_nominale_g * float(line.peso_materiale_g or 0)
+        base += (mat + consumabili) * qty + float(line.ore_manodopera_min or 0) / 60 * costo_manodopera_eur_h
+
+    # Energia e macchina dipendono dalla stampante e pesano solo sulla prima riga
+    wanted = {pid for pid in axes["printer_id"] if pid}
+    printers = {p.id: p for p in db.query(Printer).filter(Printer.id.in_(wanted))} if wanted else {}
+    missing = wanted - printers.keys()
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Stampante non trovata: {sorted(missing)[0]}")
+    costo_energia_kwh = float(qv.costo_energia_kwh or 0.15)
+    subtotale_per_printer = np.empty(len(axes["printer_id"]))
+    for i, pid in enumerate(axes["printer_id"]):
+        if pid:
+            macchina_eur_h = printers[pid].totale_macchina_eur_h
+            potenza_w = float(printers[pid].potenza_w)
+        else:
+            macchina_eur_h = float(qv.costo_macchina_eur_h or 0.08)
+            potenza_w = float(qv.potenza_w or 200)
+        first = 0.0
+        if righe:
+            print_hours = (righe[0].tempo_stimato_min or 0) / 60
+            first = (potenza_w / 1000 * print_hours * costo_energia_kwh + print_hours * macchina_eur_h) * (righe[0].quantita or 1)
+        subtotale_per_printer[i] = base + first
+
+    grid = np.meshgrid(
+        np.asarray(axes["margine_pct"], dtype=float),
+        np.asarray(axes["overhead_pct"], dtype=float),
+        np.asarray(axes["rischio_pct"], dtype=float),
+        np.asarray(axes["sconto_eur"], dtype=float),
+        np.arange(len(axes["printer_id"])),
+        indexing="ij",
+    )
+    m, o, r, s, p_idx = (a.ravel() for a in grid)
+
+    if qv.prezzo_unitario_vendita is not None:
+        # con il prezzo di vendita imposto margine/overhead/rischio non contano
+        imponibile = np.full(m.shape, float(qv.prezzo_unitario_vendita) * qty_totale)
+    else:
+        subtotale = subtotale_per_printer[p_idx]
+        costo_netto = subtotale * (1 + (_with_default(o, 10) + _with_default(r, 5)) / 100)
+        imponibile = costo_netto * (1 + _with_default(m, 20) / 100)
+    imponibile = np.maximum(imponibile - s, 0)
+
+    if qv.applica_iva:
+        lordo = imponibile * (1 + float(qv.iva_pct or 22) / 100)
+    else:
+        lordo = imponibile
+
+    printer_axis = axes["printer_id"]
+    return {
+        "margine_pct": m,
+        "overhead_pct": o,
+        "rischio_pct": r,
+        "sconto_eur": s,
+        "printer_id": [printer_axis[i] for i in p_idx.tolist()],
+        "totale_imponibile_eur": np.round(imponibile, 2),
+        "totale_lordo_eur": np.round(lordo, 2),
+    }
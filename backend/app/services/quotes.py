@@ -1,135 +1,249 @@
-from decimal import Decimal
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Iterable
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session, selectinload
 
+from app.core.metrics import QUOTES_PRICED
+from app.core.money import CENTS, HUNDREDTHS, MICRO, PCT_SCALE, apply_bp, div_round, from_cents, to_bp, to_cents, to_hundredths, to_micro
+from app.db.unit_of_work import after_commit
 from app.models.inventory import Filament
 from app.models.printer import Printer
-from app.models.quote import QuoteLine, QuoteVersion
+from app.models.quote import QuoteLine, QuoteStatus, QuoteVersion
 
 
-def recalc_quote_version(db: Session, qv: QuoteVersion) -> None:
-    # Recupera parametri da QuoteVersion
-    # Se è selezionata una stampante, usa i suoi parametri
-    if qv.printer_id:
-        printer = db.get(Printer, qv.printer_id)
-        if printer:
-            # Usa il costo totale macchina dalla stampante (deprezzamento + manutenzione)
-            costo_macchina_eur_h = Decimal(str(printer.totale_macchina_eur_h))
-            # Usa anche la potenza della stampante
-            potenza_w = Decimal(str(printer.potenza_w))
-        else:
-            # Fallback ai valori nella versione se stampante non trovata
-            costo_macchina_eur_h = Decimal(str(qv.costo_macchina_eur_h or 0.08))
-            potenza_w = Decimal(str(qv.potenza_w or 200))
+# Denominatori fissi delle formule in virgola fissa (vedi app.core.money)
+ENERGIA_DEN = HUNDREDTHS * 1000 * 60 * MICRO  # W in centesimi, /1000 -> kW, min/60 -> h, tariffa in micro-euro
+MACCHINA_DEN = 60 * MICRO  # min/60 -> h, tariffa in micro-euro
+MANODOPERA_DEN = HUNDREDTHS * 60 * MICRO  # minuti in centesimi, /60 -> h, tariffa in micro-euro
+
+# Solo le versioni ancora modificabili seguono i costi correnti; quelle
+# accettate/rifiutate restano congelate al prezzo concordato.
+REPRICE_STATUSES = (QuoteStatus.BOZZA, QuoteStatus.INVIATO)
+REPRICE_BATCH_SIZE = 200
+
+
+@dataclass(frozen=True)
+class FilamentRate:
+    """Costo di una bobina in centesimi e il suo peso nominale."""
+
+    costo_spool_cents: int
+    peso_nominale_g: int
+
+    def cost_cents(self, peso_hundredths: int, qty: int = 1) -> int:
+        """Costo in centesimi di ``peso_hundredths`` centesimi di grammo per ``qty`` pezzi."""
+        return div_round(self.costo_spool_cents * peso_hundredths * qty, self.peso_nominale_g * HUNDREDTHS)
+
+
+@dataclass(frozen=True)
+class PrinterRates:
+    """Costo orario (micro-euro) e potenza (centesimi di W) di una stampante."""
+
+    costo_macchina_micro: int
+    potenza_cw: int
+
+
+@dataclass
+class PricingSnapshot:
+    """Dati di riferimento (filamenti, stampanti) caricati una sola volta.
+
+    Il ciclo sulle righe lavora solo su questi dizionari in memoria, quindi il
+    numero di query non dipende più dal numero di righe o di versioni.
+    """
+
+    filaments: dict[int, FilamentRate] = field(default_factory=dict)
+    printers: dict[int, PrinterRates] = field(default_factory=dict)
+
+
+def load_filament_rates(db: Session, filament_ids: Iterable[int]) -> dict[int, FilamentRate]:
+    """Costi dei filamenti indicati, con una sola query."""
+    filament_ids = set(filament_ids)
+    if not filament_ids:
+        return {}
+    rows = db.execute(
+        select(Filament.id, Filament.costo_spool_eur, Filament.peso_nominale_g).where(Filament.id.in_(filament_ids))
+    )
+    return {fid: FilamentRate(to_cents(costo), int(peso or 1000)) for fid, costo, peso in rows}
+
+
+def load_pricing_snapshot(db: Session, versions: Iterable[QuoteVersion]) -> PricingSnapshot:
+    """Carica con una query per tabella i filamenti e le stampanti usati da ``versions``."""
+    filament_ids: set[int] = set()
+    printer_ids: set[int] = set()
+    for qv in versions:
+        if qv.printer_id:
+            printer_ids.add(qv.printer_id)
+        for line in qv.righe:
+            if line.filament_id:
+                filament_ids.add(line.filament_id)
+
+    snapshot = PricingSnapshot(filaments=load_filament_rates(db, filament_ids))
+    if printer_ids:
+        for printer in db.query(Printer).filter(Printer.id.in_(printer_ids)):
+            snapshot.printers[printer.id] = PrinterRates(
+                # Usa il costo totale macchina dalla stampante (deprezzamento + manutenzione)
+                costo_macchina_micro=to_micro(printer.totale_macchina_eur_h),
+                potenza_cw=to_hundredths(printer.potenza_w),
+            )
+    return snapshot
+
+
+def price_version(qv: QuoteVersion, snapshot: PricingSnapshot) -> None:
+    """Ricalcola righe e totali di ``qv`` usando solo i dati di ``snapshot``.
+
+    Ogni voce di riga è arrotondata al centesimo una sola volta e i totali
+    sono somme esatte di centesimi: totale versione = somma delle righe.
+    """
+    # Se è selezionata una stampante, usa i suoi parametri; altrimenti (o se la
+    # stampante non esiste più) usa i valori nella versione del preventivo
+    printer = snapshot.printers.get(qv.printer_id) if qv.printer_id else None
+    if printer:
+        costo_macchina_micro = printer.costo_macchina_micro
+        potenza_cw = printer.potenza_cw
+    else:
+        costo_macchina_micro = to_micro(qv.costo_macchina_eur_h or 0.08)
+        potenza_cw = to_hundredths(qv.potenza_w or 200)
+
+    # Parametri della versione, convertiti una sola volta fuori dal ciclo righe
+    energia_micro = to_micro(qv.costo_energia_kwh or 0.15)
+    manodopera_micro = to_micro(qv.costo_manodopera_eur_h or 0)
+    consumabili_cents = to_cents(qv.consumabili_fissi_eur or 0)
+    # 100% + overhead% + rischio% e 100% + margine%, in centesimi di punto
+    ricarichi_bp = PCT_SCALE + to_bp(qv.overhead_pct or 10) + to_bp(qv.rischio_pct or 5)
+    if qv.prezzo_unitario_vendita is not None:
+        prezzo_unitario_cents = to_cents(qv.prezzo_unitario_vendita)
+        margine_fattore_bp = PCT_SCALE
     else:
-        # Usa i valori nella versione del preventivo
-        costo_macchina_eur_h = Decimal(str(qv.costo_macchina_eur_h or 0.08))
-        potenza_w = Decimal(str(qv.potenza_w or 200))
-    
+        prezzo_unitario_cents = None
+        margine_fattore_bp = PCT_SCALE + to_bp(qv.margine_pct or 20)
+
     # Somma totali per riga prima dello sconto
-    tot_imponibile = Decimal("0")
-    tot_iva = Decimal("0")
-    
+    tot_imponibile = 0
+
     for idx, line in enumerate(qv.righe):
         # Quantità (default 1)
-        qty = Decimal(str(line.quantita or 1))
-        
-        # Prima riga? (per calcolare costi macchina/energia solo su questa)
-        is_first = (idx == 0)
-        
-        # 1. COSTO MATERIALE (per singolo pezzo)
-        mat_cost = Decimal("0")
+        qty = line.quantita or 1
+
+        # 1. COSTO MATERIALE = costo al grammo * peso * qty
+        mat = 0
         if line.filament_id:
-            filament = db.get(Filament, line.filament_id)
-            if not filament:
+            rate = snapshot.filaments.get(line.filament_id)
+            if rate is None:
                 raise HTTPException(status_code=404, detail="Filamento non trovato")
-            costo_spool = Decimal(str(filament.costo_spool_eur))
-            denom = Decimal(str(filament.peso_nominale_g or 1000))
-            costo_per_g = (costo_spool / denom) if denom != 0 else Decimal("0")
-            mat_cost = costo_per_g * Decimal(str(line.peso_materiale_g or 0))
-        line.costo_materiale_eur = float((mat_cost * qty).quantize(Decimal("0.01")))
-
-        # Ore di stampa (per singolo pezzo)
-        print_hours = Decimal(str(line.tempo_stimato_min or 0)) / Decimal("60")
-        
-        # Ore di manodopera (inserite dall'utente, se 0 non conta)
-        labor_hours = Decimal(str(line.ore_manodopera_min or 0)) / Decimal("60")
-
-        # 2. COSTO ENERGIA = (potenza_w/1000) * print_hours * costo_energia_kwh * qty (SOLO PRIMA RIGA)
-        if is_first:
-            costo_energia_kwh = Decimal(str(qv.costo_energia_kwh or 0.15))
-            energia_kwh = (potenza_w / Decimal("1000")) * print_hours
-            energia_cost = energia_kwh * costo_energia_kwh
-            line.costo_energia_eur = float((energia_cost * qty).quantize(Decimal("0.01")))
-        else:
-            energia_cost = Decimal("0")
-            line.costo_energia_eur = 0.0
+            mat = rate.cost_cents(to_hundredths(line.peso_materiale_g), qty)
 
-        # 3. COSTO MACCHINA/USURA = print_hours * costo_macchina_eur_h * qty (SOLO PRIMA RIGA)
-        if is_first:
-            costo_macchina = print_hours * costo_macchina_eur_h
-            line.costo_macchina_eur = float((costo_macchina * qty).quantize(Decimal("0.01")))
+        # 2-3. COSTO ENERGIA e MACCHINA/USURA sulle ore di stampa (SOLO PRIMA RIGA)
+        if idx == 0:
+            minuti = line.tempo_stimato_min or 0
+            energia = div_round(potenza_cw * minuti * energia_micro * qty * CENTS, ENERGIA_DEN)
+            macchina = div_round(minuti * costo_macchina_micro * qty * CENTS, MACCHINA_DEN)
         else:
-            costo_macchina = Decimal("0")
-            line.costo_macchina_eur = 0.0
+            energia = 0
+            macchina = 0
 
-        # 4. COSTO MANODOPERA = labor_hours * costo_manodopera_eur_h (non moltiplicato per qty)
-        costo_manodopera_eur_h = Decimal(str(qv.costo_manodopera_eur_h or 0))
-        costo_manodopera = labor_hours * costo_manodopera_eur_h
-        line.costo_manodopera_eur = float(costo_manodopera.quantize(Decimal("0.01")))
+        # 4. COSTO MANODOPERA = ore manodopera * costo orario (non moltiplicato per qty)
+        manodopera = div_round(to_hundredths(line.ore_manodopera_min) * manodopera_micro * CENTS, MANODOPERA_DEN)
 
         # 5. COSTO CONSUMABILI = consumabili_fissi_eur * qty
-        consumabili_fissi_eur = Decimal(str(qv.consumabili_fissi_eur or 0))
-        line.costo_consumabili_eur = float((consumabili_fissi_eur * qty).quantize(Decimal("0.01")))
+        consumabili = consumabili_cents * qty
 
-        # 6. SUBTOTALE COSTI DIRETTI (già moltiplicati per qty tranne manodopera)
-        subtotale_diretti = (mat_cost * qty) + (energia_cost * qty) + (costo_macchina * qty) + costo_manodopera + (consumabili_fissi_eur * qty)
+        # 6. SUBTOTALE COSTI DIRETTI
+        subtotale_diretti = mat + energia + macchina + manodopera + consumabili
 
-        # 7. OVERHEAD = subtotale_diretti * overhead_pct
-        overhead_pct = Decimal(str(qv.overhead_pct or 10))
-        overhead = subtotale_diretti * overhead_pct / Decimal("100")
-
-        # 8. RISCHIO = subtotale_diretti * rischio_pct
-        rischio_pct = Decimal(str(qv.rischio_pct or 5))
-        rischio = subtotale_diretti * rischio_pct / Decimal("100")
-
-        # 9. COSTO TOTALE NETTO = subtotale_diretti + overhead + rischio
-        costo_totale_netto = subtotale_diretti + overhead + rischio
-
-        # 10. PREZZO NETTO - Override o Calcolo
-        if qv.prezzo_unitario_vendita is not None:
-            # Se è impostato un prezzo di vendita, usa quello
-            prezzo_unitario = Decimal(str(qv.prezzo_unitario_vendita))
-            prezzo_netto_riga = prezzo_unitario * qty
+        # 7-10. PREZZO NETTO - Override (prezzo di vendita) oppure
+        # (subtotale_diretti + overhead + rischio) * (1 + margine_pct), con un solo arrotondamento
+        if prezzo_unitario_cents is not None:
+            prezzo_netto_riga = prezzo_unitario_cents * qty
         else:
-            # Altrimenti calcola con margine_pct
-            margine_pct = Decimal(str(qv.margine_pct or 20))
-            prezzo_netto_riga = costo_totale_netto * (Decimal("1") + margine_pct / Decimal("100"))
-
-        # Salva il totale di riga (senza IVA, lo sconto sarà applicato sul totale)
-        line.totale_riga_eur = float(prezzo_netto_riga.quantize(Decimal("0.01")))
-        
-        # Accumula per il totale
+            prezzo_netto_riga = div_round(subtotale_diretti * ricarichi_bp * margine_fattore_bp, PCT_SCALE * PCT_SCALE)
+
+        line.costo_materiale_eur = from_cents(mat)
+        line.costo_energia_eur = from_cents(energia)
+        line.costo_macchina_eur = from_cents(macchina)
+        line.costo_manodopera_eur = from_cents(manodopera)
+        line.costo_consumabili_eur = from_cents(consumabili)
+        # Totale di riga senza IVA, lo sconto sarà applicato sul totale
+        line.totale_riga_eur = from_cents(prezzo_netto_riga)
         tot_imponibile += prezzo_netto_riga
 
     # 11. SCONTO SUL TOTALE (non per riga)
-    sconto_eur = Decimal(str(qv.sconto_eur or 0))
-    tot_imponibile_scontato = tot_imponibile - sconto_eur
-    if tot_imponibile_scontato < 0:
-        tot_imponibile_scontato = Decimal("0")
+    tot_imponibile = max(tot_imponibile - to_cents(qv.sconto_eur), 0)
 
     # 12. IVA SUL TOTALE SCONTATO (solo se applica_iva è True)
-    if qv.applica_iva:
-        iva_pct = Decimal(str(qv.iva_pct or 22))
-        tot_iva = tot_imponibile_scontato * iva_pct / Decimal("100")
-        tot_lordo = tot_imponibile_scontato + tot_iva
-    else:
-        tot_iva = Decimal("0")
-        tot_lordo = tot_imponibile_scontato
+    tot_iva = apply_bp(tot_imponibile, to_bp(qv.iva_pct or 22)) if qv.applica_iva else 0
 
     # Salva i totali
-    qv.totale_imponibile_eur = float(tot_imponibile_scontato.quantize(Decimal("0.01")))
-    qv.totale_iva_eur = float(tot_iva.quantize(Decimal("0.01")))
-    qv.totale_lordo_eur = float(tot_lordo.quantize(Decimal("0.01")))
+    qv.totale_imponibile_eur = from_cents(tot_imponibile)
+    qv.totale_iva_eur = from_cents(tot_iva)
+    qv.totale_lordo_eur = from_cents(tot_imponibile + tot_iva)
+
 
+def recalc_quote_versions(db: Session, versions: Iterable[QuoteVersion]) -> None:
+    """Ricalcola più versioni con un unico caricamento dei dati di riferimento.
+
+    Per evitare il lazy load delle righe una versione alla volta, caricare le
+    versioni con ``selectinload(QuoteVersion.righe)``.
+    """
+    versions = list(versions)
+    if not versions:
+        return
+    snapshot = load_pricing_snapshot(db, versions)
+    for qv in versions:
+        price_version(qv, snapshot)
+    # contate solo se la transazione va a buon fine (come JOBS_COMPLETED)
+    after_commit(db, partial(QUOTES_PRICED.inc, amount=len(versions)))
+
+
+def recalc_quote_version(db: Session, qv: QuoteVersion) -> None:
+    recalc_quote_versions(db, [qv])
+
+
+def affected_version_ids(db: Session, filament_ids: Iterable[int] = (), printer_ids: Iterable[int] = ()) -> list[int]:
+    """Versioni in BOZZA/INVIATO che dipendono dai filamenti o dalle stampanti indicati.
+
+    Usa gli indici su ``quote_lines.filament_id`` e ``quote_versions.printer_id``
+    come indice di dipendenza: nessuna scansione delle versioni non coinvolte.
+    """
+    filament_ids = list(filament_ids)
+    printer_ids = list(printer_ids)
+    conds = []
+    if filament_ids:
+        conds.append(QuoteVersion.id.in_(select(QuoteLine.quote_version_id).where(QuoteLine.filament_id.in_(filament_ids))))
+    if printer_ids:
+        conds.append(QuoteVersion.printer_id.in_(printer_ids))
+    if not conds:
+        return []
+    stmt = select(QuoteVersion.id).where(QuoteVersion.status.in_(REPRICE_STATUSES), or_(*conds)).order_by(QuoteVersion.id)
+    return list(db.scalars(stmt))
+
+
+def reprice_versions(db: Session, version_ids: list[int], batch_size: int = REPRICE_BATCH_SIZE) -> int:
+    """Ricalcola le versioni indicate a blocchi nella transazione del chiamante, che fa commit.
+
+    Ogni blocco carica versioni e righe con due query e un solo snapshot di
+    filamenti/stampanti; dopo il flush le versioni vengono rimosse dalla
+    sessione così la memoria resta costante anche con migliaia di bozze.
+    """
+    for start in range(0, len(version_ids), batch_size):
+        chunk = version_ids[start:start + batch_size]
+        versions = (
+            db.query(QuoteVersion)
+            .options(selectinload(QuoteVersion.righe))
+            .filter(QuoteVersion.id.in_(chunk), QuoteVersion.status.in_(REPRICE_STATUSES))
+            .all()
+        )
+        recalc_quote_versions(db, versions)
+        db.flush()
+        for qv in versions:
+            db.expunge(qv)
+    return len(version_ids)
+
+
+def reprice_for_filament(db: Session, filament_id: int) -> int:
+    return reprice_versions(db, affected_version_ids(db, filament_ids=[filament_id]))
+
+
+def reprice_for_printer(db: Session, printer_id: int) -> int:
+    return reprice_versions(db, affected_version_ids(db, printer_ids=[printer_id]))
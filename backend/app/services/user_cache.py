@@ -0,0 +1,70 @@
+"""Cache degli utenti autenticati: niente lettura di ``users`` a ogni richiesta.
+
+Due cache per processo (:class:`app.core.cache.TTLCache`):
+
+- token -> id utente: la firma JWT si verifica una volta per token e la voce
+  non sopravvive alla scadenza del token;
+- id utente -> colonne dell'utente attivo (senza hash della password).
+
+Gli endpoint che modificano un utente chiamano :func:`invalidate_user`. Su un
+hit viene restituito un ``User`` nuovo e non associato ad alcuna sessione: chi
+lo riceve ne legge id e ruolo, non lo modifica.
+"""
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import decode_token
+from app.models.user import User
+
+USER_FIELDS = ("id", "email", "full_name", "role", "is_active", "must_reset_password", "created_at", "updated_at")
+
+_tokens: TTLCache[str, int] = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL_SECONDS, name="auth_token")
+_users: TTLCache[int, dict] = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL_SECONDS, name="auth_user")
+
+
+def token_user_id(token: str) -> int | None:
+    """Id utente del token; solleva l'eccezione di ``decode_token`` se il token non è valido."""
+    user_id = _tokens.get(token)
+    if user_id is not None:
+        return user_id
+    payload = decode_token(token)
+    sub = payload.get("sub")
+    if not sub:
+        return None
+    user_id = int(sub)
+    exp = payload.get("exp")
+    _tokens.set(token, user_id, ttl=exp - time.time() if exp else None)
+    return user_id
+
+
+def _cached(user_id: int) -> User | None:
+    values = _users.get(user_id)
+    return User(**values) if values is not None else None
+
+
+def _remember(user: User | None) -> User | None:
+    if not user or not user.is_active:
+        return None
+    _users.set(user.id, {field: getattr(user, field) for field in USER_FIELDS})
+    return user
+
+
+def load_active_user(db: Session, user_id: int) -> User | None:
+    return _cached(user_id) or _remember(db.get(User, user_id))
+
+
+async def load_active_user_async(db: AsyncSession, user_id: int) -> User | None:
+    return _cached(user_id) or _remember(await db.get(User, user_id))
+
+
+def invalidate_user(user_id: int) -> None:
+    _users.pop(user_id)
+
+
+def clear() -> None:
+    _tokens.clear()
+    _users.clear()
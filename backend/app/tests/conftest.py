@@ -0,0 +1,101 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+import app.models  # noqa: F401  (registra tutte le tabelle su Base.metadata)
+import app.models.printer  # noqa: F401
+from app.db.query_stats import track_queries
+from app.db.session import Base
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # database su file: condiviso dalle sessioni sync e da quelle async (aiosqlite)
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def async_engine(engine):
+    # NullPool: le connessioni non sopravvivono all'event loop del TestClient
+    return create_async_engine(engine.url.set(drivername="sqlite+aiosqlite"), poolclass=NullPool)
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(engine, async_engine, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app.api_v1.deps import get_async_db, get_db, get_read_router, get_session_factory
+    from app.core.config import settings
+    from app.db.routing import ReplicaRouter
+    from app.main import create_app
+    from app.services import user_cache
+
+    user_cache.clear()  # gli id utente si ripetono tra un database di test e l'altro
+    monkeypatch.setattr(settings, "DOCUMENT_WORKERS", 0)  # nessun worker in background sul database di test
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    app = create_app()
+
+    def override_db():
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_async_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_async_db] = override_async_db
+    app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
+    # nessuna replica: le letture di report e dashboard vanno sul database di test
+    app.dependency_overrides[get_read_router] = lambda: ReplicaRouter(TestingSessionLocal, async_primary=AsyncTestingSessionLocal)
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def admin_headers(db):
+    from app.core.security import create_access_token, get_password_hash
+    from app.models.user import User, UserRole
+
+    user = User(email="admin@test.local", full_name="Admin", role=UserRole.admin.value, hashed_password=get_password_hash("pass"))
+    db.add(user)
+    db.commit()
+    return {"Authorization": f"Bearer {create_access_token(str(user.id), extra={'role': user.role})}"}
+
+
+@pytest.fixture
+def query_budget():
+    """``with query_budget(n):`` fa fallire il test se il blocco esegue più di ``n`` statement SQL."""
+
+    @contextmanager
+    def budget(max_queries: int):
+        with track_queries() as stats:
+            yield stats
+        if stats.count > max_queries:
+            repeated = "".join(f"\n  {n}x {sql}" for sql, n in stats.repeated()[:5])
+            pytest.fail(f"{stats.count} statement SQL, budget {max_queries}" + (f"; ripetuti:{repeated}" if repeated else ""))
+
+    return budget
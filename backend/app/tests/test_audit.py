@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import event, func, select
+
+from app.models.audit import AuditLog
+
+
+def test_create_writes_audit_in_same_transaction(engine, db, client, admin_headers):
+    commits = []
+
+    def on_commit(conn):
+        commits.append(conn)
+
+    event.listen(engine, "commit", on_commit)
+    try:
+        r = client.post("/api/v1/customers/", headers=admin_headers, json={"ragione_sociale": "ACME"})
+    finally:
+        event.remove(engine, "commit", on_commit)
+    assert r.status_code == 200, r.text
+    assert len(commits) == 1
+    log = db.scalar(select(AuditLog).where(AuditLog.entity == "Customer"))
+    assert (log.entity_id, log.action) == (r.json()["id"], "CREATE")
+
+
+def test_audit_list_filters_and_pages(db, client, admin_headers):
+    ids = [client.post("/api/v1/customers/", headers=admin_headers, json={"ragione_sociale": f"C{i}"}).json()["id"] for i in range(3)]
+    for i in ids:
+        client.put(f"/api/v1/customers/{i}", headers=admin_headers, json={"note": "x"})
+
+    seen, cursor = [], None
+    while True:
+        params = {"entity": "Customer", "entity_id": ids[0], "limit": 1, **({"cursor": cursor} if cursor else {})}
+        r = client.get("/api/v1/audit/", headers=admin_headers, params=params)
+        assert r.status_code == 200, r.text
+        seen.extend(r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert [e["action"] for e in seen] == ["UPDATE", "CREATE"]
+
+    actor = seen[0]["actor_user_id"]
+    r = client.get("/api/v1/audit/", headers=admin_headers, params={"actor_user_id": actor})
+    assert len(r.json()) == db.scalar(select(func.count()).select_from(AuditLog))
+    assert client.get("/api/v1/audit/", headers=admin_headers, params={"entity_id": 1}).status_code == 400
+
+
+def test_audit_rows_are_append_only(db, client, admin_headers):
+    client.post("/api/v1/customers/", headers=admin_headers, json={"ragione_sociale": "ACME"})
+    log = db.scalar(select(AuditLog))
+    log.details = "modificato"
+    with pytest.raises(ValueError):
+        db.commit()
+
+
+def test_partition_for_month_already_in_default_moves_the_rows():
+    from contextlib import nullcontext
+    from datetime import date
+    from types import SimpleNamespace
+
+    from app.services.audit import ensure_partitions
+
+    class FakePg:
+        """Registra gli statement; nessuna partizione esiste, la default ha righe di ogni mese."""
+
+        def __init__(self):
+            self.sql = []
+
+        def get_bind(self):
+            return SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+
+        def execute(self, stmt, params=None):
+            self.sql.append(" ".join(str(stmt).split()))
+
+        def scalar(self, stmt, params=None):
+            return None if "to_regclass" in str(stmt) else True
+
+        def begin_nested(self):
+            return nullcontext()
+
+    db = FakePg()
+    assert ensure_partitions(db, months_ahead=0, today=date(2026, 11, 5)) == ["audit_logs_202611"]
+    steps = [" ".join(s.split()[:4]) for s in db.sql[1:]]
+    assert steps == [
+        "ALTER TABLE audit_logs DETACH",
+        "CREATE TABLE audit_logs_202611 PARTITION",
+        "INSERT INTO audit_logs (id,",
+        "ALTER TABLE audit_logs_default DISABLE",
+        "DELETE FROM audit_logs_default WHERE",
+        "ALTER TABLE audit_logs_default ENABLE",
+        "ALTER TABLE audit_logs ATTACH",
+    ]
+    assert "FROM ('2026-11-01') TO ('2026-12-01')" in db.sql[2]
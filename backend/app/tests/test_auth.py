@@ -0,0 +1,47 @@
+def test_login_rehashes_password_when_policy_changes(client, db):
+    from passlib.context import CryptContext
+
+    from app.core.config import settings
+    from app.models.user import User, UserRole
+
+    vecchio = CryptContext(schemes=["pbkdf2_sha256"], pbkdf2_sha256__default_rounds=1000)
+    user = User(email="old@test.local", role=UserRole.viewer.value, hashed_password=vecchio.hash("segreta"))
+    db.add(user)
+    db.commit()
+
+    assert client.post("/api/v1/auth/login", data={"username": "old@test.local", "password": "sbagliata"}).status_code == 400
+    assert user.hashed_password.startswith("$pbkdf2-sha256$1000$")
+
+    res = client.post("/api/v1/auth/login", data={"username": "old@test.local", "password": "segreta"})
+    assert res.status_code == 200 and res.json()["access_token"]
+    db.refresh(user)
+    assert user.hashed_password.startswith(f"$pbkdf2-sha256${settings.PASSWORD_HASH_ROUNDS}$")
+    # il nuovo hash continua a valere
+    assert client.post("/api/v1/auth/login", data={"username": "old@test.local", "password": "segreta"}).status_code == 200
+
+
+def test_user_passwords_are_hashed_off_the_request_threads(client, admin_headers, monkeypatch):
+    import threading
+
+    from app.core import security
+
+    threads = []
+    hash_originale = security._hash
+
+    def _hash(password):
+        threads.append(threading.current_thread().name)
+        return hash_originale(password)
+
+    monkeypatch.setattr(security, "_hash", _hash)
+    login = lambda pw: client.post("/api/v1/auth/login", data={"username": "nuovo@test.local", "password": pw})  # noqa: E731
+
+    user = client.post("/api/v1/users/", headers=admin_headers, json={"email": "nuovo@test.local", "password": "prima"}).json()
+    assert login("prima").status_code == 200
+    r = client.put(f"/api/v1/users/{user['id']}", headers=admin_headers, json={"password": "seconda"})
+    assert r.status_code == 200 and login("seconda").status_code == 200
+    r = client.post(f"/api/v1/users/{user['id']}/reset-password", json={"password": "terza"})
+    assert r.status_code == 200 and not r.json()["must_reset_password"]
+    assert login("seconda").status_code == 400 and login("terza").status_code == 200
+    assert client.put("/api/v1/users/999999", headers=admin_headers, json={"password": "x"}).status_code == 404
+
+    assert len(threads) == 3 and all(name.startswith("password-hash") for name in threads)
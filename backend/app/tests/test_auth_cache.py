@@ -0,0 +1,27 @@
+from sqlalchemy import event
+
+
+def test_authenticated_user_is_served_from_cache(client, admin_headers, engine, async_engine):
+    from app.core.security import create_access_token
+
+    h = admin_headers
+    user = client.post("/api/v1/users/", headers=h, json={"email": "op@test.local", "password": "x", "role": "OPERATORE"}).json()
+    op_headers = {"Authorization": f"Bearer {create_access_token(str(user['id']))}"}
+    assert client.get("/api/v1/auth/me", headers=op_headers).json()["role"] == "OPERATORE"
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    for e in (engine, async_engine.sync_engine):
+        event.listen(e, "before_cursor_execute", listener)
+    assert client.get("/api/v1/auth/me", headers=op_headers).status_code == 200
+    # il controllo del ruolo usa la stessa voce in cache
+    assert client.get("/api/v1/users/", headers=op_headers).status_code == 403
+    for e in (engine, async_engine.sync_engine):
+        event.remove(e, "before_cursor_execute", listener)
+    assert not [s for s in statements if "FROM users" in s]
+
+    # le modifiche dall'amministrazione invalidano subito la cache
+    client.put(f"/api/v1/users/{user['id']}", headers=h, json={"role": "ADMIN"})
+    assert client.get("/api/v1/users/", headers=op_headers).status_code == 200
+    client.post(f"/api/v1/users/{user['id']}/toggle-active", headers=h)
+    assert client.get("/api/v1/auth/me", headers=op_headers).status_code == 401
@@ -0,0 +1,131 @@
+import io
+import zipfile
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.services import documents
+
+
+@pytest.fixture
+def document_settings(tmp_path, monkeypatch):
+    # nessun thread: i task si eseguono a mano con run_next
+    monkeypatch.setattr(settings, "DOCUMENT_WORKERS", 0)
+    monkeypatch.setattr(settings, "DOCUMENT_DIR", str(tmp_path / "documenti"))
+    monkeypatch.setattr(settings, "PDF_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(settings, "PDF_RENDER_WORKERS", 0)
+
+
+def test_document_tasks_are_queued_and_downloadable(client, admin_headers, engine, document_settings):
+    h = admin_headers
+    cust = client.post("/api/v1/customers/", headers=h, json={"ragione_sociale": "ACME"}).json()
+    quote = client.post("/api/v1/quotes/", headers=h, json={"codice": "PRV-DOC", "customer_id": cust["id"]}).json()
+    riga = {"descrizione": "Pezzo", "quantita": 1, "tempo_stimato_min": 60}
+    qv = client.post(f"/api/v1/quotes/{quote['id']}/versions", headers=h, json={"righe": [riga]}).json()
+
+    assert client.post("/api/v1/documents/tasks", headers=h, json={"tipo": "QUOTE_PDF"}).status_code == 400
+    pdf_task = client.post("/api/v1/documents/tasks", headers=h, json={"tipo": "QUOTE_PDF", "quote_version_id": qv["id"]})
+    assert pdf_task.status_code == 202 and pdf_task.json()["status"] == "IN_CODA"
+    zip_task = client.post("/api/v1/documents/tasks", headers=h, json={"tipo": "QUOTES_ZIP", "customer_id": cust["id"]}).json()
+    pdf_task = pdf_task.json()
+    assert client.get(f"/api/v1/documents/tasks/{pdf_task['id']}/download", headers=h).status_code == 409
+
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    assert documents.run_next(factory) and documents.run_next(factory)
+    assert not documents.run_next(factory)
+
+    status = client.get(f"/api/v1/documents/tasks/{pdf_task['id']}", headers=h).json()
+    assert status["status"] == "COMPLETATO" and status["filename"] == "PREVENTIVO_PRV-DOC_v1.pdf"
+    pdf = client.get(f"/api/v1/documents/tasks/{pdf_task['id']}/download", headers=h)
+    assert pdf.status_code == 200 and pdf.content.startswith(b"%PDF")
+
+    archive = client.get(f"/api/v1/documents/tasks/{zip_task['id']}/download", headers=h)
+    assert zipfile.ZipFile(io.BytesIO(archive.content)).namelist() == ["PREVENTIVO_PRV-DOC_v1.pdf"]
+
+
+def test_failed_task_records_error(db, engine, document_settings):
+    from app.models.document import DocumentTask, DocumentTaskKind
+
+    task = documents.submit_task(db, DocumentTaskKind.quote_pdf, {"quote_version_id": 999}, None)
+    db.commit()
+    assert documents.run_next(sessionmaker(bind=engine, autoflush=False))
+    db.expire_all()
+    task = db.get(DocumentTask, task.id)
+    assert task.status == "ERRORE" and task.error == "Versione non trovata"
+
+
+def test_workers_resume_stale_tasks_at_startup(db, engine, document_settings, monkeypatch):
+    import time
+    from datetime import datetime, timedelta
+
+    from fastapi.testclient import TestClient
+
+    from app.api_v1.deps import get_session_factory
+    from app.main import create_app
+    from app.models.document import DocumentTask, DocumentTaskKind, DocumentTaskStatus
+
+    # task rimasto IN_CORSO da un processo terminato: nessuna nuova richiesta lo risveglia
+    task = documents.submit_task(db, DocumentTaskKind.quote_pdf, {"quote_version_id": 999}, None)
+    task.status = DocumentTaskStatus.in_corso.value
+    task.started_at = datetime.utcnow() - timedelta(minutes=settings.DOCUMENT_STALE_MINUTES + 1)
+    db.commit()
+
+    monkeypatch.setattr(settings, "DOCUMENT_WORKERS", 1)
+    app = create_app()
+    app.dependency_overrides[get_session_factory] = lambda: sessionmaker(bind=engine, autoflush=False)
+    with TestClient(app):
+        for _ in range(100):
+            db.expire_all()
+            if db.get(DocumentTask, task.id).status == "ERRORE":
+                break
+            time.sleep(0.05)
+    assert db.get(DocumentTask, task.id).error == "Versione non trovata"
+
+
+def test_requeue_only_tasks_without_heartbeat(db, document_settings):
+    from datetime import datetime, timedelta
+
+    from app.models.document import DocumentTask, DocumentTaskKind, DocumentTaskStatus
+
+    vecchio = datetime.utcnow() - timedelta(minutes=settings.DOCUMENT_STALE_MINUTES + 1)
+    vivo = documents.submit_task(db, DocumentTaskKind.quotes_zip, {}, None)
+    morto = documents.submit_task(db, DocumentTaskKind.quotes_zip, {}, None)
+    # export lungo su un'altra replica: iniziato da tempo ma con heartbeat recente
+    vivo.status, vivo.worker_id, vivo.started_at, vivo.heartbeat_at = "IN_CORSO", "altro:1", vecchio, datetime.utcnow()
+    morto.status, morto.worker_id, morto.started_at, morto.heartbeat_at = "IN_CORSO", "altro:2", vecchio, vecchio
+    db.commit()
+
+    assert documents.requeue_stale(db, settings.DOCUMENT_STALE_MINUTES) == 1
+    db.expire_all()
+    assert db.get(DocumentTask, vivo.id).status == DocumentTaskStatus.in_corso.value
+    ripreso = db.get(DocumentTask, morto.id)
+    assert ripreso.status == DocumentTaskStatus.in_coda.value and ripreso.worker_id is None
+
+
+def test_expired_tasks_and_files_are_purged(db, engine, document_settings):
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import select
+
+    from app.models.document import DocumentTask, DocumentTaskKind
+
+    task = documents.submit_task(db, DocumentTaskKind.quote_pdf, {"quote_version_id": 999}, None)
+    db.commit()
+    assert documents.run_next(sessionmaker(bind=engine, autoflush=False))
+    db.expire_all()
+    assert db.get(DocumentTask, task.id).expires_at is not None
+
+    recente = documents.submit_task(db, DocumentTaskKind.quotes_zip, {}, None)
+    scaduto = documents.submit_task(db, DocumentTaskKind.quotes_zip, {}, None)
+    result = documents.document_dir() / f"{scaduto.id}_preventivi.zip"
+    result.write_bytes(b"zip")
+    recente.status = scaduto.status = "COMPLETATO"
+    recente.expires_at = datetime.utcnow() + timedelta(hours=1)
+    scaduto.expires_at, scaduto.result_path = datetime.utcnow() - timedelta(minutes=1), str(result)
+    db.commit()
+    ids = (task.id, recente.id, scaduto.id)
+
+    assert documents.purge_expired(db, now=datetime.utcnow()) == 1
+    assert not result.exists()
+    assert db.scalars(select(DocumentTask.id).order_by(DocumentTask.id)).all() == list(ids[:2])
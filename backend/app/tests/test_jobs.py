@@ -0,0 +1,91 @@
+from sqlalchemy import event
+
+from app.models.costs import CostEntry
+from app.models.customer import Customer
+from app.models.inventory import Filament
+from app.models.job import Job, JobConsumption, JobStatus
+from app.models.quote import Quote, QuoteLine, QuoteStatus, QuoteVersion
+from app.services.jobs import bulk_transition_jobs, create_job_cost_entries, recalc_job, resolve_cost_categories
+from app.services.quotes import recalc_quote_version
+
+
+def _job(db, n_consumi: int = 1, codice: str = "PRV-J") -> Job:
+    filaments = [Filament(materiale="PLA", costo_spool_eur=20.0, peso_nominale_g=1000) for _ in range(n_consumi)]
+    cust = Customer(ragione_sociale="Test")
+    db.add_all([*filaments, cust])
+    db.flush()
+    quote = Quote(codice=codice, customer_id=cust.id)
+    db.add(quote)
+    db.flush()
+    qv = QuoteVersion(
+        quote_id=quote.id,
+        status=QuoteStatus.ACCETTATO,
+        costo_macchina_eur_h=1.0,
+        costo_manodopera_eur_h=20.0,
+        costo_energia_kwh=0.25,
+        consumabili_fissi_eur=0.5,
+        overhead_pct=10.0,
+        rischio_pct=5.0,
+    )
+    qv.righe.append(QuoteLine(descrizione="Pezzo", filament_id=filaments[0].id, quantita=2, peso_materiale_g=50, tempo_stimato_min=120, ore_manodopera_min=30))
+    db.add(qv)
+    recalc_quote_version(db, qv)
+    db.flush()
+    job = Job(quote_version_id=qv.id, quantita_prodotta=2, tempo_reale_min=120, energia_kwh=0.4)
+    for f in filaments:
+        job.consumi.append(JobConsumption(filament_id=f.id, peso_g=100))
+    db.add(job)
+    db.commit()
+    return job
+
+
+def test_cost_entries_match_job_cost(db):
+    job = _job(db)
+    breakdown = recalc_job(db, job)
+    job.status = JobStatus.completato.value
+    create_job_cost_entries(db, job, user_id=None, breakdown=breakdown)
+    db.commit()
+
+    # materiali 2.00 + energia 0.20 + macchina 4.00 + manodopera 10.00 + consumabili 1.00 = 17.20, +15%
+    assert float(job.costo_finale_eur) == 19.78
+    entries = db.query(CostEntry).filter(CostEntry.job_id == job.id).all()
+    assert len(entries) == 7
+    assert round(sum(float(e.importo_eur) for e in entries), 2) == float(job.costo_finale_eur)
+
+    # una seconda chiamata non duplica le voci
+    create_job_cost_entries(db, job, user_id=None)
+    assert db.query(CostEntry).filter(CostEntry.job_id == job.id).count() == 7
+
+
+def test_completion_query_count_independent_of_consumptions(db, engine):
+    # il primo job crea le righe del rollup KPI del mese: escluso dal confronto
+    job_ids = [_job(db, n_consumi=n, codice=f"PRV-{i}").id for i, n in enumerate((1, 1, 20))]
+    resolve_cost_categories(db, user_id=None)
+    db.commit()
+    counts = []
+    for job_id in job_ids:
+        db.expire_all()
+        job = db.get(Job, job_id)
+        statements = []
+        listener = lambda *args: statements.append(args[2])  # noqa: E731
+        event.listen(engine, "before_cursor_execute", listener)
+        breakdown = recalc_job(db, job)
+        create_job_cost_entries(db, job, user_id=None, breakdown=breakdown)
+        event.remove(engine, "before_cursor_execute", listener)
+        counts.append(len(statements))
+    assert counts[1] == counts[2]
+
+
+def test_bulk_transition_reports_per_job_errors(db):
+    job_ids = [_job(db, codice=f"PRV-B{i}").id for i in range(3)]
+    db.get(Job, job_ids[2]).status = JobStatus.completato.value
+    db.commit()
+
+    results = bulk_transition_jobs(db, job_ids + [9999], JobStatus.completato.value, user_id=None)
+    db.commit()
+
+    assert results[job_ids[0]] is None and results[job_ids[1]] is None
+    assert results[job_ids[2]] is not None
+    assert results[9999] == "Job non trovato"
+    assert db.query(CostEntry).filter(CostEntry.job_id.in_(job_ids[:2])).count() == 14
+    assert db.query(CostEntry).filter(CostEntry.job_id == job_ids[2]).count() == 0
@@ -0,0 +1,45 @@
+from sqlalchemy import select
+
+from app.models.kpi import KpiMonthly, KpiMonthlyCost, KpiMonthlyCustomer
+from app.services.kpi import periodo_of, rebuild_kpi
+
+
+def _snapshot(db):
+    db.expire_all()
+    return (
+        [tuple(getattr(r, c.key) for c in KpiMonthly.__table__.columns) for r in db.scalars(select(KpiMonthly).order_by(KpiMonthly.periodo))],
+        sorted((r.periodo, r.categoria_id, r.totale_cents) for r in db.scalars(select(KpiMonthlyCost))),
+        sorted((r.periodo, r.customer_id, r.versioni) for r in db.scalars(select(KpiMonthlyCustomer))),
+    )
+
+
+def test_incremental_rollup_matches_rebuild(db, client, admin_headers):
+    h = admin_headers
+    cust = client.post("/api/v1/customers/", headers=h, json={"ragione_sociale": "ACME"}).json()
+    riga = {"descrizione": "Pezzo", "quantita": 2, "tempo_stimato_min": 90, "ore_manodopera_min": 15}
+    versioni = []
+    for codice in ("PRV-K1", "PRV-K2"):
+        quote = client.post("/api/v1/quotes/", headers=h, json={"codice": codice, "customer_id": cust["id"]}).json()
+        versioni.append(client.post(f"/api/v1/quotes/{quote['id']}/versions", headers=h, json={"costo_manodopera_eur_h": 20, "righe": [riga]}).json())
+    client.post(f"/api/v1/quotes/versions/{versioni[0]['id']}/set-status", headers=h, params={"status_in": "ACCETTATO"})
+    job = client.post("/api/v1/jobs/from-quote", headers=h, json={"quote_version_id": versioni[0]["id"]}).json()
+    client.put(f"/api/v1/jobs/{job['id']}", headers=h, json={"status": "IN_CORSO"})
+    client.put(f"/api/v1/jobs/{job['id']}", headers=h, json={"status": "COMPLETATO"})
+    cat = client.post("/api/v1/costs/categories", headers=h, json={"nome": "Varie"}).json()
+    entry = client.post("/api/v1/costs/entries", headers=h, json={"categoria_id": cat["id"], "importo_eur": 12.5, "periodo_yyyymm": periodo_of()}).json()
+    client.post("/api/v1/costs/entries", headers=h, json={"categoria_id": cat["id"], "importo_eur": 3, "periodo_yyyymm": "2020-01"})
+    client.delete(f"/api/v1/costs/entries/{entry['id']}", headers=h)
+    quote2 = client.get("/api/v1/quotes/", headers=h, params={"codice": "PRV-K2"}).json()[0]
+    client.delete(f"/api/v1/quotes/{quote2['id']}", headers=h)
+
+    incrementale = _snapshot(db)
+    rebuild_kpi(db)
+    db.commit()
+    assert _snapshot(db) == incrementale
+
+    kpi = client.get("/api/v1/dashboard/kpi", headers=h).json()
+    mese = db.get(KpiMonthly, periodo_of())
+    assert kpi["preventivi_mese"] == 1 and kpi["clienti_attivi"] == 1
+    assert kpi["ricavi_mese_eur"] == versioni[0]["totale_imponibile_eur"]
+    assert kpi["job_in_corso"] == 0 and mese.job_completati == 1
+    assert kpi["costi_mese_eur"] == round(sum(e["importo_eur"] for e in client.get("/api/v1/costs/entries", headers=h, params={"periodo_from": periodo_of()}).json()), 2)
@@ -0,0 +1,64 @@
+import math
+from datetime import datetime, timedelta
+
+import app.models.printer  # noqa: F401  registra la tabella printers
+from app.models.customer import Customer
+from app.models.job import Job, JobStatus
+from app.models.quote import Quote, QuoteVersion
+from app.services.kpi import rebuild_kpi
+from app.services.margins import margin_stats
+
+# (cliente, costo finale, margine)
+JOBS = [("A", 80, 20), ("A", 90, 10), ("A", 50, 50), ("B", 100, -10), ("B", 60, 40), ("B", 70, 30), ("B", 95, 5)]
+
+
+def _seed(db):
+    customers = {nome: Customer(ragione_sociale=nome) for nome in ("A", "B")}
+    db.add_all(customers.values())
+    db.flush()
+    for i, (nome, costo, margine) in enumerate(JOBS):
+        quote = Quote(codice=f"PRV-M{i}", customer_id=customers[nome].id)
+        db.add(quote)
+        db.flush()
+        qv = QuoteVersion(quote_id=quote.id)
+        db.add(qv)
+        db.flush()
+        db.add(Job(quote_version_id=qv.id, status=JobStatus.completato.value, costo_finale_eur=costo, margine_eur=margine))
+    # job fuori finestra e job non completato: esclusi
+    db.add(Job(quote_version_id=qv.id, status=JobStatus.completato.value, costo_finale_eur=1, margine_eur=99, created_at=datetime.utcnow() - timedelta(days=400)))
+    db.add(Job(quote_version_id=qv.id, status=JobStatus.in_corso.value, costo_finale_eur=1, margine_eur=99))
+    db.commit()
+    return customers
+
+
+def _nearest_rank(values, p):
+    values = sorted(values)
+    return values[math.ceil(p * len(values) / 100) - 1]
+
+
+def test_margin_stats_per_customer(db):
+    customers = _seed(db)
+    since = datetime.utcnow() - timedelta(days=30)
+    stats = {s.gruppo: s for s in margin_stats(db, date_from=since, group_by="customer")}
+    for nome in ("A", "B"):
+        righe = [(c, m) for n, c, m in JOBS if n == nome]
+        pcts = [m * 100 / (c + m) for c, m in righe]
+        s = stats[nome]
+        assert s.gruppo_id == customers[nome].id and s.job == len(righe)
+        assert s.margine_medio_pct == round(sum(m for _, m in righe) * 100 / sum(c + m for c, m in righe), 2)
+        for p in (25, 50, 75, 90):
+            assert s.percentili_pct[p] == round(_nearest_rank(pcts, p), 2)
+
+
+def test_dashboard_tile_matches_margin_analytics(db, client, admin_headers):
+    _seed(db)
+    rebuild_kpi(db)
+    db.commit()
+    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    (tutti,) = margin_stats(db, date_from=month_start)
+    assert tutti.job == len(JOBS)
+    kpi = client.get("/api/v1/dashboard/kpi", headers=admin_headers).json()
+    assert kpi["margine_medio_pct"] == tutti.margine_medio_pct
+
+    r = client.get("/api/v1/dashboard/margini", headers=admin_headers, params={"group_by": "customer", "giorni": 30})
+    assert r.status_code == 200 and {g["gruppo"] for g in r.json()} == {"A", "B"}
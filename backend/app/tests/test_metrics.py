@@ -0,0 +1,39 @@
+from app.core.metrics import CACHE_REQUESTS, JOBS_COMPLETED, QUOTES_PRICED, Counter, LabeledHistogram
+from app.tests.test_jobs import _job
+
+
+def test_histogram_renders_cumulative_buckets_in_seconds():
+    h = LabeledHistogram("t_seconds", "test", ("route",), buckets=(10, 100), scale=0.001)
+    for ms in (5, 50, 500):
+        h.observe(ms, "/x")
+    lines = h.render()
+    assert 't_seconds_bucket{route="/x",le="0.01"} 1' in lines
+    assert 't_seconds_bucket{route="/x",le="0.1"} 2' in lines
+    assert 't_seconds_bucket{route="/x",le="+Inf"} 3' in lines
+    assert 't_seconds_sum{route="/x"} 0.555' in lines and 't_seconds_count{route="/x"} 3' in lines
+
+    c = Counter("t_total", "test", ("cache",))
+    c.inc('a"b')
+    assert 't_total{cache="a\\"b"} 1' in c.render()
+
+
+def test_metrics_endpoint_reports_routes_and_domain_counters(db, client, admin_headers):
+    job = _job(db)
+    completati, prezzati = JOBS_COMPLETED.value(), QUOTES_PRICED.value()
+    hit_prima = CACHE_REQUESTS.value("auth_user", "hit")
+
+    assert client.get(f"/api/v1/jobs/{job.id}/nope", headers=admin_headers).status_code in (404, 405)
+    r = client.put(f"/api/v1/jobs/{job.id}", headers=admin_headers, json={"status": "COMPLETATO"})
+    assert r.status_code == 200, r.text
+    client.put(f"/api/v1/jobs/{job.id}", headers=admin_headers, json={"note": "già completato"})
+
+    assert JOBS_COMPLETED.value() == completati + 1
+    assert CACHE_REQUESTS.value("auth_user", "hit") > hit_prima
+    assert QUOTES_PRICED.value() == prezzati
+
+    body = client.get("/metrics").text
+    assert 'http_requests_total{method="PUT",route="/api/v1/jobs/{job_id}",status="200"}' in body
+    assert 'http_request_duration_seconds_bucket{method="PUT",route="/api/v1/jobs/{job_id}",le="+Inf"}' in body
+    assert 'route="<nessuna>"' in body
+    assert "http_requests_in_flight 1" in body  # la richiesta a /metrics stessa
+    assert "# TYPE http_response_size_bytes histogram" in body
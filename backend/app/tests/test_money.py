@@ -0,0 +1,26 @@
+from decimal import Decimal
+
+from app.core.money import apply_bp, div_round, from_cents, to_bp, to_cents, to_hundredths, to_micro
+
+
+def test_conversions():
+    assert to_cents(12.5) == 1250
+    assert to_cents(Decimal("0.10")) == 10
+    assert to_cents(None) == 0
+    assert to_micro(0.08) == 80_000
+    assert to_bp(22.5) == 2250
+    assert to_hundredths(Decimal("17.25")) == 1725
+    assert from_cents(2999) == 29.99
+
+
+def test_div_round_is_half_even():
+    assert div_round(5, 2) == 2
+    assert div_round(7, 2) == 4
+    assert div_round(-5, 2) == -2
+    assert div_round(2, 3) == 1
+    assert div_round(1, 3) == 0
+
+
+def test_apply_bp():
+    assert apply_bp(10_000, 2200) == 2200
+    assert apply_bp(2443, 2200) == 537
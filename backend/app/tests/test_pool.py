@@ -0,0 +1,38 @@
+import logging
+import threading
+
+import pytest
+from sqlalchemy import create_engine, exc
+
+from app.core.config import settings
+from app.db.pool import InstrumentedQueuePool, pool_stats
+
+
+def test_pool_records_waits_and_warns_on_saturation(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "DB_POOL_WAIT_WARN_MS", 50)
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.3)
+
+    held = engine.connect()
+    assert pool_stats(engine)["checked_out"] == 1
+    threading.Timer(0.1, held.close).start()
+    with caplog.at_level(logging.WARNING, logger="app.db.pool"):
+        with engine.connect():
+            pass
+    assert any("checkout in" in r.message for r in caplog.records)
+
+    held = engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    held.close()
+
+    stats = pool_stats(engine)
+    assert stats["checkouts"] == 3 and stats["timeouts"] == 1 and stats["slow_waits"] == 1
+    assert stats["waiting"] == 0 and stats["checked_out"] == 0
+    assert stats["wait_ms"]["count"] == 3 and stats["wait_ms"]["max"] >= 50
+    engine.dispose()
+
+
+def test_pool_endpoint_is_admin_only(client, admin_headers):
+    res = client.get("/api/v1/internal/pool", headers=admin_headers)
+    assert res.status_code == 200 and set(res.json()) == {"primary", "async"}
+    assert client.get("/api/v1/internal/pool").status_code == 401
@@ -0,0 +1,51 @@
+import json
+import time
+
+from app.core.profiler import Profiler
+from app.core.security import create_access_token
+
+
+def _busy(ms: float) -> None:
+    end = time.perf_counter() + ms / 1000
+    while time.perf_counter() < end:
+        pass
+
+
+def test_profiler_samples_app_code_into_ring():
+    prof = Profiler(interval_ms=1, ring_size=2)
+    profile = prof.begin("GET", "/x", "lenta")
+    _busy(50)
+    prof.end(profile, 50, 200)
+
+    assert profile.samples > 0
+    assert any("_busy (app/tests/test_profiler.py:" in line for line in profile.collapsed().splitlines())
+    doc = profile.speedscope()
+    assert doc["profiles"][0]["type"] == "sampled"
+    assert len(doc["profiles"][0]["samples"]) == len(doc["profiles"][0]["weights"])
+
+    scartato = prof.begin("GET", "/y", "lenta")
+    prof.end(scartato, 1, 200, keep=False)
+    for _ in range(2):
+        prof.end(prof.begin("GET", "/z", "richiesta"), 1, 200)
+    assert [p.path for p in prof.profiles()] == ["/z", "/z"]
+    assert prof.get(profile.id) is None
+
+
+def test_profile_header_only_for_admin(client, admin_headers):
+    r = client.get("/api/v1/customers/", headers={**admin_headers, "X-Profile": "1"})
+    assert r.status_code == 200
+    profile_id = r.headers["X-Profile-Id"]
+
+    elenco = client.get("/api/v1/internal/profiles", headers=admin_headers).json()
+    assert elenco[0]["id"] == int(profile_id) and elenco[0]["motivo"] == "richiesta"
+
+    r = client.get(f"/api/v1/internal/profiles/{profile_id}", headers=admin_headers)
+    assert r.status_code == 200
+    assert "attachment" in r.headers["content-disposition"]
+    assert json.loads(r.content)["$schema"].startswith("https://www.speedscope.app")
+    r = client.get(f"/api/v1/internal/profiles/{profile_id}?formato=collapsed", headers=admin_headers)
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    assert client.get("/api/v1/internal/profiles/999999", headers=admin_headers).status_code == 404
+
+    viewer = {"Authorization": f"Bearer {create_access_token('1', extra={'role': 'VIEWER'})}", "X-Profile": "1"}
+    assert "X-Profile-Id" not in client.get("/api/v1/customers/", headers=viewer).headers
@@ -0,0 +1,69 @@
+import logging
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.middleware import QueryStatsMiddleware
+from app.db.query_stats import fingerprint
+from app.models.customer import Customer
+from app.tests.test_jobs import _job
+
+
+def test_fingerprint_collapses_values_and_in_lists():
+    assert fingerprint("SELECT * FROM t\n WHERE id IN (?, ?, ?) AND x = 'a'") == "SELECT * FROM t WHERE id IN (?) AND x = ?"
+    assert fingerprint("SELECT 1 FROM t WHERE id = %(id_1)s") == fingerprint("SELECT 2 FROM t WHERE id = %(id_1)s")
+
+
+def _app(engine, **options) -> FastAPI:
+    factory = sessionmaker(bind=engine)
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware, **options)
+
+    def get_session():
+        with factory() as db:
+            yield db
+
+    @app.get("/loop")
+    def loop(n: int, db: Session = Depends(get_session)):
+        return [db.get(Customer, i) is not None for i in range(1, n + 1)]
+
+    return app
+
+
+def test_debug_headers_report_count_and_repeats(engine):
+    with TestClient(_app(engine, debug_headers=True)) as client:
+        r = client.get("/loop", params={"n": 4})
+    assert r.headers["X-DB-Queries"] == "4"
+    assert float(r.headers["X-DB-Time-Ms"]) >= 0
+    assert r.headers["X-DB-Repeated"].startswith("4x SELECT")
+
+    with TestClient(_app(engine)) as client:
+        assert "X-DB-Queries" not in client.get("/loop", params={"n": 1}).headers
+
+
+def test_repeated_statements_are_logged(engine, caplog):
+    with TestClient(_app(engine, repeat_warn=5)) as client, caplog.at_level(logging.WARNING, "app.core.middleware"):
+        client.get("/loop", params={"n": 4})
+        assert not caplog.records
+        client.get("/loop", params={"n": 5})
+    assert "possibile N+1 in GET /loop: 5x SELECT" in caplog.text
+
+
+def test_job_list_query_budget_independent_of_rows(db, client, admin_headers, query_budget):
+    _job(db, codice="PRV-1")
+    client.get("/api/v1/jobs/", headers=admin_headers)  # utente in cache
+    with query_budget(2) as one:  # pagina di job + consumi (selectinload)
+        client.get("/api/v1/jobs/", headers=admin_headers)
+    for i in range(2, 6):
+        _job(db, codice=f"PRV-{i}")
+    with query_budget(one.count):
+        assert len(client.get("/api/v1/jobs/", headers=admin_headers).json()) == 5
+
+
+def test_query_budget_fails_when_exceeded(engine, query_budget):
+    with pytest.raises(pytest.fail.Exception, match="4 statement SQL, budget 3; ripetuti"):
+        with query_budget(3):
+            with TestClient(_app(engine)) as client:
+                client.get("/loop", params={"n": 4})
@@ -0,0 +1,119 @@
+import pytest
+
+from app.core.config import settings
+from app.services import pdf_cache
+
+
+@pytest.fixture
+def pdf_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PDF_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PDF_RENDER_WORKERS", 1)
+    yield tmp_path
+    pdf_cache.shutdown_pool()
+
+
+def _version(client, h):
+    cust = client.post("/api/v1/customers/", headers=h, json={"ragione_sociale": "ACME"}).json()
+    quote = client.post("/api/v1/quotes/", headers=h, json={"codice": "PRV-PDF", "customer_id": cust["id"]}).json()
+    riga = {"descrizione": "Pezzo", "quantita": 1, "tempo_stimato_min": 60}
+    return client.post(f"/api/v1/quotes/{quote['id']}/versions", headers=h, json={"righe": [riga]}).json()
+
+
+def test_pdf_is_cached_and_supports_etag(client, admin_headers, pdf_settings, monkeypatch):
+    renders = []
+    render = pdf_cache._render
+
+    async def counting_render(data):
+        renders.append(data.cache_key())
+        return await render(data)
+
+    monkeypatch.setattr(pdf_cache, "_render", counting_render)
+    qv = _version(client, admin_headers)
+    url = f"/api/v1/quotes/versions/{qv['id']}/pdf"
+
+    first = client.get(url, headers=admin_headers)
+    assert first.status_code == 200 and first.content.startswith(b"%PDF")
+    etag = first.headers["etag"]
+    assert len(list(pdf_settings.glob("*.pdf"))) == 1
+
+    # un secondo download non rende di nuovo il documento
+    assert client.get(url, headers=admin_headers).content == first.content
+    assert client.get(url, headers={**admin_headers, "If-None-Match": etag}).status_code == 304
+    assert len(renders) == 1
+
+    # cambia il contenuto -> nuova chiave
+    client.put(f"/api/v1/quotes/versions/{qv['id']}", headers=admin_headers, json={"sconto_eur": 1})
+    changed = client.get(url, headers={**admin_headers, "If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert len(renders) == 2
+
+
+def test_zip_export_streams_filtered_pdfs(client, admin_headers, pdf_settings, monkeypatch):
+    import io
+    import zipfile
+
+    from app.services import pdf_export
+
+    monkeypatch.setattr(pdf_export, "EXPORT_BATCH_SIZE", 2)
+    h = admin_headers
+    cust = client.post("/api/v1/customers/", headers=h, json={"ragione_sociale": "ACME"}).json()
+    for i in range(5):
+        quote = client.post("/api/v1/quotes/", headers=h, json={"codice": f"PRV-Z{i}", "customer_id": cust["id"]}).json()
+        qv = client.post(f"/api/v1/quotes/{quote['id']}/versions", headers=h, json={"righe": [{"descrizione": "Pezzo"}]}).json()
+        if i % 2 == 0:
+            client.post(f"/api/v1/quotes/versions/{qv['id']}/set-status", headers=h, params={"status_in": "INVIATO"})
+
+    with client.stream("GET", "/api/v1/quotes/export/pdf", headers=h, params={"status": "INVIATO"}) as r:
+        assert r.status_code == 200
+        body = b"".join(r.iter_bytes())
+    names = zipfile.ZipFile(io.BytesIO(body)).namelist()
+    assert sorted(names) == [f"PREVENTIVO_PRV-Z{i}_v1.pdf" for i in (0, 2, 4)]
+
+
+def test_long_quote_repeats_static_forms_on_every_page():
+    from app.services.pdf import QuotePdfData, QuotePdfLine, render_pdf_data
+
+    righe = tuple(QuotePdfLine(f"Pezzo {i}", "10", "30", 1.0) for i in range(120))
+    data = QuotePdfData("PRV-LONG", 1, "BOZZA", "ACME", "-", "-", "-", "Lab", "Via", "e", "t", righe, False, 0, 120, 0, 120)
+    pdf = render_pdf_data(data)
+    pages = pdf.count(b"/Type /Page\n")
+    assert pages > 1
+    # i tre form sono definiti una volta sola, poi solo richiamati pagina per pagina
+    assert pdf.count(b"/Subtype /Form") == 3
+
+
+def test_cache_is_pruned_past_the_threshold(pdf_settings, monkeypatch):
+    monkeypatch.setattr(settings, "PDF_CACHE_MAX_FILES", 10)
+    for i in range(11):
+        pdf_cache.write_cached(f"k{i}", b"%PDF")
+    assert len(list(pdf_settings.glob("*.pdf"))) == 11  # entro un decimo oltre il limite
+    pdf_cache.write_cached("k11", b"%PDF")
+    assert len(list(pdf_settings.glob("*.pdf"))) == 10
+    assert not (pdf_settings / "k0.pdf").exists()
+
+
+def test_cancelled_request_does_not_cancel_shared_render(pdf_settings, monkeypatch):
+    import asyncio
+
+    from app.services.pdf import QuotePdfData
+
+    renders = []
+
+    async def slow_render(data):
+        renders.append(1)
+        await asyncio.sleep(0.05)
+        return b"%PDF-condiviso"
+
+    monkeypatch.setattr(pdf_cache, "_render", slow_render)
+    data = object.__new__(QuotePdfData)  # la chiave è esplicita: il contenuto non serve
+
+    async def scenario():
+        owner = asyncio.create_task(pdf_cache.get_or_render_pdf(data, "condiviso"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(pdf_cache.get_or_render_pdf(data, "condiviso"))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        return await waiter
+
+    assert asyncio.run(scenario()) == b"%PDF-condiviso"
+    assert renders == [1] and (pdf_settings / "condiviso.pdf").read_bytes() == b"%PDF-condiviso"
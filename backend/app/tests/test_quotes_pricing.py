@@ -0,0 +1,127 @@
+from sqlalchemy import event
+from sqlalchemy.orm import selectinload
+
+from app.models.inventory import Filament
+from app.models.quote import Quote, QuoteLine, QuoteStatus, QuoteVersion
+from app.models.customer import Customer
+from app.services.quote_grid import what_if_grid
+from app.services.quotes import affected_version_ids, recalc_quote_version, recalc_quote_versions, reprice_for_filament
+
+
+def _version(quote_id: int, filament_id: int, n_lines: int = 2) -> QuoteVersion:
+    qv = QuoteVersion(
+        quote_id=quote_id,
+        costo_macchina_eur_h=1.0,
+        costo_manodopera_eur_h=20.0,
+        potenza_w=200.0,
+        costo_energia_kwh=0.25,
+        consumabili_fissi_eur=0.5,
+        overhead_pct=10.0,
+        rischio_pct=5.0,
+        margine_pct=20.0,
+        sconto_eur=0.0,
+        iva_pct=22.0,
+        applica_iva=True,
+    )
+    qv.righe.append(
+        QuoteLine(descrizione="Pezzo", filament_id=filament_id, quantita=2, peso_materiale_g=50, tempo_stimato_min=120, ore_manodopera_min=30)
+    )
+    for _ in range(n_lines - 1):
+        qv.righe.append(QuoteLine(descrizione="Extra", filament_id=None, quantita=1, peso_materiale_g=0, tempo_stimato_min=30, ore_manodopera_min=0))
+    return qv
+
+
+def _setup(db):
+    fil = Filament(materiale="PLA", costo_spool_eur=20.0, peso_nominale_g=1000)
+    cust = Customer(ragione_sociale="Test")
+    db.add_all([fil, cust])
+    db.flush()
+    quote = Quote(codice="PRV-T", customer_id=cust.id)
+    db.add(quote)
+    db.flush()
+    return fil, quote
+
+
+def test_recalc_quote_version_totals(db):
+    fil, quote = _setup(db)
+    qv = _version(quote.id, fil.id)
+    recalc_quote_version(db, qv)
+
+    first, second = qv.righe
+    assert first.costo_materiale_eur == 2.0
+    assert first.costo_energia_eur == 0.2
+    assert first.costo_macchina_eur == 4.0
+    assert first.costo_manodopera_eur == 10.0
+    assert first.costo_consumabili_eur == 1.0
+    assert first.totale_riga_eur == 23.74
+    # energia e macchina solo sulla prima riga
+    assert second.costo_energia_eur == 0.0
+    assert second.totale_riga_eur == 0.69
+    assert qv.totale_imponibile_eur == 24.43
+    assert qv.totale_iva_eur == 5.37
+    assert qv.totale_lordo_eur == 29.80
+
+
+def test_recalc_quote_versions_query_count_is_constant(db, engine):
+    fil, quote = _setup(db)
+    for n in (1, 50):
+        db.add(_version(quote.id, fil.id, n_lines=n))
+    db.commit()
+    versions = db.query(QuoteVersion).options(selectinload(QuoteVersion.righe)).all()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    recalc_quote_versions(db, versions)
+
+    # una sola query per i filamenti, nessuna per riga
+    assert len(statements) == 1
+    assert all(v.totale_imponibile_eur > 0 for v in versions)
+
+
+def test_reprice_for_filament_only_touches_open_drafts(db):
+    fil, quote = _setup(db)
+    other = Filament(materiale="PETG", costo_spool_eur=30.0, peso_nominale_g=1000)
+    db.add(other)
+    db.flush()
+    bozza = _version(quote.id, fil.id)
+    accettata = _version(quote.id, fil.id)
+    accettata.status = QuoteStatus.ACCETTATO
+    estranea = _version(quote.id, other.id)
+    for qv in (bozza, accettata, estranea):
+        recalc_quote_version(db, qv)
+        db.add(qv)
+    db.commit()
+    ids = bozza_id, accettata_id, estranea_id = bozza.id, accettata.id, estranea.id
+    before = {qv.id: float(qv.totale_imponibile_eur) for qv in (bozza, accettata, estranea)}
+
+    assert affected_version_ids(db, filament_ids=[fil.id]) == [bozza_id]
+
+    fil.costo_spool_eur = 40.0
+    db.commit()
+    assert reprice_for_filament(db, fil.id) == 1
+
+    after = {qv.id: float(qv.totale_imponibile_eur) for qv in db.query(QuoteVersion).filter(QuoteVersion.id.in_(ids))}
+    assert after[bozza_id] > before[bozza_id]
+    assert after[accettata_id] == before[accettata_id]
+    assert after[estranea_id] == before[estranea_id]
+
+
+def test_what_if_grid_matches_pricing_engine(db):
+    fil, quote = _setup(db)
+    qv = _version(quote.id, fil.id)
+    db.add(qv)
+    recalc_quote_version(db, qv)
+    db.commit()
+
+    grid = what_if_grid(db, qv, margine_pct=[10, 20, 30], overhead_pct=[5, 10], sconto_eur=[0, 5])
+    assert len(grid["totale_imponibile_eur"]) == 12
+
+    # il punto con i parametri della versione coincide con il ricalcolo
+    idx = next(
+        i for i in range(12)
+        if grid["margine_pct"][i] == 20 and grid["overhead_pct"][i] == 10 and grid["sconto_eur"][i] == 0
+    )
+    assert abs(grid["totale_imponibile_eur"][idx] - float(qv.totale_imponibile_eur)) <= 0.01
+    assert abs(grid["totale_lordo_eur"][idx] - float(qv.totale_lordo_eur)) <= 0.02
+    # la griglia non modifica la versione
+    assert not db.dirty
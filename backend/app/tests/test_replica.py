@@ -0,0 +1,57 @@
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.db import routing
+from app.db.routing import ReplicaRouter
+from app.db.session import Base
+from app.models.costs import CostCategory, CostEntry
+
+
+def _replica(tmp_path):
+    # secondo file SQLite nel ruolo della replica, con dati che il primario non ha
+    engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+    with factory() as db:
+        cat = CostCategory(nome="Energia")
+        db.add(cat)
+        db.flush()
+        db.add(CostEntry(categoria_id=cat.id, importo_eur=12.5, periodo_yyyymm="2026-01"))
+        db.commit()
+    async_factory = async_sessionmaker(create_async_engine(engine.url.set(drivername="sqlite+aiosqlite"), poolclass=NullPool))
+    return factory, async_factory
+
+
+def test_reports_read_from_replica_and_fall_back_on_lag(client, admin_headers, engine, async_engine, tmp_path, monkeypatch):
+    from app.api_v1.deps import get_read_router
+
+    replica, async_replica = _replica(tmp_path)
+    router = ReplicaRouter(
+        sessionmaker(bind=engine, autoflush=False),
+        replica,
+        async_sessionmaker(async_engine),
+        async_replica,
+        max_lag=5,
+        check_every=0,
+    )
+    client.app.dependency_overrides[get_read_router] = lambda: router
+    url = "/api/v1/costs/reports/monthly"
+
+    assert client.get(url, headers=admin_headers).json() == [{"periodo_yyyymm": "2026-01", "totale_eur": 12.5}]
+    assert router.status()["in_uso"]
+
+    monkeypatch.setattr(routing, "measure_lag", lambda conn: 30.0)
+    assert client.get(url, headers=admin_headers).json() == []
+    assert router.status() == {"configurata": True, "in_uso": False, "ritardo_s": 30.0, "ritardo_max_s": 5}
+    # la dashboard (async) segue la stessa regola
+    assert client.get("/api/v1/dashboard/kpi", headers=admin_headers).status_code == 200
+
+
+def test_unreachable_replica_falls_back_to_primary(engine, tmp_path):
+    broken = sessionmaker(bind=create_engine(f"sqlite:///{tmp_path / 'manca' / 'replica.db'}"))
+    router = ReplicaRouter(sessionmaker(bind=engine), broken, check_every=60)
+    assert not router.replica_ok()
+    with router.read_session() as db:
+        assert db.bind is engine
@@ -0,0 +1,51 @@
+from app.core.config import settings
+from app.db import slow_queries
+
+
+def test_slow_queries_have_route_call_site_and_redacted_params(client, admin_headers, monkeypatch):
+    slow_queries.clear()
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 1e-6)  # ogni statement è "lento"
+
+    r = client.get("/api/v1/customers/", headers=admin_headers, params={"ragione_sociale": "Rossi Srl"})
+    assert r.status_code == 200
+    r = client.put("/api/v1/users/1", headers=admin_headers, json={"full_name": "Nuovo Nome"})
+    assert r.status_code == 200, r.text
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0)
+
+    entries = client.get("/api/v1/internal/slow-queries", headers=admin_headers).json()["queries"]
+    by_endpoint = {}
+    for e in entries:
+        by_endpoint.setdefault(e["endpoint"], []).append(e)
+
+    clienti = [e for e in by_endpoint["GET /api/v1/customers/"] if "FROM customers" in e["sql"]]
+    # sessione async: il chiamante si ritrova nel greenlet padre
+    assert clienti and clienti[0]["call_site"].startswith("paginate_async (app/services/pagination.py:")
+    assert "<str:" in str(clienti[0]["params"]) and "Rossi" not in str(clienti[0]["params"])
+    update = [e for e in by_endpoint["PUT /api/v1/users/{user_id}"] if e["sql"].startswith("UPDATE users")]
+    assert update and update[0]["call_site"].startswith("get_uow (app/api_v1/deps.py:")  # flush al commit
+    assert "Nuovo" not in str(update[0]["params"])
+    assert all(e["plan"] is None for e in entries)  # niente EXPLAIN fuori da PostgreSQL
+
+
+def test_failed_explain_rolls_back_to_savepoint():
+    from types import SimpleNamespace
+
+    executed = []
+
+    class Cursor:
+        def execute(self, sql, params=None):
+            executed.append(sql.split(" (")[0])
+            if sql.startswith("EXPLAIN"):
+                raise RuntimeError("canceling statement due to statement timeout")
+
+        def close(self):
+            pass
+
+    conn = SimpleNamespace(
+        dialect=SimpleNamespace(name="postgresql"),
+        connection=SimpleNamespace(dbapi_connection=SimpleNamespace(cursor=Cursor)),
+    )
+    plan = slow_queries._explain(conn, "SELECT 1", ())
+    assert plan.startswith("EXPLAIN non riuscito: canceling statement")
+    # la transazione della richiesta resta utilizzabile
+    assert executed == ["SAVEPOINT slow_query_explain", "EXPLAIN", "ROLLBACK TO SAVEPOINT slow_query_explain"]
@@ -0,0 +1,99 @@
+from fastapi import Depends, HTTPException
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.api_v1.deps import get_uow
+from app.core.metrics import QUOTES_PRICED
+from app.db import unit_of_work
+from app.db.unit_of_work import after_commit
+from app.models.customer import Customer
+from app.models.job import Job
+from app.models.quote import QuoteVersion
+from app.services.jobs import recalc_job
+from app.services.quotes import recalc_quote_version
+from app.tests.test_jobs import _job
+from app.tests.test_quotes_pricing import _setup, _version
+
+
+def test_failed_request_rolls_back_and_skips_callbacks(db, client, admin_headers):
+    called = []
+
+    def handler(fail: bool = False, db: Session = Depends(get_uow)):
+        db.add(Customer(ragione_sociale="Parziale"))
+        db.flush()
+        after_commit(db, lambda: called.append(True))
+        if fail:
+            raise HTTPException(status_code=409, detail="conflitto")
+        return {"ok": True}
+
+    client.app.add_api_route("/uow-test", handler, methods=["POST"])
+
+    assert client.post("/uow-test", params={"fail": True}).status_code == 409
+    assert db.scalar(select(Customer)) is None and called == []
+
+    assert client.post("/uow-test").status_code == 200
+    assert db.scalar(select(Customer.ragione_sociale)) == "Parziale" and called == [True]
+
+
+def test_priced_versions_are_counted_only_after_commit(db):
+    prezzati = QUOTES_PRICED.value()
+    for fine in (unit_of_work.rollback, unit_of_work.commit):
+        fil, quote = _setup(db)
+        qv = _version(quote.id, fil.id)
+        db.add(qv)
+        db.flush()
+        recalc_quote_version(db, qv)
+        assert QUOTES_PRICED.value() == prezzati
+        fine(db)
+    assert QUOTES_PRICED.value() == prezzati + 1
+
+
+def test_job_from_quote_commits_once_with_material_cost(engine, db, client, admin_headers):
+    qv_id = _job(db).quote_version_id
+    commits = []
+
+    def on_commit(conn):
+        commits.append(conn)
+
+    event.listen(engine, "commit", on_commit)
+    try:
+        r = client.post("/api/v1/jobs/from-quote", headers=admin_headers, json={"quote_version_id": qv_id})
+    finally:
+        event.remove(engine, "commit", on_commit)
+    assert r.status_code == 200, r.text
+    assert len(commits) == 1
+
+    body = r.json()
+    assert body["quote_code"] == "PRV-J" and len(body["consumi"]) == 1
+    # i consumi copiati dal preventivo sono già nel costo del job: ricalcolarlo non lo cambia
+    job = db.get(Job, body["id"])
+    costo = job.costo_finale_eur
+    recalc_job(db, job)
+    assert float(job.costo_finale_eur) == float(costo)
+
+
+def test_filament_reprice_stays_in_the_request_transaction(engine, db, client, admin_headers):
+    fil, quote = _setup(db)
+    bozze = [_version(quote.id, fil.id) for _ in range(3)]
+    for qv in bozze:
+        recalc_quote_version(db, qv)
+    db.add_all(bozze)
+    db.commit()
+    before = {qv.id: float(qv.totale_imponibile_eur) for qv in bozze}
+
+    commits = []
+
+    def on_commit(conn):
+        commits.append(conn)
+
+    event.listen(engine, "commit", on_commit)
+    try:
+        r = client.put(f"/api/v1/filaments/{fil.id}", headers=admin_headers, json={"costo_spool_eur": 40.0})
+    finally:
+        event.remove(engine, "commit", on_commit)
+    assert r.status_code == 200, r.text
+    assert len(commits) == 1
+
+    db.expire_all()
+    after = dict(db.execute(select(QuoteVersion.id, QuoteVersion.totale_imponibile_eur)).all())
+    assert all(float(after[vid]) > before[vid] for vid in before)
@@ -0,0 +1,62 @@
+"""Helper condivisi dagli script di benchmark.
+
+Gli script si lanciano dalla cartella ``backend``::
+
+    python -m benchmarks.bench_pricing
+"""
+import statistics
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401
+import app.models.printer  # noqa: F401
+from app.db.session import Base
+
+
+def make_engine(url: str = "sqlite://") -> Engine:
+    kwargs = {}
+    if url.startswith("sqlite"):
+        kwargs = {"connect_args": {"check_same_thread": False}}
+        if url == "sqlite://":
+            kwargs["poolclass"] = StaticPool
+    engine = create_engine(url, **kwargs)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def make_session(engine: Engine) -> Session:
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+@contextmanager
+def count_statements(engine: Engine) -> Iterator[list[str]]:
+    statements: list[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+
+def timeit(fn: Callable[[], object], repeat: int = 20) -> dict[str, float]:
+    """Esegue ``fn`` ``repeat`` volte e restituisce mediana e p95 in millisecondi."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
@@ -0,0 +1,111 @@
+"""Latenza p99 di un elenco con 200 client contemporanei: endpoint sync contro async.
+
+``GET /customers/`` (async, sessione ``AsyncSession``) è confrontato con la
+stessa query servita da un endpoint ``def`` con sessione sync, montato su una
+rotta di prova: quest'ultimo passa dal threadpool di Starlette (40 thread), che
+con 200 client diventa la coda. La misura di riferimento è su PostgreSQL
+(``BENCH_DATABASE_URL``, URL psycopg2; l'async usa asyncpg). Senza variabile
+usa SQLite su file: aiosqlite serve ogni connessione da un thread proprio,
+quindi lì l'async paga un passaggio di thread in più e non è rappresentativo.
+
+    python -m benchmarks.bench_load
+"""
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import Depends, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.api_v1.deps import get_async_db, get_current_user, get_db, page_params
+from app.core.security import create_access_token, get_password_hash
+from app.main import create_app
+from app.models.customer import Customer
+from app.models.user import User, UserRole
+from app.services.pagination import PageParams, paginate
+from benchmarks._common import make_engine
+
+CLIENTS = 200
+REQUESTS_PER_CLIENT = 10
+CUSTOMERS = 500
+
+
+def build_app():
+    url = os.environ.get("BENCH_DATABASE_URL") or f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench_load.db'}"
+    engine = make_engine(url)
+    async_url = engine.url.set(drivername="sqlite+aiosqlite" if url.startswith("sqlite") else "postgresql+asyncpg")
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    async_factory = async_sessionmaker(create_async_engine(async_url), autoflush=False, expire_on_commit=False)
+
+    db = factory()
+    user = User(email="load@bench.local", role=UserRole.admin.value, hashed_password=get_password_hash("x"))
+    db.add(user)
+    db.add_all(Customer(ragione_sociale=f"Cliente {i:04d}") for i in range(CUSTOMERS))
+    db.commit()
+    token = create_access_token(str(user.id))
+    db.close()
+
+    app = create_app()
+
+    def override_db():
+        session = factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    async def override_async_db():
+        async with async_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_async_db] = override_async_db
+
+    # come era prima: stessa query in un endpoint sync
+    @app.get("/bench/customers-sync", dependencies=[Depends(get_current_user)])
+    def customers_sync(response: Response, page: PageParams = Depends(page_params), db: Session = Depends(get_db)):
+        return [c.id for c in paginate(db, select(Customer), {"id": Customer.id}, page, response)]
+
+    return app, {"Authorization": f"Bearer {token}"}
+
+
+async def load(client: httpx.AsyncClient, url: str, headers: dict) -> tuple[float, list[float]]:
+    latencies: list[float] = []
+
+    async def one_client() -> None:
+        for _ in range(REQUESTS_PER_CLIENT):
+            t0 = time.perf_counter()
+            res = await client.get(url, headers=headers, params={"limit": 50})
+            latencies.append((time.perf_counter() - t0) * 1000)
+            assert res.status_code == 200, res.text
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one_client() for _ in range(CLIENTS)))
+    return time.perf_counter() - t0, latencies
+
+
+async def main() -> None:
+    app, headers = build_app()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/api/v1/customers/", headers=headers)  # riscalda cache utenti e connessioni
+        for name, url in (("sync", "/bench/customers-sync"), ("async", "/api/v1/customers/")):
+            elapsed, latencies = await load(client, url, headers)
+            latencies.sort()
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print(
+                f"{name:>6}: {len(latencies) / elapsed:7.1f} req/s  "
+                f"mediana {statistics.median(latencies):7.1f} ms  p99 {p99:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
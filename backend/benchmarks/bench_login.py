@@ -0,0 +1,104 @@
+"""Throughput del login sotto concorrenza e latenza degli altri endpoint nel frattempo.
+
+Confronta il login attuale (pbkdf2 nell'executor dedicato) con la versione
+sincrona di prima, montata su una rotta di prova: ``LOGINS`` login con
+``CONCURRENCY`` richieste contemporanee, mentre un client interroga un endpoint
+sincrono leggero (``/healthz``) e ne misura la latenza.
+
+    python -m benchmarks.bench_login
+"""
+import asyncio
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.api_v1.deps import get_db
+from app.core.security import get_password_hash, verify_password
+from app.main import create_app
+from app.models.user import User
+from benchmarks._common import make_engine
+
+LOGINS = 200
+CONCURRENCY = 50
+
+
+def build_app():
+    engine = make_engine(f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench_login.db'}")
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = factory()
+    db.add_all(User(email=f"u{i}@bench.local", hashed_password=get_password_hash("password")) for i in range(10))
+    db.commit()
+    db.close()
+
+    app = create_app()
+
+    def override_db():
+        session = factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_db
+
+    # come era prima: query e pbkdf2 nello stesso thread del threadpool
+    @app.post("/bench/login-sync")
+    def login_sync(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(override_db)):
+        user = db.query(User).filter(User.email == form.username).first()
+        if not user or not verify_password(form.password, user.hashed_password):
+            raise HTTPException(status_code=400)
+        return {"ok": True}
+
+    return app
+
+
+async def burst(client: httpx.AsyncClient, url: str) -> tuple[float, list[float]]:
+    sem = asyncio.Semaphore(CONCURRENCY)
+    done = asyncio.Event()
+    latencies: list[float] = []
+
+    async def one(i: int) -> None:
+        async with sem:
+            res = await client.post(url, data={"username": f"u{i % 10}@bench.local", "password": "password"})
+            assert res.status_code == 200, res.text
+
+    async def probe() -> None:
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await client.get("/healthz")
+            latencies.append((time.perf_counter() - t0) * 1000)
+            await asyncio.sleep(0.005)
+
+    prober = asyncio.create_task(probe())
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(LOGINS)))
+    elapsed = time.perf_counter() - t0
+    done.set()
+    await prober
+    return elapsed, latencies
+
+
+async def main() -> None:
+    app = build_app()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, url in (("sincrono", "/bench/login-sync"), ("executor", "/api/v1/auth/login")):
+            elapsed, latencies = await burst(client, url)
+            latencies.sort()
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            print(
+                f"{name:>9}: {LOGINS / elapsed:7.1f} login/s  "
+                f"/healthz mediana {statistics.median(latencies):6.1f} ms  p95 {p95:6.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
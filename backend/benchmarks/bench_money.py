@@ -0,0 +1,94 @@
+"""Microbenchmark: aritmetica Decimal (vecchio motore) contro centesimi interi.
+
+Confronta la formula di una riga preventivo scritta come prima (conversioni
+``Decimal(str(...))`` e ``quantize`` su ogni campo) con la versione a virgola
+fissa di ``app.core.money``, sugli stessi input ``float``/``Decimal`` che
+arrivano dal DB. Riporta anche la deriva tra somma delle righe arrotondate e
+totale di versione nelle due implementazioni.
+
+    python -m benchmarks.bench_money
+"""
+import random
+import timeit
+from decimal import Decimal
+
+from app.core.money import CENTS, PCT_SCALE, div_round, from_cents, to_bp, to_cents, to_hundredths, to_micro
+from app.services.quotes import ENERGIA_DEN, MACCHINA_DEN, MANODOPERA_DEN
+
+N_LINES = 500
+CENT = Decimal("0.01")
+
+random.seed(7)
+LINES = [
+    (
+        random.randint(1, 5),  # quantita
+        Decimal(str(round(random.uniform(5, 300), 2))),  # peso_materiale_g
+        random.randint(10, 600),  # tempo_stimato_min
+        Decimal(str(round(random.uniform(0, 30), 2))),  # ore_manodopera_min
+    )
+    for _ in range(N_LINES)
+]
+SPOOL, NOMINALE = Decimal("19.90"), 1000
+VERSION = dict(macchina=0.33, potenza=Decimal("350.00"), kwh=Decimal("0.2700"), manodopera=Decimal("25.00"),
+               consumabili=Decimal("0.50"), overhead=Decimal("10.00"), rischio=Decimal("5.00"), margine=Decimal("30.00"))
+
+
+def decimal_engine() -> tuple[list[float], float]:
+    v = VERSION
+    totals, tot = [], Decimal("0")
+    for idx, (qty_i, peso, minuti, manod) in enumerate(LINES):
+        qty = Decimal(str(qty_i))
+        costo_per_g = Decimal(str(SPOOL)) / Decimal(str(NOMINALE))
+        mat = costo_per_g * Decimal(str(peso))
+        ore = Decimal(str(minuti)) / Decimal("60")
+        if idx == 0:
+            energia = (Decimal(str(v["potenza"])) / Decimal("1000")) * ore * Decimal(str(v["kwh"]))
+            macchina = ore * Decimal(str(v["macchina"]))
+        else:
+            energia = macchina = Decimal("0")
+        lavoro = Decimal(str(manod)) / Decimal("60") * Decimal(str(v["manodopera"]))
+        cons = Decimal(str(v["consumabili"]))
+        sub = mat * qty + energia * qty + macchina * qty + lavoro + cons * qty
+        netto = sub + sub * Decimal(str(v["overhead"])) / Decimal("100") + sub * Decimal(str(v["rischio"])) / Decimal("100")
+        prezzo = netto * (Decimal("1") + Decimal(str(v["margine"])) / Decimal("100"))
+        for x in (mat * qty, energia * qty, macchina * qty, lavoro, cons * qty):
+            float(x.quantize(CENT))
+        totals.append(float(prezzo.quantize(CENT)))
+        tot += prezzo
+    return totals, float(tot.quantize(CENT))
+
+
+def cents_engine() -> tuple[list[float], float]:
+    v = VERSION
+    spool = to_cents(SPOOL)
+    macchina_micro, potenza_cw, kwh_micro = to_micro(v["macchina"]), to_hundredths(v["potenza"]), to_micro(v["kwh"])
+    manod_micro, cons_cents = to_micro(v["manodopera"]), to_cents(v["consumabili"])
+    ricarichi = PCT_SCALE + to_bp(v["overhead"]) + to_bp(v["rischio"])
+    margine = PCT_SCALE + to_bp(v["margine"])
+    totals, tot = [], 0
+    for idx, (qty, peso, minuti, manod) in enumerate(LINES):
+        mat = div_round(spool * to_hundredths(peso) * qty, NOMINALE * 100)
+        if idx == 0:
+            energia = div_round(potenza_cw * minuti * kwh_micro * qty * CENTS, ENERGIA_DEN)
+            macchina = div_round(minuti * macchina_micro * qty * CENTS, MACCHINA_DEN)
+        else:
+            energia = macchina = 0
+        lavoro = div_round(to_hundredths(manod) * manod_micro * CENTS, MANODOPERA_DEN)
+        sub = mat + energia + macchina + lavoro + cons_cents * qty
+        prezzo = div_round(sub * ricarichi * margine, PCT_SCALE * PCT_SCALE)
+        totals.append(from_cents(prezzo))
+        tot += prezzo
+    return totals, from_cents(tot)
+
+
+def main() -> None:
+    for name, fn in (("Decimal", decimal_engine), ("centesimi", cents_engine)):
+        runs = 50
+        secs = min(timeit.repeat(fn, number=runs, repeat=5)) / runs
+        righe, totale = fn()
+        drift = round(totale - round(sum(righe), 2), 2)
+        print(f"{name:>10}: {secs * 1e6 / N_LINES:6.2f} µs/riga  ({secs * 1000:.2f} ms per {N_LINES} righe)  deriva righe/totale: {drift:+.2f} €")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Benchmark: rendering del PDF di un preventivo lungo (300 righe).
+
+Intestazione, piè di pagina e testata della tabella sono form XObject definiti
+una volta per documento e stampati su ogni pagina: il costo per pagina
+aggiuntiva è quello delle sole righe. Lo script riporta tempo, pagine e
+dimensione del PDF per un preventivo corto e per uno da ``N_LINES`` righe.
+
+    python -m benchmarks.bench_pdf
+"""
+import timeit
+
+from app.services.pdf import QuotePdfData, QuotePdfLine, render_pdf_data
+
+N_LINES = 300
+
+
+def quote_data(n_lines: int) -> QuotePdfData:
+    righe = tuple(QuotePdfLine(f"Pezzo stampato {i}", "42.50", "95", 12.34) for i in range(n_lines))
+    return QuotePdfData(
+        codice="PRV-BENCH", version_number=1, stato="BOZZA",
+        cliente="ACME S.r.l.", email="acme@example.com", telefono="0123456789", indirizzo="Via Roma 1, Milano",
+        company_name="PrintLab3D", company_address="Via Verdi 2, Torino", company_email="info@printlab3d.it", company_phone="011000000",
+        righe=righe, applica_iva=True, iva_pct=22.0,
+        totale_imponibile_eur=12.34 * n_lines, totale_iva_eur=round(12.34 * n_lines * 0.22, 2), totale_lordo_eur=round(12.34 * n_lines * 1.22, 2),
+    )
+
+
+def main() -> None:
+    for n in (1, N_LINES):
+        data = quote_data(n)
+        runs = 10
+        secs = min(timeit.repeat(lambda: render_pdf_data(data), number=runs, repeat=3)) / runs
+        pdf = render_pdf_data(data)
+        pages = pdf.count(b"/Type /Page\n")
+        print(f"{n:>4} righe: {secs * 1000:7.2f} ms/documento  {pages:>3} pagine  {len(pdf) / 1024:7.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Latenza del motore prezzi per versione a 1, 50 e 500 righe.
+
+Misura sia il ricalcolo di una singola versione (``recalc_quote_version``) sia
+il ricalcolo in blocco di più versioni (``recalc_quote_versions``), riportando
+anche il numero di query eseguite: su PostgreSQL ogni query è un round-trip di
+rete, quindi il conteggio conta quanto la latenza misurata su SQLite.
+
+    python -m benchmarks.bench_pricing
+"""
+from sqlalchemy.orm import selectinload
+
+from app.models.customer import Customer
+from app.models.inventory import Filament
+from app.models.printer import Printer
+from app.models.quote import Quote, QuoteLine, QuoteVersion
+from app.services.quotes import recalc_quote_version, recalc_quote_versions
+from benchmarks._common import count_statements, make_engine, make_session, timeit
+
+LINE_COUNTS = (1, 50, 500)
+N_FILAMENTS = 40
+BATCH_VERSIONS = 20
+
+
+def _populate(db, n_lines: int, n_versions: int) -> list[int]:
+    filaments = [Filament(materiale="PLA", costo_spool_eur=15 + i % 10, peso_nominale_g=1000) for i in range(N_FILAMENTS)]
+    printer = Printer(nome="P1", modello="X1C", potenza_w=350, costo_macchina_eur=1400, vita_stimata_h=8000, manutenzione_eur_h=0.2)
+    customer = Customer(ragione_sociale="Bench")
+    db.add_all(filaments + [printer, customer])
+    db.flush()
+    quote = Quote(codice=f"BENCH-{n_lines}", customer_id=customer.id)
+    db.add(quote)
+    db.flush()
+    ids = []
+    for v in range(n_versions):
+        qv = QuoteVersion(quote_id=quote.id, version_number=v + 1, printer_id=printer.id)
+        for i in range(n_lines):
+            qv.righe.append(
+                QuoteLine(
+                    descrizione=f"Riga {i}",
+                    filament_id=filaments[i % N_FILAMENTS].id,
+                    quantita=1 + i % 3,
+                    peso_materiale_g=10 + i,
+                    tempo_stimato_min=30,
+                    ore_manodopera_min=5,
+                )
+            )
+        db.add(qv)
+        db.flush()
+        ids.append(qv.id)
+    db.commit()
+    return ids
+
+
+def main() -> None:
+    print(f"{'righe':>6} {'singola ms (med/p95)':>22} {'query':>6} {f'batch x{BATCH_VERSIONS} ms/versione':>24} {'query':>6}")
+    for n_lines in LINE_COUNTS:
+        engine = make_engine()
+        db = make_session(engine)
+        ids = _populate(db, n_lines, BATCH_VERSIONS)
+        versions = db.query(QuoteVersion).options(selectinload(QuoteVersion.righe)).filter(QuoteVersion.id.in_(ids)).all()
+
+        single = timeit(lambda: recalc_quote_version(db, versions[0]))
+        with count_statements(engine) as stmts:
+            recalc_quote_version(db, versions[0])
+        single_queries = len(stmts)
+
+        batch = timeit(lambda: recalc_quote_versions(db, versions), repeat=5)
+        with count_statements(engine) as stmts:
+            recalc_quote_versions(db, versions)
+        batch_queries = len(stmts)
+
+        print(
+            f"{n_lines:>6} {single['median_ms']:>10.2f} / {single['p95_ms']:<9.2f} {single_queries:>6} "
+            f"{batch['median_ms'] / BATCH_VERSIONS:>24.2f} {batch_queries:>6}"
+        )
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Tempo di risposta della griglia what-if a 10k e 100k punti.
+
+    python -m benchmarks.bench_what_if
+"""
+from app.models.customer import Customer
+from app.models.inventory import Filament
+from app.models.printer import Printer
+from app.models.quote import Quote, QuoteLine, QuoteVersion
+from app.services.quote_grid import what_if_grid
+from benchmarks._common import make_engine, make_session, timeit
+
+
+def main() -> None:
+    engine = make_engine()
+    db = make_session(engine)
+    fil = Filament(materiale="PLA", costo_spool_eur=20, peso_nominale_g=1000)
+    printers = [
+        Printer(nome=f"P{i}", modello="X1C", potenza_w=300 + 50 * i, costo_macchina_eur=1000 + 200 * i, vita_stimata_h=8000, manutenzione_eur_h=0.2)
+        for i in range(4)
+    ]
+    customer = Customer(ragione_sociale="Bench")
+    db.add_all([fil, customer, *printers])
+    db.flush()
+    quote = Quote(codice="BENCH-WHATIF", customer_id=customer.id)
+    db.add(quote)
+    db.flush()
+    qv = QuoteVersion(quote_id=quote.id)
+    for i in range(60):
+        qv.righe.append(QuoteLine(descrizione=f"Riga {i}", filament_id=fil.id, quantita=2, peso_materiale_g=25, tempo_stimato_min=45))
+    db.add(qv)
+    db.commit()
+
+    printer_ids = [None] + [p.id for p in printers]
+    grids = {
+        "10k": dict(margine_pct=list(range(0, 50, 2)), overhead_pct=list(range(0, 20)), rischio_pct=[0, 5, 10, 15], sconto_eur=[0, 10, 20, 50, 100], printer_ids=printer_ids[:1]),
+        "100k": dict(margine_pct=list(range(0, 50, 2)), overhead_pct=list(range(0, 20)), rischio_pct=[0, 5, 10, 15], sconto_eur=[0, 10, 20, 50, 100], printer_ids=printer_ids + [None] * 5),
+    }
+    for name, params in grids.items():
+        grid = what_if_grid(db, qv, **params)
+        stats = timeit(lambda: what_if_grid(db, qv, **params), repeat=10)
+        print(f"{name:>5}: {len(grid['margine_pct']):>7} punti  mediana {stats['median_ms']:.1f} ms  p95 {stats['p95_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Commit e statement SQL per richiesta sugli endpoint di scrittura principali.
+
+Esegue in sequenza il percorso tipico preventivo → job (cliente, filamento,
+preventivo, versione, accettazione, job, consumo, completamento) e per ogni
+richiesta conta i commit e gli statement inviati al database. Con l'unità di
+lavoro della richiesta ogni scrittura fa un solo commit.
+
+    python -m benchmarks.bench_writes
+"""
+import logging
+import tempfile
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.api_v1.deps import get_db
+from app.core.security import create_access_token, get_password_hash
+from app.main import create_app
+from app.models.user import User, UserRole
+from benchmarks._common import count_statements, make_engine
+
+
+def main() -> None:
+    engine = make_engine(f"sqlite:///{Path(tempfile.mkdtemp()) / 'bench_writes.db'}")
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = factory()
+    user = User(email="writes@bench.local", role=UserRole.admin.value, hashed_password=get_password_hash("x"))
+    db.add(user)
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(str(user.id))}"}
+    db.close()
+
+    app = create_app()
+
+    def override_db():
+        session = factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_db
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    commits: list[int] = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+    api = "/api/v1"
+    with TestClient(app) as client:
+        client.get(f"{api}/users/", headers=headers)  # riscalda la cache utenti
+
+        def call(label: str, method: str, url: str, **kwargs) -> dict:
+            commits.clear()
+            with count_statements(engine) as statements:
+                res = client.request(method, f"{api}{url}", headers=headers, **kwargs)
+            assert res.status_code < 300, res.text
+            print(f"{label:<28} {len(commits):>2} commit  {len(statements):>3} statement")
+            return res.json()
+
+        cust = call("POST /customers/", "POST", "/customers/", json={"ragione_sociale": "ACME"})
+        call("PUT /customers/{id}", "PUT", f"/customers/{cust['id']}", json={"note": "cliente storico"})
+        fil = call("POST /filaments/", "POST", "/filaments/", json={"materiale": "PLA", "costo_spool_eur": 20.0})
+        quote = call("POST /quotes/", "POST", "/quotes/", json={"codice": "PRV-W", "customer_id": cust["id"]})
+        riga = {"descrizione": "Pezzo", "filament_id": fil["id"], "quantita": 2, "peso_materiale_g": 50, "tempo_stimato_min": 90}
+        qv = call("POST /quotes/{id}/versions", "POST", f"/quotes/{quote['id']}/versions", json={"righe": [riga]})
+        call("POST .../set-status", "POST", f"/quotes/versions/{qv['id']}/set-status", params={"status_in": "ACCETTATO"})
+        job = call("POST /jobs/from-quote", "POST", "/jobs/from-quote", json={"quote_version_id": qv["id"]})
+        call("POST /jobs/{id}/consumi", "POST", f"/jobs/{job['id']}/consumi", json={"filament_id": fil["id"], "peso_g": 20})
+        call("PUT /jobs/{id} (completato)", "PUT", f"/jobs/{job['id']}", json={"status": "COMPLETATO"})
+        call("DELETE /jobs/{id}", "DELETE", f"/jobs/{job['id']}")
+
+
+if __name__ == "__main__":
+    main()
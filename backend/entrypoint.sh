@@ -7,8 +7,14 @@ export PYTHONPATH=/app
 echo "[backend] running migrations..."
 alembic upgrade head
 
+echo "[backend] creating audit log partitions..."
+python -m app.db.audit_partitions
+
 echo "[backend] seeding demo data (if empty)..."
 python -c "from app.db.session import SessionLocal; from app.db.seed import seed_if_empty; db=SessionLocal(); seed_if_empty(db); db.close()"
 
+echo "[backend] building KPI rollup (if empty)..."
+python -m app.db.rebuild_kpi --se-vuoto
+
 echo "[backend] starting api..."
 exec uvicorn app.main:app --host 0.0.0.0 --port 8000
@@ -13,4 +13,17 @@ api.interceptors.request.use((config) => {
   return config
 })
 
+// Gli elenchi sono paginati a cursore: la pagina successiva è nell'header X-Next-Cursor.
+// Scarica tutte le pagine: solo per liste di supporto piccole (select, lookup); le tabelle usano useCursorList.
+export async function getAllPages<T = any>(url: string, params: Record<string, any> = {}): Promise<T[]> {
+  const rows: T[] = []
+  let cursor: string | undefined
+  do {
+    const res = await api.get(url, { params: { ...params, limit: 1000, ...(cursor ? { cursor } : {}) } })
+    rows.push(...res.data)
+    cursor = res.headers['x-next-cursor']
+  } while (cursor)
+  return rows
+}
+
 export default api
@@ -0,0 +1,39 @@
+import React from 'react'
+import api from './client'
+
+export const PAGE_SIZE = 50
+
+// Elenco paginato a cursore: una pagina alla volta, la successiva su richiesta (header X-Next-Cursor).
+// Per le liste di supporto piccole (select, lookup) resta getAllPages.
+export function useCursorList<T = any>(url: string, params: Record<string, any> = {}, limit = PAGE_SIZE) {
+  const [rows, setRows] = React.useState<T[]>([])
+  const [cursor, setCursor] = React.useState<string | undefined>()
+  const [loading, setLoading] = React.useState(false)
+  const request = React.useRef(0)
+  const paramsKey = JSON.stringify(params)
+
+  const fetchPage = React.useCallback(
+    async (after?: string) => {
+      const id = ++request.current
+      setLoading(true)
+      try {
+        const res = await api.get(url, { params: { ...JSON.parse(paramsKey), limit, ...(after ? { cursor: after } : {}) } })
+        if (id !== request.current) return // superata da una richiesta più recente (es. filtri cambiati)
+        setRows((prev) => (after ? [...prev, ...res.data] : res.data))
+        setCursor(res.headers['x-next-cursor'] || undefined)
+      } finally {
+        if (id === request.current) setLoading(false)
+      }
+    },
+    [url, paramsKey, limit]
+  )
+
+  const reload = React.useCallback(() => fetchPage(), [fetchPage])
+  const loadMore = React.useCallback(() => (cursor ? fetchPage(cursor) : Promise.resolve()), [fetchPage, cursor])
+
+  React.useEffect(() => {
+    void reload()
+  }, [reload])
+
+  return { rows, hasMore: Boolean(cursor), loading, reload, loadMore }
+}
@@ -0,0 +1,12 @@
+import { Box, Button } from '@mui/material'
+
+export function LoadMoreButton({ hasMore, loading, onClick }: { hasMore: boolean; loading: boolean; onClick: () => void }) {
+  if (!hasMore) return null
+  return (
+    <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+      <Button variant="outlined" onClick={onClick} disabled={loading}>
+        {loading ? 'Caricamento…' : 'Carica altri'}
+      </Button>
+    </Box>
+  )
+}
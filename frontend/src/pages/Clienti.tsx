@@ -24,8 +24,10 @@ import EditIcon from '@mui/icons-material/Edit'
 import DeleteIcon from '@mui/icons-material/Delete'
 import MoreVertIcon from '@mui/icons-material/MoreVert'
 import api from '../api/client'
+import { useCursorList } from '../api/useCursorList'
 import { Customer } from '../api/types'
 import { useAuth } from '../components/AuthProvider'
+import { LoadMoreButton } from '../components/LoadMoreButton'
 
 const empty: Partial<Customer> = {
   tipo_cliente: 'DITTA',
@@ -42,17 +44,12 @@ const empty: Partial<Customer> = {
 
 export default function ClientiPage() {
   const { user } = useAuth()
-  const [rows, setRows] = React.useState<Customer[]>([])
+  const { rows, hasMore, loading, reload: load, loadMore } = useCursorList<Customer>('/api/v1/customers/')
   const [open, setOpen] = React.useState(false)
   const [editing, setEditing] = React.useState<Customer | null>(null)
   const [form, setForm] = React.useState<Partial<Customer>>(empty)
   const [anchorEl, setAnchorEl] = React.useState<{ [key: number]: HTMLElement | null }>({})
 
-  const load = () => api.get('/api/v1/customers/').then((r) => setRows(r.data))
-  React.useEffect(() => {
-    void load()
-  }, [])
-
   const canWrite = user?.role === 'ADMIN' || user?.role === 'OPERATORE' || user?.role === 'COMMERCIALE'
   const canDelete = user?.role === 'ADMIN'
 
@@ -113,7 +110,7 @@ export default function ClientiPage() {
               Elenco clienti
             </Typography>
             <Typography variant="caption" sx={{ color: 'text.secondary', fontSize: { xs: '0.75rem', md: '0.8rem' } }}>
-              {rows.length} clienti registrati
+              {rows.length}{hasMore ? '+' : ''} clienti registrati
             </Typography>
           </Box>
         </Stack>
@@ -168,6 +165,7 @@ export default function ClientiPage() {
         </TableBody>
         </Table>
       </TableContainer>
+      <LoadMoreButton hasMore={hasMore} loading={loading} onClick={() => void loadMore()} />
       </Paper>
 
       <Dialog open={open} onClose={() => setOpen(false)} maxWidth="sm" fullWidth>
@@ -27,10 +27,12 @@ import {
 } from '@mui/material'
 import DeleteIcon from '@mui/icons-material/Delete'
 import MoreVertIcon from '@mui/icons-material/MoreVert'
-import api from '../api/client'
+import api, { getAllPages } from '../api/client'
+import { useCursorList } from '../api/useCursorList'
 import { showInfo } from '../utils/toast'
 import { useAuth } from '../components/AuthProvider'
-import { CostCategory, CostEntry, CostMonthly, CostByJob, CostByCustomer, Job, Customer } from '../api/types'
+import { LoadMoreButton } from '../components/LoadMoreButton'
+import { CostCategory, CostEntry, CostMonthly, CostByJob, CostByCustomer, Job } from '../api/types'
 
 function yyyymmNow(): string {
   const d = new Date()
@@ -47,9 +49,7 @@ export default function CostiPage() {
   const [anchorEl, setAnchorEl] = React.useState<{ [key: number]: HTMLElement | null }>({})
 
   const [categories, setCategories] = React.useState<CostCategory[]>([])
-  const [entries, setEntries] = React.useState<CostEntry[]>([])
   const [jobs, setJobs] = React.useState<Job[]>([])
-  const [customers, setCustomers] = React.useState<Customer[]>([])
 
   const [catDialog, setCatDialog] = React.useState(false)
   const [newCat, setNewCat] = React.useState({ nome: '', descrizione: '' })
@@ -70,15 +70,13 @@ export default function CostiPage() {
   const [byCustomer, setByCustomer] = React.useState<CostByCustomer[]>([])
 
   const loadCategories = () => api.get('/api/v1/costs/categories').then((r) => setCategories(r.data))
-  const loadEntries = () => {
-    const params: any = {}
-    if (filterFrom) params.periodo_from = filterFrom
-    if (filterTo) params.periodo_to = filterTo
-    if (filterCategory) params.categoria_id = Number(filterCategory)
-    return api.get('/api/v1/costs/entries', { params }).then((r) => setEntries(r.data))
-  }
-  const loadJobs = () => api.get('/api/v1/jobs/').then((r) => setJobs(r.data))
-  const loadCustomers = () => api.get('/api/v1/customers/').then((r) => setCustomers(r.data))
+  const entryParams: Record<string, any> = {}
+  if (filterFrom) entryParams.periodo_from = filterFrom
+  if (filterTo) entryParams.periodo_to = filterTo
+  if (filterCategory) entryParams.categoria_id = Number(filterCategory)
+  // filtri sul server, una pagina alla volta; il hook ricarica quando cambiano
+  const { rows: entries, hasMore, loading, reload: loadEntries, loadMore } = useCursorList<CostEntry>('/api/v1/costs/entries', entryParams)
+  const loadJobs = () => getAllPages('/api/v1/jobs/').then(setJobs)
 
   const loadReports = async () => {
     const params: any = {}
@@ -97,11 +95,9 @@ export default function CostiPage() {
   React.useEffect(() => {
     void loadCategories()
     void loadJobs()
-    void loadCustomers()
   }, [])
 
   React.useEffect(() => {
-    void loadEntries()
     void loadReports()
   }, [filterFrom, filterTo, filterCategory])
 
@@ -229,7 +225,7 @@ export default function CostiPage() {
                   Registrazioni costi
                 </Typography>
                 <Typography variant="caption" sx={{ color: 'text.secondary', fontSize: { xs: '0.75rem', md: '0.8rem' } }}>
-                  {filtered.length} registrazioni visualizzate
+                  {filtered.length}{hasMore ? '+' : ''} registrazioni visualizzate
                 </Typography>
               </Box>
               {canWriteEntries && (
@@ -299,6 +295,7 @@ export default function CostiPage() {
             }}
             rowsPerPageOptions={[10, 25, 50]}
           />
+          <LoadMoreButton hasMore={hasMore} loading={loading} onClick={() => void loadMore()} />
 
           <Dialog open={entryDialog} onClose={() => setEntryDialog(false)} maxWidth="sm" fullWidth>
             <DialogTitle>Nuovo costo</DialogTitle>
@@ -37,8 +37,10 @@ import ScaleIcon from '@mui/icons-material/Scale'
 import CheckCircleIcon from '@mui/icons-material/CheckCircle'
 import DeviceHubIcon from '@mui/icons-material/DeviceHub'
 import api from '../api/client'
+import { useCursorList } from '../api/useCursorList'
 import { Filament } from '../api/types'
 import { useAuth } from '../components/AuthProvider'
+import { LoadMoreButton } from '../components/LoadMoreButton'
 
 const empty: Partial<Filament> = {
   materiale: 'PLA',
@@ -100,7 +102,7 @@ function stableSort<T>(array: readonly T[], comparator: (a: T, b: T) => number)
 
 export default function FilamentiPage() {
   const { user } = useAuth()
-  const [rows, setRows] = React.useState<Filament[]>([])
+  const [summary, setSummary] = React.useState<{ stato: string; filamenti: number; peso_residuo_g: number }[]>([])
   const [locations, setLocations] = React.useState<any[]>([])
   const [open, setOpen] = React.useState(false)
   const [editing, setEditing] = React.useState<Filament | null>(null)
@@ -113,11 +115,17 @@ export default function FilamentiPage() {
   const [orderBy, setOrderBy] = React.useState<FilamentOrderBy | ''>('id')
   const [showFilters, setShowFilters] = React.useState(false)
 
-  const load = () => api.get('/api/v1/filaments/').then((r) => setRows(r.data))
+  // stato e ubicazione filtrati sul server, la ricerca testuale sulle righe caricate
+  const serverFilters: Record<string, any> = {}
+  if (filterStato) serverFilters.stato = filterStato
+  if (filterUbicazione) serverFilters.ubicazione_id = Number(filterUbicazione)
+  const { rows, hasMore, loading, reload, loadMore } = useCursorList<Filament>('/api/v1/filaments/', serverFilters)
+  const loadSummary = () => api.get('/api/v1/filaments/summary').then((r) => setSummary(r.data))
+  const load = () => Promise.all([reload(), loadSummary()])
   const loadLocations = () => api.get('/api/v1/locations/').then((r) => setLocations(r.data))
   
   React.useEffect(() => {
-    void load()
+    void loadSummary()
     void loadLocations()
   }, [])
 
@@ -227,18 +235,21 @@ export default function FilamentiPage() {
     })
   }, [rows, searchText, filterStato, filterUbicazione])
 
+  // totali dal riepilogo per stato del server, non dalle sole pagine caricate
   const statistics = React.useMemo(() => {
-    const nonFinished = rows.filter(r => r.stato !== 'FINITO')
-    const disponibili = rows.filter(r => r.stato === 'DISPONIBILE' || r.stato === 'NUOVO')
-    const inUsoAMS = rows.filter(r => r.stato === 'IN_USO_AMS')
-    
-    const totalCount = nonFinished.length
-    const disponibiliCount = disponibili.length
-    const inUsoAMSCount = inUsoAMS.length
-    
-    const totalKg = (nonFinished.reduce((sum, r) => sum + (r.peso_residuo_g || 0), 0) / 1000).toFixed(2)
-    const disponibiliKg = (disponibili.reduce((sum, r) => sum + (r.peso_residuo_g || 0), 0) / 1000).toFixed(2)
-    const inUsoAMSKg = (inUsoAMS.reduce((sum, r) => sum + (r.peso_residuo_g || 0), 0) / 1000).toFixed(2)
+    const nonFinished = summary.filter(s => s.stato !== 'FINITO')
+    const disponibili = summary.filter(s => s.stato === 'DISPONIBILE' || s.stato === 'NUOVO')
+    const inUsoAMS = summary.filter(s => s.stato === 'IN_USO_AMS')
+    const count = (group: typeof summary) => group.reduce((sum, s) => sum + s.filamenti, 0)
+    const kg = (group: typeof summary) => (group.reduce((sum, s) => sum + s.peso_residuo_g, 0) / 1000).toFixed(2)
+
+    const totalCount = count(nonFinished)
+    const disponibiliCount = count(disponibili)
+    const inUsoAMSCount = count(inUsoAMS)
+
+    const totalKg = kg(nonFinished)
+    const disponibiliKg = kg(disponibili)
+    const inUsoAMSKg = kg(inUsoAMS)
     
     return {
       totalCount,
@@ -248,7 +259,7 @@ export default function FilamentiPage() {
       inUsoAMSCount,
       inUsoAMSKg,
     }
-  }, [rows])
+  }, [summary])
 
   const visibleRows = React.useMemo(() => {
     if (!orderBy) return filteredRows
@@ -359,7 +370,7 @@ export default function FilamentiPage() {
               Inventario filamenti
             </Typography>
             <Typography variant="caption" sx={{ color: 'text.secondary', fontSize: { xs: '0.75rem', md: '0.8rem' } }}>
-              {filteredRows.length} filamenti visualizzati
+              {filteredRows.length}{hasMore ? '+' : ''} filamenti visualizzati
             </Typography>
           </Box>
           <IconButton
@@ -573,6 +584,7 @@ export default function FilamentiPage() {
         </TableBody>
         </Table>
       </TableContainer>
+      <LoadMoreButton hasMore={hasMore} loading={loading} onClick={() => void loadMore()} />
       </Paper>
 
       <Dialog open={open} onClose={() => setOpen(false)} maxWidth="sm" fullWidth>
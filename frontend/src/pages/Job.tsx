@@ -25,9 +25,11 @@ import EditIcon from '@mui/icons-material/Edit'
 import DeleteIcon from '@mui/icons-material/Delete'
 import AddCircleIcon from '@mui/icons-material/AddCircle'
 import MoreVertIcon from '@mui/icons-material/MoreVert'
-import api from '../api/client'
+import api, { getAllPages } from '../api/client'
+import { useCursorList } from '../api/useCursorList'
 import { Filament, Job } from '../api/types'
 import { useAuth } from '../components/AuthProvider'
+import { LoadMoreButton } from '../components/LoadMoreButton'
 import { showError } from '../utils/toast'
 
 const statusOptions = ['PIANIFICATO', 'IN_CORSO', 'COMPLETATO', 'ANNULLATO']
@@ -35,15 +37,13 @@ const statusOptions = ['PIANIFICATO', 'IN_CORSO', 'COMPLETATO', 'ANNULLATO']
 export default function JobPage() {
   const { user } = useAuth()
   const canWrite = user?.role === 'ADMIN' || user?.role === 'OPERATORE'
-  const [rows, setRows] = React.useState<Job[]>([])
+  const { rows, hasMore, loading, reload: load, loadMore } = useCursorList<Job>('/api/v1/jobs/')
   const [filaments, setFilaments] = React.useState<Filament[]>([])
   const [anchorEl, setAnchorEl] = React.useState<{ [key: number]: HTMLElement | null }>({})
 
-  const load = () => api.get('/api/v1/jobs/').then((r) => setRows(r.data))
-  const loadFil = () => api.get('/api/v1/filaments/').then((r) => setFilaments(r.data))
+  const loadFil = () => getAllPages('/api/v1/filaments/').then(setFilaments)
 
   React.useEffect(() => {
-    void load()
     void loadFil()
   }, [])
 
@@ -124,7 +124,7 @@ export default function JobPage() {
               Elenco job
             </Typography>
             <Typography variant="caption" sx={{ color: 'text.secondary', fontSize: { xs: '0.75rem', md: '0.8rem' } }}>
-              {rows.length} lavori registrati
+              {rows.length}{hasMore ? '+' : ''} lavori registrati
             </Typography>
           </Box>
         </Stack>
@@ -192,6 +192,7 @@ export default function JobPage() {
         </TableBody>
           </Table>
         </TableContainer>
+        <LoadMoreButton hasMore={hasMore} loading={loading} onClick={() => void loadMore()} />
       </Paper>
 
       <Dialog open={openEdit} onClose={() => setOpenEdit(false)} maxWidth="sm" fullWidth>
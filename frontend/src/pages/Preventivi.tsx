@@ -31,15 +31,17 @@ import SendIcon from '@mui/icons-material/Send'
 import CheckCircleIcon from '@mui/icons-material/CheckCircle'
 import CancelIcon from '@mui/icons-material/Cancel'
 import WorkIcon from '@mui/icons-material/Work'
-import api from '../api/client'
+import api, { getAllPages } from '../api/client'
+import { useCursorList } from '../api/useCursorList'
 import { Customer, Filament, Quote, QuoteVersion } from '../api/types'
 import { showSuccess, showError } from '../utils/toast'
 // ...existing code...
 import { useAuth } from '../components/AuthProvider'
+import { LoadMoreButton } from '../components/LoadMoreButton'
 
 export default function PreventiviPage() {
   const { user } = useAuth()
-  const [quotes, setQuotes] = React.useState<Quote[]>([])
+  const { rows: quotes, hasMore, loading, reload: loadQuotes, loadMore } = useCursorList<Quote>('/api/v1/quotes/')
   const [selected, setSelected] = React.useState<Quote | null>(null)
   const [versions, setVersions] = React.useState<QuoteVersion[]>([])
   const [customers, setCustomers] = React.useState<Customer[]>([])
@@ -51,16 +53,12 @@ export default function PreventiviPage() {
   const canWrite = user?.role === 'ADMIN' || user?.role === 'OPERATORE' || user?.role === 'COMMERCIALE'
   const canCreateJob = user?.role === 'ADMIN' || user?.role === 'OPERATORE'
 
-  const loadQuotes = () => api.get('/api/v1/quotes/').then((r) => setQuotes(r.data))
-  const loadCustomers = () => api.get('/api/v1/customers/').then((r) => {
-    setCustomers(r.data)
-  })
-  const loadFilaments = () => api.get('/api/v1/filaments/').then((r) => setFilaments(r.data))
-  const loadPrinters = () => api.get('/api/v1/printers').then((r) => setPrinters(r.data))
+  const loadCustomers = () => getAllPages('/api/v1/customers/').then(setCustomers)
+  const loadFilaments = () => getAllPages('/api/v1/filaments/').then(setFilaments)
+  const loadPrinters = () => getAllPages('/api/v1/printers').then(setPrinters)
   const loadVersions = (qid: number) => api.get(`/api/v1/quotes/${qid}/versions`).then((r) => setVersions(r.data))
 
   React.useEffect(() => {
-    void loadQuotes()
     void loadCustomers()
     void loadFilaments()
     void loadPrinters()
@@ -315,7 +313,7 @@ export default function PreventiviPage() {
                 Elenco preventivi
               </Typography>
               <Typography variant="caption" sx={{ color: 'text.secondary', fontSize: { xs: '0.75rem', md: '0.8rem' } }}>
-                Ultimi {quotes.length} preventivi inseriti
+                Ultimi {quotes.length}{hasMore ? '+' : ''} preventivi inseriti
               </Typography>
             </Box>
           </Stack>
@@ -348,6 +346,7 @@ export default function PreventiviPage() {
               </TableBody>
             </Table>
           </TableContainer>
+          <LoadMoreButton hasMore={hasMore} loading={loading} onClick={() => void loadMore()} />
         </Paper>
 
         <Paper sx={{ p: { xs: 1.5, sm: 2, md: 2.5 } }}>
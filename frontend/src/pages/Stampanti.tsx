@@ -24,7 +24,9 @@ import EditIcon from '@mui/icons-material/Edit'
 import DeleteIcon from '@mui/icons-material/Delete'
 import MoreVertIcon from '@mui/icons-material/MoreVert'
 import { useAuth } from '../components/AuthProvider'
+import { LoadMoreButton } from '../components/LoadMoreButton'
 import api from '../api/client'
+import { useCursorList } from '../api/useCursorList'
 import { showError } from '../utils/toast'
 
 type Stampante = {
@@ -56,7 +58,7 @@ const empty: Partial<Stampante> = {
 
 export default function StampantiPage() {
   const { user } = useAuth()
-  const [rows, setRows] = React.useState<Stampante[]>([])
+  const { rows, hasMore, loading, reload, loadMore } = useCursorList<Stampante>('/api/v1/printers')
   const [open, setOpen] = React.useState(false)
   const [editing, setEditing] = React.useState<Stampante | null>(null)
   const [form, setForm] = React.useState<Partial<Stampante>>(empty)
@@ -64,17 +66,12 @@ export default function StampantiPage() {
 
   const load = async () => {
     try {
-      const res = await api.get('/api/v1/printers')
-      setRows(res.data)
+      await reload()
     } catch (err) {
       console.error('Errore nel caricamento delle stampanti', err)
     }
   }
 
-  React.useEffect(() => {
-    void load()
-  }, [])
-
   const canWrite = user?.role === 'ADMIN' || user?.role === 'OPERATORE'
 
   const onNew = () => {
@@ -165,7 +162,7 @@ export default function StampantiPage() {
               Parco macchine
             </Typography>
             <Typography variant="caption" sx={{ color: 'text.secondary', fontSize: { xs: '0.75rem', md: '0.8rem' } }}>
-              {rows.length} stampanti registrate
+              {rows.length}{hasMore ? '+' : ''} stampanti registrate
             </Typography>
           </Box>
         </Stack>
@@ -253,6 +250,7 @@ export default function StampantiPage() {
             </Table>
           </TableContainer>
         )}
+        <LoadMoreButton hasMore={hasMore} loading={loading} onClick={() => void loadMore()} />
       </Paper>
 
       <Dialog open={open} onClose={() => setOpen(false)} maxWidth="sm" fullWidth>